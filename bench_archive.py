@@ -0,0 +1,166 @@
+"""
+Chat history tiering benchmark on SQLite: the queries every chat turn and history
+page run, against one chat_history table holding every message versus the tiered
+layout, where only the newest KEEP messages per session stay in chat_history and
+the rest sit in compressed chat_archive_blocks.
+
+Both databases hold the same messages, inserted in time order so sessions
+interleave the way real traffic does. Sessions are queried at random.
+
+Usage: python bench_archive.py [total_rows] [sessions] [keep_per_session]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'unused.db')}"
+
+from sqlalchemy import create_engine, func, select
+
+from database import Base, ChatArchiveBlock, ChatHistory, tune_sqlite
+from utils.chat_archive import pack_block, unpack_block, ArchivedMessage
+
+TOTAL_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+SESSIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+KEEP = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+PER_SESSION = TOTAL_ROWS // SESSIONS
+BLOCK_SIZE = 200
+QUERIES = 2000
+INSERT_BATCH = 50_000
+START = datetime(2025, 1, 1)
+
+
+def message(step, s):
+    """The step-th message of session s; ids follow time order across all sessions."""
+    return {
+        "id": step * SESSIONS + s + 1,
+        "session_id": f"student-{s}",
+        "role": "user" if step % 2 == 0 else "ai",
+        "content": f"Message {step} of a tutoring conversation about topic {s % 50}.",
+        "created_at": START + timedelta(seconds=step * SESSIONS + s)
+    }
+
+
+def open_db(name):
+    engine = create_engine(f"sqlite:///{os.path.join(_tmpdir, name)}")
+    tune_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def insert_hot(engine, first_step):
+    rows = []
+    with engine.begin() as conn:
+        for step in range(first_step, PER_SESSION):
+            for s in range(SESSIONS):
+                rows.append(message(step, s))
+                if len(rows) >= INSERT_BATCH:
+                    conn.execute(ChatHistory.__table__.insert(), rows)
+                    rows = []
+        if rows:
+            conn.execute(ChatHistory.__table__.insert(), rows)
+
+
+def insert_archive(engine, archived_steps):
+    with engine.begin() as conn:
+        blocks = []
+        for s in range(SESSIONS):
+            for first in range(0, archived_steps, BLOCK_SIZE):
+                chunk = [ArchivedMessage(**{k: v for k, v in message(step, s).items() if k != "session_id"})
+                         for step in range(first, min(first + BLOCK_SIZE, archived_steps))]
+                block = pack_block(f"student-{s}", chunk)
+                blocks.append({c.name: getattr(block, c.name) for c in ChatArchiveBlock.__table__.columns if c.name != "id"})
+            if len(blocks) >= 1000:
+                conn.execute(ChatArchiveBlock.__table__.insert(), blocks)
+                blocks = []
+        if blocks:
+            conn.execute(ChatArchiveBlock.__table__.insert(), blocks)
+
+
+def latency(engine, query_fn):
+    rng = random.Random(1)
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(QUERIES):
+            session_id = f"student-{rng.randrange(SESSIONS)}"
+            start = time.perf_counter()
+            query_fn(conn, session_id)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.99) - 1] * 1000
+
+
+def chat_context(conn, session_id):
+    # What ConversationSummarizer.load_context reads every chat turn
+    conn.execute(
+        select(ChatHistory).where(ChatHistory.session_id == session_id).order_by(ChatHistory.id.desc()).limit(20)
+    ).all()
+
+
+def history_page(conn, session_id):
+    conn.execute(
+        select(ChatHistory.id, ChatHistory.role, ChatHistory.content, ChatHistory.created_at)
+        .where(ChatHistory.session_id == session_id).order_by(ChatHistory.id.desc()).limit(51)
+    ).all()
+
+
+def archived_page(conn, session_id):
+    # An old history page served from the archive: the block holding it, decompressed
+    payload = conn.execute(
+        select(ChatArchiveBlock.payload).where(ChatArchiveBlock.session_id == session_id)
+        .order_by(ChatArchiveBlock.first_id.asc()).limit(1)
+    ).scalar()
+    unpack_block(payload)[-51:]
+
+
+def size_mb(engine):
+    with engine.connect() as conn:
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+    return pages * page_size / 1e6
+
+
+def run():
+    archived_steps = PER_SESSION - KEEP
+    print(f"{SESSIONS * PER_SESSION:,} messages: {SESSIONS:,} sessions x {PER_SESSION}, newest {KEEP} per session kept hot\n")
+
+    start = time.perf_counter()
+    flat = open_db("flat.db")
+    insert_hot(flat, 0)
+    print(f"Built single-table database in {time.perf_counter() - start:.0f}s")
+
+    start = time.perf_counter()
+    tiered = open_db("tiered.db")
+    insert_hot(tiered, archived_steps)
+    insert_archive(tiered, archived_steps)
+    print(f"Built tiered database in {time.perf_counter() - start:.0f}s\n")
+
+    for engine in (flat, tiered):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    with tiered.connect() as conn:
+        hot_rows = conn.scalar(select(func.count()).select_from(ChatHistory))
+        blocks = conn.scalar(select(func.count()).select_from(ChatArchiveBlock))
+
+    print(f"{'layout':<14} {'chat_history rows':>18} {'file (MB)':>10}")
+    print(f"{'single table':<14} {SESSIONS * PER_SESSION:>18,} {size_mb(flat):>10.0f}")
+    print(f"{'tiered':<14} {hot_rows:>18,} {size_mb(tiered):>10.0f}   (+{blocks:,} archive blocks)\n")
+
+    print(f"{QUERIES} queries each, random sessions")
+    print(f"{'query':<22} {'layout':<14} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for name, query_fn in (("chat context (20)", chat_context), ("history page (50)", history_page)):
+        for layout, engine in (("single table", flat), ("tiered", tiered)):
+            p50, p99 = latency(engine, query_fn)
+            print(f"{name:<22} {layout:<14} {p50:>9.3f} {p99:>9.3f}")
+    p50, p99 = latency(tiered, archived_page)
+    print(f"{'oldest page (archive)':<22} {'tiered':<14} {p50:>9.3f} {p99:>9.3f}")
+
+
+if __name__ == "__main__":
+    run()
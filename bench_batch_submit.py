@@ -0,0 +1,89 @@
+"""
+Classroom bulk-submit benchmark on SQLite: a class of STUDENTS submits the same
+QUESTIONS-question quiz. Grading only: grade() once per submission versus
+grade_batch() over all of them. End to end: one POST /api/quiz/submit per
+student (sent one after another) versus a single /api/quiz/{id}/submit/batch.
+
+Usage: python bench_batch_submit.py [students] [questions]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench_batch_submit.db')}"
+
+from fastapi.testclient import TestClient
+
+import main
+from database import engine, Base, SessionLocal, Quiz
+from utils.grading import grade, grade_batch
+
+STUDENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+QUESTIONS = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+ROUNDS = 20
+
+
+def make_class(rng):
+    key = [[i, rng.choice("ABCD")] for i in range(1, QUESTIONS + 1)]
+    # Answers as the frontend sends them: the full option text
+    submissions = [
+        {str(i): f"{rng.choice('ABCD')}) Option text for question {i}" for i in range(1, QUESTIONS + 1)}
+        for _ in range(STUDENTS)
+    ]
+    return key, submissions
+
+
+def timed(fn, rounds=1):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def run():
+    rng = random.Random(3)
+    key, submissions = make_class(rng)
+    assert grade_batch(key, submissions) == [grade(key, answers) for answers in submissions]
+
+    print(f"{STUDENTS} students x {QUESTIONS} questions\n")
+    print(f"{'grading only':<28} {'ms':>9}")
+    loop_ms = timed(lambda: [grade(key, answers) for answers in submissions], ROUNDS)
+    batch_ms = timed(lambda: grade_batch(key, submissions), ROUNDS)
+    print(f"{'grade() per submission':<28} {loop_ms:>9.1f}")
+    print(f"{'grade_batch()':<28} {batch_ms:>9.1f}   ({loop_ms / batch_ms:.1f}x)\n")
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add_all(Quiz(id=f"bench-quiz-{n}", topic="Benchmark", session_id="teacher", answer_key=key, questions=[]) for n in range(2))
+        db.commit()
+    finally:
+        db.close()
+
+    client = TestClient(main.app)
+
+    def one_by_one():
+        for n, answers in enumerate(submissions):
+            response = client.post("/api/quiz/submit", json={"quiz_id": "bench-quiz-0", "session_id": f"student-{n}", "answers": answers})
+            assert response.status_code == 200
+
+    def batch():
+        response = client.post("/api/quiz/bench-quiz-1/submit/batch", json={"submissions": [
+            {"session_id": f"student-{n}", "answers": answers} for n, answers in enumerate(submissions)
+        ]})
+        assert response.status_code == 200
+
+    print(f"{'end to end':<28} {'ms':>9}")
+    single_ms = timed(one_by_one)
+    batch_ms = timed(batch)
+    print(f"{'/api/quiz/submit x ' + str(STUDENTS):<28} {single_ms:>9.1f}")
+    print(f"{'/submit/batch':<28} {batch_ms:>9.1f}   ({single_ms / batch_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,76 @@
+"""
+Throughput benchmark for the LLM-backed endpoints against a stub LLM.
+
+Every request sleeps LATENCY seconds "upstream". With a non-blocking LLM path
+throughput should grow roughly linearly with the number of concurrent clients,
+and /api/health should stay fast while generations are in flight.
+
+Usage: python bench_concurrency.py [latency_seconds]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+import httpx
+
+import main
+from database import engine, Base
+from stub_llm import StubLLM
+
+# The app only creates its schema at startup when asked to (DB_INIT_SCHEMA), so create it here
+Base.metadata.create_all(bind=engine)
+
+LATENCY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+CONCURRENCY_LEVELS = [1, 4, 16, 32, 64]
+
+ENDPOINTS = {
+    "chat": ("/api/chat", lambda i: {"messages": [{"role": "user", "content": f"Hello {i}"}], "session_id": f"bench-{i}"}),
+    "quiz": ("/api/quiz/generate", lambda i: {"topic": f"Topic {i}", "num_questions": 5, "session_id": f"bench-{i}"}),
+    "flashcards": ("/api/flashcards/generate", lambda i: {"topic": f"Topic {i}", "num_cards": 10, "session_id": f"bench-{i}"}),
+}
+
+
+async def run_level(client, path, payload_fn, concurrency):
+    async def one(i):
+        res = await client.post(path, json=payload_fn(i))
+        res.raise_for_status()
+
+    async def probe_health():
+        # Wait until the generations are in flight, then time a health check
+        await asyncio.sleep(LATENCY / 4)
+        t = time.perf_counter()
+        await client.get("/api/health")
+        return time.perf_counter() - t
+
+    start = time.perf_counter()
+    results = await asyncio.gather(probe_health(), *(one(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return concurrency / elapsed, elapsed, results[0]
+
+
+async def main_async():
+    stub = StubLLM(latency=LATENCY)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"Stub LLM latency: {LATENCY:.2f}s per call\n")
+        for name, (path, payload_fn) in ENDPOINTS.items():
+            print(f"== {name} ({path})")
+            print(f"{'clients':>8} {'req/s':>10} {'wall (s)':>10} {'health (ms)':>12}")
+            for concurrency in CONCURRENCY_LEVELS:
+                rps, elapsed, health = await run_level(client, path, payload_fn, concurrency)
+                print(f"{concurrency:>8} {rps:>10.1f} {elapsed:>10.2f} {health * 1000:>12.1f}")
+            print()
+    print(f"Total upstream calls: {stub.calls}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
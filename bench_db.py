@@ -0,0 +1,161 @@
+"""
+Event-loop benchmark for the database layer on SQLite: the same chat-context reads
+done with the old blocking Session inside a coroutine versus the AsyncSession the
+API now uses, at increasing numbers of concurrent requests.
+
+Each simulated request reads the session's quiz count, history size, recent topics
+and the last 20 chat turns, then awaits a short stand-in for the LLM call. A ticker
+measures how late the event loop wakes it up: blocking queries stall every other
+request (including /api/health), async ones let the loop keep serving.
+
+A second table measures concurrent chat-message inserts through the single-writer
+queue with one commit per write versus batched (group) commits.
+
+Usage: python bench_db.py [sessions] [rows_per_session]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench_db.db')}"
+
+from sqlalchemy import func, select
+
+from database import engine, dispose_engines, Base, SessionLocal, AsyncSessionLocal, AsyncReadSessionLocal, ChatHistory, QuizScore, Topic
+from utils.db_writer import DatabaseWriter
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+ROWS_PER_SESSION = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+CONCURRENCY = [1, 8, 32, 64]
+REQUESTS = 256
+WRITES = 2000
+LLM_LATENCY = 0.02
+TICK = 0.005
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    start = datetime.utcnow() - timedelta(days=30)
+    db = SessionLocal()
+    try:
+        for s in range(SESSIONS):
+            sid = f"bench-{s}"
+            db.add_all(
+                ChatHistory(session_id=sid, role="user" if i % 2 == 0 else "ai", content=f"message {i} " * 20, created_at=start + timedelta(minutes=i))
+                for i in range(ROWS_PER_SESSION)
+            )
+            db.add_all(QuizScore(session_id=sid, quiz_id=f"q-{s}-{i}", score=i % 100, created_at=start + timedelta(hours=i)) for i in range(50))
+            db.add_all(Topic(session_id=sid, name=f"topic {i}") for i in range(5))
+        db.commit()
+    finally:
+        db.close()
+
+
+def context_query(session_id):
+    return (
+        select(func.count(QuizScore.id)).where(QuizScore.session_id == session_id),
+        select(func.count(ChatHistory.id), func.max(ChatHistory.created_at)).where(ChatHistory.session_id == session_id),
+        select(Topic).where(Topic.session_id == session_id).order_by(Topic.last_studied.desc()).limit(3),
+        select(ChatHistory).where(ChatHistory.session_id == session_id).order_by(ChatHistory.id.desc()).limit(20),
+    )
+
+
+async def blocking_request(n):
+    count_q, stats_q, topics_q, history_q = context_query(f"bench-{n % SESSIONS}")
+    db = SessionLocal()
+    try:
+        db.scalar(count_q)
+        db.execute(stats_q).one()
+        db.scalars(topics_q).all()
+        db.scalars(history_q).all()
+        db.commit()
+    finally:
+        db.close()
+    await asyncio.sleep(LLM_LATENCY)
+
+
+async def async_request(n):
+    count_q, stats_q, topics_q, history_q = context_query(f"bench-{n % SESSIONS}")
+    async with AsyncReadSessionLocal() as db:
+        await db.scalar(count_q)
+        (await db.execute(stats_q)).one()
+        (await db.scalars(topics_q)).all()
+        (await db.scalars(history_q)).all()
+        await db.commit()
+    await asyncio.sleep(LLM_LATENCY)
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(time.perf_counter() - expected, 0))
+
+
+async def measure(request_fn, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(n):
+        async with semaphore:
+            await request_fn(n)
+
+    stop, lags = asyncio.Event(), []
+    tick_task = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0
+    return REQUESTS / elapsed, p99 * 1000, (lags[-1] if lags else 0) * 1000
+
+
+async def measure_writes(batching, concurrency):
+    writer = DatabaseWriter(AsyncSessionLocal, batching=batching)
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one(n):
+        nonlocal errors
+        async with semaphore:
+            try:
+                await writer.add(ChatHistory(session_id=f"writer-{n % SESSIONS}", role="user", content=f"write {n}"))
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(WRITES)))
+    elapsed = time.perf_counter() - start
+    await writer.stop()
+    return WRITES / elapsed, writer.stats()["avg_batch"], errors
+
+
+async def run():
+    print(f"Seeding {SESSIONS} sessions x {ROWS_PER_SESSION} chat rows...")
+    seed()
+    print(f"{REQUESTS} requests, {LLM_LATENCY * 1000:.0f}ms stand-in LLM await each\n")
+    print(f"{'layer':<10} {'concurrency':>11} {'req/s':>8} {'loop lag p99 (ms)':>18} {'max (ms)':>9}")
+    for concurrency in CONCURRENCY:
+        for name, fn in (("blocking", blocking_request), ("async", async_request)):
+            rps, p99, worst = await measure(fn, concurrency)
+            print(f"{name:<10} {concurrency:>11} {rps:>8.1f} {p99:>18.1f} {worst:>9.1f}")
+
+    print(f"\n{WRITES} chat-message inserts\n")
+    print(f"{'commits':<10} {'concurrency':>11} {'writes/s':>9} {'avg batch':>10} {'errors':>7}")
+    for concurrency in CONCURRENCY:
+        for name, batching in (("per-write", False), ("batched", True)):
+            wps, avg_batch, errors = await measure_writes(batching, concurrency)
+            print(f"{name:<10} {concurrency:>11} {wps:>9.0f} {avg_batch or 1:>10.1f} {errors:>7}")
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,89 @@
+"""
+Session export/import benchmark on SQLite: exports sessions of growing size to an
+NDJSON file and imports each file into a new session. Each step runs twice: once
+timed for rows/s, once under tracemalloc (which slows it down) for its peak Python
+memory, which should stay flat as the session grows.
+
+Usage: python bench_export.py [largest_session_rows]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench_export.db')}"
+
+from database import engine, Base, AsyncSessionLocal, AsyncReadSessionLocal, ChatHistory, dispose_engines
+from utils.db_writer import DatabaseWriter
+from utils.session_export import SessionImporter, export_ndjson
+
+LARGEST = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SIZES = [n for n in (10, 10_000, 100_000, 1_000_000, 10_000_000) if n <= LARGEST]
+SEED_BATCH = 50_000
+
+
+def seed(session_id, rows):
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        for first in range(0, rows, SEED_BATCH):
+            conn.execute(ChatHistory.__table__.insert(), [
+                {"session_id": session_id, "role": "user" if i % 2 == 0 else "ai",
+                 "content": f"Message {i} of a long tutoring conversation.", "created_at": start + timedelta(seconds=i)}
+                for i in range(first, min(first + SEED_BATCH, rows))
+            ])
+
+
+async def export_to(path, session_id):
+    async with AsyncReadSessionLocal() as db, AsyncReadSessionLocal() as lookup_db:
+        with open(path, "w") as out:
+            async for line in export_ndjson(db, lookup_db, session_id):
+                out.write(line)
+
+
+async def read_records(path):
+    import json
+    with open(path, "rb") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+async def measure(fn):
+    """(result, seconds, peak MB) of fn() from one timed and one traced run."""
+    start = time.perf_counter()
+    result = await fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    await fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+async def run():
+    Base.metadata.create_all(bind=engine)
+    writer = DatabaseWriter(AsyncSessionLocal)
+    print(f"{'rows':>10} {'export rows/s':>14} {'export peak MB':>15} {'import rows/s':>14} {'import peak MB':>15}")
+    for rows in SIZES:
+        session_id = f"bench-{rows}"
+        seed(session_id, rows)
+        path = os.path.join(_tmpdir, f"{session_id}.ndjson")
+
+        _, export_s, export_peak = await measure(lambda: export_to(path, session_id))
+        stats, import_s, import_peak = await measure(
+            lambda: SessionImporter(writer, session_id=f"{session_id}-copy").load(read_records(path))
+        )
+        assert stats["imported"]["chat_history"] == rows
+        print(f"{rows:>10,} {rows / export_s:>14,.0f} {export_peak:>15.2f} {rows / import_s:>14,.0f} {import_peak:>15.2f}")
+        os.remove(path)
+    await writer.stop()
+    await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,64 @@
+"""
+Wall-clock benchmark for large quiz / flashcard generation against a stub LLM
+whose latency grows with the number of items it writes (like output tokens).
+
+A single prompt pays for every item in sequence; fan-out splits the request into
+parallel sub-prompts, so wall time should track the slowest chunk instead.
+
+Usage: python bench_fanout.py [seconds_per_item]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+import main
+from database import engine, Base
+from stub_llm import StubLLM
+
+# Generation banks its questions, so the bank tables must exist
+Base.metadata.create_all(bind=engine)
+
+PER_ITEM = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+BASE_LATENCY = 0.2
+SIZES = [5, 10, 20, 40]
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    result = await coro
+    return time.perf_counter() - start, result
+
+
+async def run():
+    stub = StubLLM(latency=BASE_LATENCY, per_item=PER_ITEM)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    print(f"Stub LLM: {BASE_LATENCY:.2f}s + {PER_ITEM:.2f}s per item\n")
+    print(f"{'kind':<12} {'items':>6} {'single (s)':>11} {'fan-out (s)':>12} {'calls':>6} {'returned':>9}")
+    for kind, chunk_attr, generate, field in (
+        ("quiz", "QUIZ_CHUNK_SIZE", lambda n, t: main._generate_quiz_uncached(t, "medium", n), "questions"),
+        ("flashcards", "FLASHCARD_CHUNK_SIZE", lambda n, t: main._generate_flashcards_uncached(t, n), "cards"),
+    ):
+        default_chunk = getattr(main, chunk_attr)
+        for size in SIZES:
+            # Single prompt: disable chunking for this run
+            setattr(main, chunk_attr, 10 ** 6)
+            single, _ = await timed(generate(size, f"single {kind} {size}"))
+
+            setattr(main, chunk_attr, default_chunk)
+            calls_before = stub.calls
+            fanned, data = await timed(generate(size, f"fanout {kind} {size}"))
+            calls = stub.calls - calls_before
+
+            print(f"{kind:<12} {size:>6} {single:>11.2f} {fanned:>12.2f} {calls:>6} {len(data[field]):>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
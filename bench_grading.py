@@ -0,0 +1,119 @@
+"""
+Grading micro-benchmark: one 50-question quiz submission graded the old way
+(decode the full questions JSON, re-derive every correct letter with a nested
+regex helper, debug prints) versus against the answer key stored at generation
+time plus the compact answer details (question text, answer as written, explanation)
+stored next to it. Both sides return the same results and include decoding the columns
+they read, as the database driver would.
+
+Usage: python bench_grading.py [iterations]
+"""
+
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+
+from utils.grading import answer_details, answer_key, grade
+
+QUESTIONS = 50
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+def make_quiz(rng):
+    questions = []
+    for i in range(1, QUESTIONS + 1):
+        questions.append({
+            "id": i,
+            "question": f"Question {i}: which of these statements about topic {i} is accurate? " * 2,
+            "options": [f"{label}) Option {label} for question {i}, with some supporting detail" for label in "ABCD"],
+            "correct_answer": rng.choice("ABCD"),
+            "explanation": f"Explanation for question {i}, covering why the other options are wrong. " * 3
+        })
+    return questions
+
+
+def legacy_grade(questions, answers):
+    """submit_quiz's grading loop before answer_key, prints included."""
+    correct = 0
+    results = []
+    for q in questions:
+        q_id = str(q["id"])
+        user_ans = answers.get(q_id, "")
+        import re
+
+        def extract_option_char(text):
+            if not text: return ""
+            match = re.match(r"^[\s\(]*([A-Da-d0-9])[\s\)\.]", text.strip())
+            if match:
+                return match.group(1).upper()
+            clean = text.strip().upper()
+            return clean if len(clean) == 1 else clean[:1]
+
+        print(f"DEBUG: Processing QID: {q_id}")
+        print(f"  User Ans Raw: '{user_ans}'")
+        print(f"  Correct Ans Raw: '{q.get('correct_answer', '')}'")
+
+        correct_char = extract_option_char(q.get("correct_answer", ""))
+        user_char = extract_option_char(user_ans)
+
+        print(f"  User Char: '{user_char}' | Correct Char: '{correct_char}'")
+
+        is_correct = (correct_char == user_char) and (correct_char != "")
+        print(f"  Is Correct: {is_correct}")
+
+        if is_correct:
+            correct += 1
+
+        results.append({
+            "question_id": q["id"],
+            "question": q["question"],
+            "user_answer": user_ans,
+            "correct_answer": q.get("correct_answer", ""),
+            "is_correct": is_correct,
+            "explanation": q.get("explanation", "")
+        })
+    return correct, results
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def run():
+    rng = random.Random(7)
+    questions = make_quiz(rng)
+    # Answers as the frontend sends them: the full option text
+    answers = {str(q["id"]): f"{rng.choice('ABCD')}) Option text" for q in questions}
+    questions_json = json.dumps(questions)
+    key_json = json.dumps(answer_key(questions))
+    details_json = json.dumps(answer_details(questions))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = legacy_grade(json.loads(questions_json), answers)
+    assert grade(json.loads(key_json), answers, json.loads(details_json)) == legacy
+
+    def before():
+        # Prints go to a buffer so terminal speed does not dominate; in the server they hit stdout
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_grade(json.loads(questions_json), answers)
+
+    def after():
+        grade(json.loads(key_json), answers, json.loads(details_json))
+
+    print(f"{QUESTIONS}-question quiz, {ITERATIONS} gradings\n")
+    print(f"{'grading':<12} {'column bytes':>12} {'us/submit':>10}")
+    old_us = timed(before)
+    new_us = timed(after)
+    print(f"{'questions':<12} {len(questions_json):>12} {old_us:>10.1f}")
+    print(f"{'key+details':<12} {len(key_json) + len(details_json):>12} {new_us:>10.1f}")
+    print(f"\n{old_us / new_us:.1f}x faster")
+
+
+if __name__ == "__main__":
+    run()
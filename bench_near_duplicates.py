@@ -0,0 +1,113 @@
+"""
+Near-duplicate index benchmark: inserts and lookups against a NearDuplicateIndex
+growing to a million synthetic quiz questions, timed per operation at checkpoints
+(every insert on the way, lookups at each checkpoint).
+Lookups use reworded copies of indexed questions (should match), new questions and
+siblings of indexed questions (same template, one word swapped, as with "capital of
+France?" and "capital of Spain?"; neither should match), so recall and false positives
+are reported next to the latency.
+
+Usage: python bench_near_duplicates.py [questions]
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from utils.near_duplicates import NearDuplicateIndex
+
+TOTAL = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+CHECKPOINTS = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n <= TOTAL]
+PROBES = 2000
+
+TEMPLATES = [
+    "What is the {0} of {1} in {2} {3}?",
+    "Which {0} best describes how {1} affects {2} {3}?",
+    "How does {0} relate to {1} when studying {2} {3}?",
+    "Why is {0} important for understanding {1} and {2} {3}?",
+    "Which statement about {0}, {1} and {2} {3} is correct?",
+    "What happens to {0} {1} if {2} increases in {3}?",
+    "Who first described the {0} {1} of {2} {3}?",
+    "In {0}, which {1} is used to measure {2} {3}?",
+    "What is the main difference between {0} {1} and {2} {3}?",
+    "Which of these is an example of {0} {1} in {2} {3}?",
+    "When was {0} {1} introduced to {2} {3}?",
+    "Which {0} {1} explains the {2} of {3}?",
+]
+
+
+def make_vocabulary(rng, size=50_000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def question(rng, words):
+    return rng.choice(TEMPLATES).format(*rng.sample(words, 4))
+
+
+def reword(rng, text):
+    """A light paraphrase: different casing and punctuation plus one filler word."""
+    filler = rng.choice(["exactly", "really", "mainly", "typically"])
+    words = text.rstrip("?").split()
+    words.insert(rng.randrange(1, len(words)), filler)
+    return " ".join(words).upper() + " ?"
+
+
+def sibling(rng, words, vocabulary, text):
+    """The same template with one of its filled-in words swapped for another."""
+    tokens = text.rstrip("?").replace(",", "").split()
+    swap = rng.choice([t for t in tokens if t in vocabulary])
+    return text.replace(swap, rng.choice(words), 1)
+
+
+def timed_ms(fn, args):
+    timings = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return timings.mean(), np.percentile(timings, 50), np.percentile(timings, 99), timings.max()
+
+
+def run():
+    rng = random.Random(11)
+    words = make_vocabulary(rng)
+    vocabulary = set(words)
+    index = NearDuplicateIndex()
+    texts = []
+
+    print(f"{'questions':>10} {'op':<16} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  result")
+    def insert(text):
+        index.add(len(texts), text)
+        texts.append(text)
+
+    for checkpoint in CHECKPOINTS:
+        # Every insert is timed, including those that merge the buffer into the sorted arrays
+        batch = [question(rng, words) for _ in range(checkpoint - len(texts))]
+        mean, p50, p99, worst = timed_ms(insert, batch)
+        print(f"{len(texts):>10,} {'insert':<16} {mean:>8.3f} {p50:>8.3f} {p99:>8.3f} {worst:>8.3f}  index {index.stats()['bytes'] / 1e6:.0f} MB, {index.stats()['runs']} runs")
+
+        picked = rng.sample(range(len(texts)), PROBES)
+        hits = []
+        mean, p50, p99, worst = timed_ms(lambda i: hits.append(index.find(reword(rng, texts[i])) is not None), picked)
+        print(f"{'':>10} {'lookup reworded':<16} {mean:>8.3f} {p50:>8.3f} {p99:>8.3f} {worst:>8.3f}  recall {sum(hits) / PROBES:.1%}")
+
+        fresh = [question(rng, words) for _ in range(PROBES)]
+        false = []
+        mean, p50, p99, worst = timed_ms(lambda t: false.append(index.find(t) is not None), fresh)
+        print(f"{'':>10} {'lookup new':<16} {mean:>8.3f} {p50:>8.3f} {p99:>8.3f} {worst:>8.3f}  false positives {sum(false) / PROBES:.1%}")
+
+        siblings = [sibling(rng, words, vocabulary, texts[i]) for i in rng.sample(range(len(texts)), PROBES)]
+        false = []
+        mean, p50, p99, worst = timed_ms(lambda t: false.append(index.find(t) is not None), siblings)
+        print(f"{'':>10} {'lookup sibling':<16} {mean:>8.3f} {p50:>8.3f} {p99:>8.3f} {worst:>8.3f}  false positives {sum(false) / PROBES:.1%}")
+
+
+if __name__ == "__main__":
+    run()
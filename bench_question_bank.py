@@ -0,0 +1,88 @@
+"""
+Question bank benchmark on SQLite: latency of POST /api/quiz/generate when the bank
+already holds enough questions for the topic (no LLM call), against a stub LLM with
+a fixed per-request latency standing in for a real generation.
+
+Usage: python bench_question_bank.py [topics] [questions_per_topic] [llm_latency_s]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Use a throwaway SQLite file so the benchmark never touches the real database
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench_question_bank.db')}"
+
+import httpx
+
+import main
+from database import engine, Base, BankQuestion, dispose_engines
+from stub_llm import StubLLM
+from utils.question_bank import question_hash, topic_key
+
+TOPICS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+PER_TOPIC = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+LLM_LATENCY = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+REQUESTS = 300
+LLM_REQUESTS = 5
+
+
+def seed():
+    rows = []
+    for t in range(TOPICS):
+        topic = f"Topic {t}"
+        for i in range(PER_TOPIC):
+            question = {"question": f"{topic} banked question {i}?", "options": ["A) One", "B) Two", "C) Three", "D) Four"], "correct_answer": "ABCD"[i % 4]}
+            rows.append({
+                "topic_key": topic_key(topic), "topic": topic, "difficulty": "medium", **question,
+                "explanation": f"Explanation {i}", "content_hash": question_hash(topic, "medium", question),
+                "times_served": 0, "times_answered": 0, "times_correct": 0
+            })
+    with engine.begin() as conn:
+        conn.execute(BankQuestion.__table__.insert(), rows)
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return timings[len(timings) // 2] * 1000, timings[int(len(timings) * 0.99) - 1] * 1000
+
+
+async def timed_requests(client, count, topic_for):
+    timings = []
+    for i in range(count):
+        start = time.perf_counter()
+        response = await client.post("/api/quiz/generate", json={"topic": topic_for(i), "num_questions": 10, "session_id": f"student-{i}"})
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return timings
+
+
+async def run():
+    Base.metadata.create_all(bind=engine)
+    seed()
+    stub = StubLLM(latency=LLM_LATENCY)
+    main.get_llm = lambda *args, **kwargs: stub
+    rng = random.Random(5)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        banked = await timed_requests(client, REQUESTS, lambda i: f"Topic {rng.randrange(TOPICS)}")
+        assert stub.calls == 0
+        generated = await timed_requests(client, LLM_REQUESTS, lambda i: f"Unbanked topic {i}")
+    await main.db_writer.stop()
+    await dispose_engines()
+
+    print(f"{TOPICS * PER_TOPIC:,} banked questions ({TOPICS} topics x {PER_TOPIC}), 10-question quizzes\n")
+    print(f"{'source':<26} {'requests':>8} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    p50, p99 = percentiles(banked)
+    print(f"{'question bank':<26} {REQUESTS:>8} {p50:>10.1f} {p99:>10.1f}")
+    p50, p99 = percentiles(generated)
+    print(f"{f'LLM (stub, {LLM_LATENCY:g}s)':<26} {LLM_REQUESTS:>8} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -13,10 +13,14 @@ required_modules = [
     "fastapi",
     "uvicorn",
     "sqlalchemy",
+    "greenlet",
+    "aiosqlite",
+    "aiomysql",
     "pymysql",
     "dotenv",
     "langchain_groq",
-    "duckduckgo_search"
+    "duckduckgo_search",
+    "numpy"
 ]
 
 print("Checking dependencies...")
@@ -57,7 +57,8 @@ def check_dependencies():
         "duckduckgo_search": "duckduckgo-search",
         "langchain_groq": "langchain-groq",
         "langchain_core": "langchain-core",
-        "pydantic": "pydantic"
+        "pydantic": "pydantic",
+        "numpy": "numpy"
     }
     
     missing = []
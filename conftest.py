@@ -0,0 +1,21 @@
+"""
+Shared test infrastructure for every test module, independent of any one feature.
+Every test module runs against one throwaway SQLite file, set here before any module
+imports `database`, so no test ever touches the real database, whatever order the
+modules are collected in.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_tmpdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    # The app only creates its schema at startup when asked to (DB_INIT_SCHEMA), so create it here
+    from database import Base, engine
+    Base.metadata.create_all(bind=engine)
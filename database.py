@@ -1,8 +1,17 @@
+import asyncio
 import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, ForeignKey, Float
+from sqlalchemy import create_engine, event, func, inspect, select, text, Column, Integer, String, Text, Date, DateTime, JSON, ForeignKey, Float, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, relationship
 from dotenv import load_dotenv
 
@@ -25,16 +34,299 @@ else:
         f"@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}?charset=utf8mb4"
     )
 
-print(f"Connecting to database: {DATABASE_URL.split('@')[-1]}")
+# Used when DATABASE_URL does not answer the startup probe; set it empty to fail startup instead
+DATABASE_FALLBACK_URL = os.getenv("DATABASE_FALLBACK_URL", "sqlite:///./eduai.db")
+# Seconds the startup probe waits for the database before giving up on it
+DATABASE_CONNECT_TIMEOUT = float(os.getenv("DATABASE_CONNECT_TIMEOUT", "5"))
 
-try:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-except Exception as e:
-    print(f"Error creating engine: {e}")
-    DATABASE_URL = "sqlite:///./eduai.db"
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def async_database_url(url):
+    """Same database through an asyncio driver: aiosqlite, asyncmy (or aiomysql), asyncpg."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "mysql":
+        try:
+            import asyncmy  # noqa: F401
+            return url.set(drivername="mysql+asyncmy")
+        except ImportError:
+            return url.set(drivername="mysql+aiomysql")
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+# Applied to every SQLite connection. WAL lets readers run alongside the single writer.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"), # With WAL, fsync only at checkpoints
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"), # Negative is KiB: 64 MB page cache
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": "MEMORY",
+}
+
+
+def tune_sqlite(sync_engine, begin="BEGIN", query_only=False):
+    """Set SQLITE_PRAGMAS on connect and have SQLAlchemy, not the driver, open transactions."""
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Driver autocommit: the "begin" hook below is then the only BEGIN, and SAVEPOINTs nest correctly
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql(begin)
+
+
+# Sync sessions: maintenance scripts (migrate_db.py, fix_db.py, force_init_db.py) and tests.
+# Async sessions: everything the API does at request time. Writes go through the write
+# engine (utils/db_writer.py), reads through the read engine.
+# expire_on_commit=False: attributes read after a commit must not trigger lazy IO outside an await
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+
+def use_database(url, async_url=None):
+    """
+    Create the engines for url and bind the session factories to them. Engines connect
+    lazily, so this never fails on an unreachable server: connect_database() checks that.
+    """
+    global DATABASE_URL, IS_SQLITE, engine, async_engine, async_read_engine
+    print(f"Connecting to database: {url.split('@')[-1]}")
+    DATABASE_URL = url
+    IS_SQLITE = make_url(url).get_backend_name() == "sqlite"
+    async_url = async_url or async_database_url(url)
+
+    engine = create_engine(url, pool_pre_ping=True)
+    if IS_SQLITE:
+        tune_sqlite(engine)
+        # One write connection: SQLite has a single writer, waiting for the pool beats "database is locked".
+        # BEGIN IMMEDIATE takes the write lock up front instead of failing to upgrade mid-transaction.
+        async_engine = create_async_engine(async_url, pool_size=1, max_overflow=0, pool_timeout=60)
+        tune_sqlite(async_engine.sync_engine, begin="BEGIN IMMEDIATE")
+        async_read_engine = create_async_engine(
+            async_url, pool_size=int(os.getenv("SQLITE_READ_POOL", "8")), max_overflow=0, pool_timeout=60
+        )
+        tune_sqlite(async_read_engine.sync_engine, query_only=True)
+    else:
+        async_engine = create_async_engine(async_url, pool_pre_ping=True)
+        async_read_engine = async_engine
+
+    SessionLocal.configure(bind=engine)
+    AsyncSessionLocal.configure(bind=async_engine)
+    AsyncReadSessionLocal.configure(bind=async_read_engine)
+
+
+use_database(DATABASE_URL, os.getenv("ASYNC_DATABASE_URL"))
+
+# Optional read replica for the read-only endpoints (progress, history, flashcard sets).
+# Locally, a copy of a SQLite file works: DATABASE_READ_URL=sqlite:///./eduai_replica.db
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+if DATABASE_READ_URL:
+    print(f"Read replica: {DATABASE_READ_URL.split('@')[-1]}")
+    if make_url(DATABASE_READ_URL).get_backend_name() == "sqlite":
+        async_replica_engine = create_async_engine(
+            async_database_url(DATABASE_READ_URL),
+            pool_size=int(os.getenv("SQLITE_READ_POOL", "8")), max_overflow=0, pool_timeout=60
+        )
+        tune_sqlite(async_replica_engine.sync_engine, query_only=True)
+    else:
+        async_replica_engine = create_async_engine(async_database_url(DATABASE_READ_URL), pool_pre_ping=True)
+    AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+
+
+class MemoryStickyStore:
+    """Last write time per session, in this process only: enough for a single worker."""
+
+    def __init__(self):
+        self._written = OrderedDict() # session_id -> monotonic time of last write, oldest first
+
+    def mark(self, session_id, sticky_seconds):
+        now = time.monotonic()
+        self._written.pop(session_id, None)
+        self._written[session_id] = now
+        # Entries are in write order, so expired ones are all at the front
+        while self._written:
+            oldest, at = next(iter(self._written.items()))
+            if now - at < sticky_seconds:
+                break
+            del self._written[oldest]
+
+    def is_recent(self, session_id, sticky_seconds):
+        at = self._written.get(session_id)
+        return at is not None and time.monotonic() - at < sticky_seconds
+
+    def __len__(self):
+        return len(self._written)
+
+
+class SQLiteStickyStore:
+    """
+    Last write time per session in a SQLite file shared by every worker process on the
+    host, so a read that lands on another worker than the write still sees it.
+    mark() and is_recent() never wait on the file: marks are kept in process and handed
+    to a background thread, which writes them and every refresh_interval seconds reloads
+    the recent marks of all workers. Another worker's write is seen at most
+    refresh_interval later.
+    """
+
+    PRUNE_EVERY = 100 # Writes between deletes of expired rows
+
+    def __init__(self, path="./read_sticky.db", refresh_interval=0.1):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._own = MemoryStickyStore()
+        self._shared = {} # session_id -> written_at of recent marks in the file, replaced on every reload
+        self._window = 5.0 # Longest sticky_seconds asked for: how far back a reload reads
+        self._pending = queue.SimpleQueue()
+        self._marks = 0
+        # Handed to the background thread once the table exists
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS sticky (session_id TEXT PRIMARY KEY, written_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sticky_written_at ON sticky (written_at)")
+        conn.commit()
+        self._sync(conn)
+        threading.Thread(target=self._run, args=(conn,), name="sticky-store", daemon=True).start()
+
+    def mark(self, session_id, sticky_seconds):
+        self._window = max(self._window, sticky_seconds)
+        self._own.mark(session_id, sticky_seconds)
+        self._pending.put((session_id, time.time()))
+
+    def is_recent(self, session_id, sticky_seconds):
+        if self._own.is_recent(session_id, sticky_seconds):
+            return True
+        at = self._shared.get(session_id)
+        return at is not None and time.time() - at < sticky_seconds
+
+    def _run(self, conn):
+        while True:
+            marks = []
+            try:
+                marks.append(self._pending.get(timeout=self.refresh_interval))
+                while True:
+                    marks.append(self._pending.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self._sync(conn, marks)
+            except sqlite3.Error as e:
+                print(f"Error sharing read routing marks: {e}")
+
+    def _sync(self, conn, marks=()):
+        now = time.time()
+        if marks:
+            conn.executemany("INSERT OR REPLACE INTO sticky (session_id, written_at) VALUES (?, ?)", marks)
+            previous, self._marks = self._marks, self._marks + len(marks)
+            if previous // self.PRUNE_EVERY != self._marks // self.PRUNE_EVERY:
+                conn.execute("DELETE FROM sticky WHERE written_at < ?", (now - self._window,))
+            conn.commit()
+        self._shared = dict(conn.execute("SELECT session_id, written_at FROM sticky WHERE written_at >= ?", (now - self._window,)).fetchall())
+
+    def __len__(self):
+        return len(self._shared.keys() | self._own._written.keys())
+
+
+class ReadRouter:
+    """
+    Chooses where a read-only request for a session goes: the replica, unless that
+    session wrote within the last sticky_seconds, in which case the primary, so
+    replication lag never hides a student's own quiz, score or message.
+    Writers record themselves with mark_written(session_id) once their commit is done.
+    Write times live in `store`: in memory by default, which only covers one worker;
+    with several workers use a SQLiteStickyStore so they all see each other's writes.
+    """
+
+    def __init__(self, primary, replica=None, sticky_seconds=5.0, store=None):
+        self.primary = primary
+        self.replica = replica
+        self.sticky_seconds = sticky_seconds
+        self.store = store if store is not None else MemoryStickyStore()
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def mark_written(self, session_id):
+        if self.replica is None or not session_id:
+            return
+        self.store.mark(session_id, self.sticky_seconds)
+
+    def is_sticky(self, session_id):
+        return self.store.is_recent(session_id, self.sticky_seconds)
+
+    def session(self, session_id=None):
+        if self.replica is None or (session_id and self.is_sticky(session_id)):
+            self.primary_reads += 1
+            return self.primary()
+        self.replica_reads += 1
+        return self.replica()
+
+    def stats(self):
+        return {
+            "replica": self.replica is not None,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_sessions": len(self.store)
+        }
+
+
+# With several workers, READ_STICKY_PATH shares write times through a SQLite file on the host
+READ_STICKY_PATH = os.getenv("READ_STICKY_PATH")
+read_router = ReadRouter(
+    AsyncReadSessionLocal,
+    AsyncReplicaSessionLocal,
+    sticky_seconds=float(os.getenv("READ_STICKY_SECONDS", "5")),
+    store=SQLiteStickyStore(READ_STICKY_PATH) if READ_STICKY_PATH and AsyncReplicaSessionLocal is not None else None
+)
+
+
+async def dispose_engines():
+    """Close pooled async connections (shutdown, or before switching event loops)."""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+
+
+async def ping_database(timeout=DATABASE_CONNECT_TIMEOUT):
+    """Open a connection and run SELECT 1, giving up after timeout seconds."""
+    async def ping():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.wait_for(ping(), timeout)
+
+
+async def connect_database(timeout=DATABASE_CONNECT_TIMEOUT, fallback_url=DATABASE_FALLBACK_URL):
+    """
+    Startup check, so an unreachable server fails in seconds instead of hanging the first
+    request. Switches to fallback_url when the database does not answer (if one is set and
+    it is not the same database); returns True if it did.
+    """
+    try:
+        await ping_database(timeout)
+        return False
+    except Exception as e:
+        if not fallback_url or fallback_url == DATABASE_URL:
+            raise
+        reason = f"no answer in {timeout:g}s" if isinstance(e, asyncio.TimeoutError) else e
+        print(f"[WARNING] Database unreachable ({reason}), falling back to {fallback_url.split('@')[-1]}")
+    await dispose_engines()
+    use_database(fallback_url)
+    await ping_database(timeout)
+    return True
 
 Base = declarative_base()
 
@@ -48,6 +340,39 @@ class ChatHistory(Base):
     role = Column(String(50)) # "user" or "ai"
     content = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    token = Column(String(32)) # Per message, so readers can tell a flushed message from its buffered copy
+
+    __table_args__ = (
+        Index("ix_chat_history_session_created", "session_id", "created_at"),
+        Index("ix_chat_history_session_id_id", "session_id", "id"), # Keyset pagination of history
+        # Archiving deletes the newest rows of cold sessions; ids must never be handed out
+        # again, archive paging and rolling summaries rely on them only growing
+        {"sqlite_autoincrement": True},
+    )
+
+class ChatArchiveBlock(Base):
+    """Archived chat_history rows of one session, oldest first, compressed together (utils/chat_archive.py)."""
+    __tablename__ = "chat_archive_blocks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(255))
+    first_id = Column(Integer) # chat_history ids covered, inclusive
+    last_id = Column(Integer)
+    message_count = Column(Integer)
+    first_at = Column(DateTime)
+    last_at = Column(DateTime)
+    payload = Column(LargeBinary(length=2**24)) # zlib-compressed JSON [[id, role, content, created_at], ...]
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_chat_archive_session_first", "session_id", "first_id"),)
+
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+
+    session_id = Column(String(255), primary_key=True)
+    summary = Column(Text) # Rolling summary of every turn up to last_message_id
+    last_message_id = Column(Integer) # Newest ChatHistory.id folded into the summary
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 class Quiz(Base):
     __tablename__ = "quizzes"
@@ -57,11 +382,16 @@ class Quiz(Base):
     difficulty = Column(String(50))
     title = Column(String(255))
     questions = Column(JSON) # Store questions as JSON
+    answer_key = Column(JSON) # [[question id, option letter], ...] for grading without loading questions
+    answer_details = Column(JSON) # [[question text, correct answer, explanation], ...] in key order, for results
+    bank_ids = Column(JSON) # question_bank id of each question, in order (null for freshly generated ones)
     session_id = Column(String(255), index=True) # Added session_id
     created_at = Column(DateTime, default=datetime.utcnow)
     
     scores = relationship("QuizScore", back_populates="quiz")
 
+    __table_args__ = (Index("ix_quizzes_session_created", "session_id", "created_at"),)
+
 class QuizScore(Base):
     __tablename__ = "quiz_scores"
 
@@ -76,16 +406,51 @@ class QuizScore(Base):
 
     quiz = relationship("Quiz", back_populates="scores")
 
+    __table_args__ = (Index("ix_quiz_scores_session_created", "session_id", "created_at"),)
+
 class FlashcardSet(Base):
     __tablename__ = "flashcard_sets"
 
     id = Column(String(50), primary_key=True, index=True) # UUID (increased to 50)
     topic = Column(String(255))
     title = Column(String(255))
-    cards = Column(JSON)
+    cards = Column(JSON) # Legacy inline cards, new sets use card_hashes
+    card_hashes = Column(JSON) # Ordered references into flashcard_cards
+    content_key = Column(String(64), index=True) # Hash of normalized (topic, num_cards)
     session_id = Column(String(255), index=True) # Creator
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (Index("ix_flashcard_sets_session_created", "session_id", "created_at"),)
+
+class FlashcardCard(Base):
+    __tablename__ = "flashcard_cards"
+
+    hash = Column(String(64), primary_key=True) # sha256 of the normalized card body
+    front = Column(Text)
+    back = Column(Text)
+    hint = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BankQuestion(Base):
+    """A reusable quiz question (utils/question_bank.py): quizzes are assembled from these without the LLM."""
+    __tablename__ = "question_bank"
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic_key = Column(String(255)) # Normalized topic the bank is indexed by
+    topic = Column(String(255)) # As first requested
+    difficulty = Column(String(50))
+    question = Column(Text)
+    options = Column(JSON) # ["A) ...", "B) ...", ...]
+    correct_answer = Column(String(10)) # Option letter
+    explanation = Column(Text)
+    content_hash = Column(String(64), unique=True) # sha256 of topic key, difficulty and normalized question text
+    times_served = Column(Integer, default=0)
+    times_answered = Column(Integer, default=0)
+    times_correct = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_question_bank_topic", "topic_key", "difficulty", "times_served"),)
+
 class Topic(Base):
     __tablename__ = "topics"
 
@@ -94,10 +459,84 @@ class Topic(Base):
     name = Column(String(255))
     last_studied = Column(DateTime, default=datetime.utcnow)
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+    # One row per topic per session, touch_topic upserts against it
+    __table_args__ = (Index("uq_topics_session_name", "session_id", "name", unique=True),)
+
+class ProgressSummary(Base):
+    __tablename__ = "progress_summary"
+
+    session_id = Column(String(255), primary_key=True)
+    quiz_count = Column(Integer, default=0)
+    score_sum = Column(Float, default=0.0) # Running sum of QuizScore.score, average = score_sum / quiz_count
+    flashcard_sets = Column(Integer, default=0)
+    streak_days = Column(Integer, default=0) # Consecutive days with a quiz, ending at last_quiz_date
+    last_quiz_date = Column(Date)
+    last_activity_at = Column(DateTime)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(50), primary_key=True, index=True)
+    kind = Column(String(50)) # "quiz" or "flashcards"
+    status = Column(String(20), index=True) # queued, running, done, failed
+    payload = Column(JSON) # Original request body
+    result = Column(JSON)
+    error = Column(Text)
+    session_id = Column(String(255), index=True)
+    owner = Column(String(64)) # Worker process running the job (see JobQueue)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow) # Refreshed by the owner while running
+
+# Bump together with a migrate_db.py change whenever the models change
+SCHEMA_VERSION = 7
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+def stamp_schema(conn):
+    """Record SCHEMA_VERSION on a sync connection, inside the caller's transaction."""
+    if not conn.scalar(select(func.count()).select_from(SchemaVersion).where(SchemaVersion.version == SCHEMA_VERSION)):
+        conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION, applied_at=datetime.utcnow()))
+
+
+def _create_schema(conn):
+    fresh = not inspect(conn).get_table_names()
+    Base.metadata.create_all(conn)
+    if fresh:
+        stamp_schema(conn)
+
+
+async def create_schema():
+    """
+    Create missing tables. Only an empty database is stamped with SCHEMA_VERSION: existing
+    tables are not altered, so older databases still need migrate_db.py.
+    """
+    async with async_engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+
+
+async def current_schema_version():
+    """Newest version recorded in schema_version, None if the database predates versioning."""
+    async with AsyncReadSessionLocal() as db:
+        try:
+            return await db.scalar(select(func.max(SchemaVersion.version)))
+        except (OperationalError, ProgrammingError):
+            return None
+
+# Dependencies
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+async def get_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def get_replica_db(session_id: Optional[str] = None):
+    """Read-only endpoints: the replica when configured, the primary right after the session's own writes."""
+    async with read_router.session(session_id) as db:
+        yield db
\ No newline at end of file
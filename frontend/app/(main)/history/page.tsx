@@ -8,6 +8,8 @@ import { motion } from 'framer-motion';
 export default function HistoryPage() {
     const [sessionId, setSessionId] = useState<string | null>(null);
     const [history, setHistory] = useState<any[]>([]);
+    const [nextBeforeId, setNextBeforeId] = useState<number | null>(null);
+    const [loadingOlder, setLoadingOlder] = useState(false);
     const [recentQuizzes, setRecentQuizzes] = useState<any[]>([]);
     const [loading, setLoading] = useState(true);
 
@@ -22,7 +24,8 @@ export default function HistoryPage() {
                     getProgress(id)
                 ]);
 
-                setHistory(chatHist);
+                setHistory(chatHist.history);
+                setNextBeforeId(chatHist.hasMore ? chatHist.nextBeforeId : null);
                 setRecentQuizzes(progress.recent_quizzes || []);
             } catch (error) {
                 console.error('Failed to load history:', error);
@@ -33,6 +36,20 @@ export default function HistoryPage() {
         init();
     }, []);
 
+    const loadOlder = async () => {
+        if (!sessionId || nextBeforeId === null || loadingOlder) return;
+        setLoadingOlder(true);
+        try {
+            const page = await getChatHistory(sessionId, nextBeforeId);
+            setHistory(prev => [...page.history, ...prev]);
+            setNextBeforeId(page.hasMore ? page.nextBeforeId : null);
+        } catch (error) {
+            console.error('Failed to load older messages:', error);
+        } finally {
+            setLoadingOlder(false);
+        }
+    };
+
     if (loading) {
         return (
             <div className="flex items-center justify-center min-h-[60vh]">
@@ -79,7 +96,17 @@ export default function HistoryPage() {
                                 <p>No chat history yet.</p>
                             </div>
                         ) : (
-                            history.map((msg, idx) => (
+                            <>
+                            {nextBeforeId !== null && (
+                                <button
+                                    onClick={loadOlder}
+                                    disabled={loadingOlder}
+                                    className="w-full py-2 rounded-xl text-sm font-medium text-indigo-500 bg-indigo-500/10 hover:bg-indigo-500/20 transition-all disabled:opacity-50"
+                                >
+                                    {loadingOlder ? 'Loading...' : 'Load older messages'}
+                                </button>
+                            )}
+                            {history.map((msg, idx) => (
                                 <div key={idx} className={`flex gap-4 ${msg.role === 'user' ? 'flex-row-reverse' : ''}`}>
                                     <div className={`w-8 h-8 rounded-full flex items-center justify-center shrink-0 text-xs font-bold ${msg.role === 'user' ? 'bg-indigo-500 text-white' : 'bg-emerald-500 text-white'
                                         }`}>
@@ -97,7 +124,8 @@ export default function HistoryPage() {
                                         <p className="text-sm leading-relaxed whitespace-pre-wrap">{msg.content}</p>
                                     </div>
                                 </div>
-                            ))
+                            ))}
+                            </>
                         )}
                     </div>
                 </motion.div>
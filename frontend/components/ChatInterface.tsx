@@ -3,7 +3,7 @@
 import React, { useState, useEffect, useRef, useLayoutEffect } from 'react';
 import { Send, User, Bot, Loader2, Trash2, History, MessageSquare, Menu, X } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
-import { sendMessage, ChatMessage, getChatHistory } from '@/lib/api';
+import { streamMessage, ChatMessage, getChatHistory } from '@/lib/api';
 import ReactMarkdown from 'react-markdown';
 
 interface ChatInterfaceProps { sessionId: string; }
@@ -28,7 +28,7 @@ export default function ChatInterface({ sessionId }: ChatInterfaceProps) {
 
     const loadChatHistory = async () => {
         setChatSessions([{ id: sessionId, created_at: new Date().toISOString(), preview: 'Current Chat' }]);
-        const history = await getChatHistory(sessionId);
+        const { history } = await getChatHistory(sessionId);
         if (history?.length) setMessages(history);
     };
 
@@ -40,10 +40,21 @@ export default function ChatInterface({ sessionId }: ChatInterfaceProps) {
         setInput('');
         setIsLoading(true);
 
+        let started = false;
         try {
-            const res = await sendMessage(input, sessionId, messages);
-            const aiMessage: ChatMessage = { role: 'ai', content: res.response };
-            setMessages(prev => [...prev, aiMessage]);
+            await streamMessage(input, sessionId, messages, token => {
+                if (!started) {
+                    // First token: swap the typing indicator for the reply bubble
+                    started = true;
+                    setIsLoading(false);
+                    setMessages(prev => [...prev, { role: 'ai', content: token }]);
+                    return;
+                }
+                setMessages(prev => {
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, content: last.content + token }];
+                });
+            });
         } catch {
             setMessages(prev => [...prev, { role: 'ai', content: '⚠️ Error — Try again.' }]);
         } finally {
@@ -1,7 +1,7 @@
 'use client';
 
 import React, { useState } from 'react';
-import { generateQuiz, submitQuiz } from '@/lib/api';
+import { streamQuiz, submitQuiz } from '@/lib/api';
 import { Loader2, CheckCircle, XCircle, Trophy, ArrowRight, BookOpen, AlertCircle, Star, Target, Zap } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 
@@ -18,6 +18,7 @@ export default function QuizComponent({ sessionId }: QuizComponentProps) {
     const [quiz, setQuiz] = useState<any>(null);
     const [result, setResult] = useState<any>(null);
     const [loading, setLoading] = useState(false);
+    const [generating, setGenerating] = useState(false); // Questions still streaming in
     const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0);
     const [error, setError] = useState<string | null>(null);
 
@@ -32,22 +33,39 @@ export default function QuizComponent({ sessionId }: QuizComponentProps) {
         if (!topic.trim()) return;
         setLoading(true);
         setState('thinking');
+        // Reset states
+        setQuiz(null);
+        setResult(null);
+        setCurrentQuestionIndex(0);
+        setScoreCount(0);
+        setAnswersMap({});
+        resetQuestionState();
+        setGenerating(true);
+
+        let meta: any = {};
+        let started = false;
         try {
-            const data = await generateQuiz(topic, difficulty, 5, sessionId);
-            setQuiz(data);
-            // Reset states
-            setResult(null);
-            setCurrentQuestionIndex(0);
-            setScoreCount(0);
-            setAnswersMap({});
-            resetQuestionState();
-
-            setState('idle');
+            const summary = await streamQuiz(topic, difficulty, 5, sessionId, {
+                onMeta: data => { meta = data; },
+                onQuestion: question => {
+                    if (!started) {
+                        // Show the first question while the rest are still being generated
+                        started = true;
+                        setQuiz({ ...meta, title: `${topic} Quiz`, questions: [question] });
+                        setLoading(false);
+                        setState('idle');
+                        return;
+                    }
+                    setQuiz((prev: any) => ({ ...prev, questions: [...prev.questions, question] }));
+                }
+            });
+            if (summary) setQuiz((prev: any) => prev && { ...prev, title: summary.title });
         } catch (error) {
             console.error('Failed to generate quiz:', error);
             setState('sad');
             setTimeout(() => setState('idle'), 3000);
         } finally {
+            setGenerating(false);
             setLoading(false);
         }
     };
@@ -118,6 +136,9 @@ export default function QuizComponent({ sessionId }: QuizComponentProps) {
     };
 
     const handleNext = () => {
+        // Wait for the next question to arrive rather than finishing early
+        if (generating && currentQuestionIndex === (quiz?.questions.length || 0) - 1) return;
+
         if (currentQuestionIndex < (quiz?.questions.length || 0) - 1) {
             setCurrentQuestionIndex(prev => prev + 1);
             resetQuestionState();
@@ -323,10 +344,15 @@ export default function QuizComponent({ sessionId }: QuizComponentProps) {
                     {isAnswered && (
                         <button
                             onClick={handleNext}
-                            className="px-10 py-4 bg-white text-indigo-900 hover:bg-indigo-50 rounded-2xl font-bold text-lg transition-all shadow-lg shadow-white/10 flex items-center gap-2 hover:scale-105 active:scale-95"
+                            disabled={generating && currentQuestionIndex === totalQ - 1}
+                            className="px-10 py-4 bg-white text-indigo-900 hover:bg-indigo-50 rounded-2xl font-bold text-lg transition-all shadow-lg shadow-white/10 flex items-center gap-2 hover:scale-105 active:scale-95 disabled:opacity-60 disabled:cursor-wait disabled:hover:scale-100"
                         >
-                            {currentQuestionIndex === totalQ - 1 ? 'Finish Quiz' : 'Next Question'}
-                            <ArrowRight className="w-5 h-5" />
+                            {generating && currentQuestionIndex === totalQ - 1
+                                ? 'Generating Next Question...'
+                                : currentQuestionIndex === totalQ - 1 ? 'Finish Quiz' : 'Next Question'}
+                            {generating && currentQuestionIndex === totalQ - 1
+                                ? <Loader2 className="w-5 h-5 animate-spin" />
+                                : <ArrowRight className="w-5 h-5" />}
                         </button>
                     )}
                 </div>
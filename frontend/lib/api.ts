@@ -14,6 +14,12 @@ export interface ChatMessage {
   content: string;
 }
 
+export interface ChatHistoryPage {
+  history: any[];
+  hasMore: boolean;
+  nextBeforeId: number | null;
+}
+
 export const createSession = async (): Promise<string> => {
   if (typeof window !== 'undefined' && localStorage.getItem('eduai_session_id')) {
     return localStorage.getItem('eduai_session_id') as string;
@@ -45,9 +51,82 @@ export const sendMessage = async (message: string, sessionId: string, history: C
   return response.data;
 };
 
-export const getChatHistory = async (sessionId: string) => {
-  const response = await api.get(`/chat/history/${sessionId}`);
-  return response.data.history;
+// Reads a server-sent event stream, calling onEvent(event, payload) for every frame.
+const readSSE = async (response: Response, onEvent: (event: string, payload: any) => boolean | void) => {
+  if (!response.ok || !response.body) {
+    throw new Error(`Stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE frames are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'error') throw new Error(payload.detail);
+      // Returning true stops reading
+      if (onEvent(event, payload)) return;
+    }
+  }
+};
+
+// Streams the tutor reply over SSE from /chat/stream, calling onToken for every chunk.
+// Resolves with the full reply once the server sends the "done" event.
+export const streamMessage = async (
+  message: string,
+  sessionId: string,
+  history: ChatMessage[],
+  onToken: (token: string) => void,
+  signal?: AbortSignal
+): Promise<string> => {
+  const response = await fetch(`${API_URL}/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      messages: [...history, { role: 'user', content: message }],
+      session_id: sessionId
+    }),
+    signal
+  });
+
+  let reply = '';
+  await readSSE(response, (event, payload) => {
+    if (event === 'done') return true;
+    reply += payload.token;
+    onToken(payload.token);
+  });
+  return reply;
+};
+
+// Newest page of messages (oldest -> newest); pass nextBeforeId back as beforeId for the page before it
+export const getChatHistory = async (sessionId: string, beforeId?: number | null, limit?: number): Promise<ChatHistoryPage> => {
+  const response = await api.get(`/chat/history/${sessionId}`, {
+    params: { before_id: beforeId ?? undefined, limit }
+  });
+  return {
+    history: response.data.history,
+    hasMore: response.data.has_more,
+    nextBeforeId: response.data.next_before_id
+  };
 };
 
 export const generateQuiz = async (topic: string, difficulty: string, numQuestions: number, sessionId: string) => {
@@ -60,6 +139,39 @@ export const generateQuiz = async (topic: string, difficulty: string, numQuestio
   return response.data;
 };
 
+// Streams quiz generation from /quiz/generate/stream. onMeta fires first with the quiz id,
+// onQuestion once per question as soon as the server has parsed it.
+// Resolves with the "done" payload (title, total) after the quiz is saved.
+export const streamQuiz = async (
+  topic: string,
+  difficulty: string,
+  numQuestions: number,
+  sessionId: string,
+  handlers: { onMeta?: (meta: any) => void; onQuestion: (question: any) => void }
+) => {
+  const response = await fetch(`${API_URL}/quiz/generate/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      topic,
+      difficulty,
+      num_questions: numQuestions,
+      session_id: sessionId
+    })
+  });
+
+  let summary: any = null;
+  await readSSE(response, (event, payload) => {
+    if (event === 'meta') handlers.onMeta?.(payload);
+    else if (event === 'question') handlers.onQuestion(payload);
+    else if (event === 'done') {
+      summary = payload;
+      return true;
+    }
+  });
+  return summary;
+};
+
 export const submitQuiz = async (quizId: string, answers: Record<string, string>, sessionId: string) => {
   const response = await api.post('/quiz/submit', {
     quiz_id: quizId,
@@ -1,34 +1,229 @@
 import os
+import re
 import json
+import secrets
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, HTTPException, Depends
+# Cold-start clock: covers the imports below and the startup steps in lifespan()
+STARTED_AT = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 
 # third-party LLM / search imports
-from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from duckduckgo_search import DDGS
 
 # DB imports
-from sqlalchemy.orm import Session
-from database import engine, Base, get_db, Quiz, QuizScore, FlashcardSet, Topic, ChatHistory
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import database
+from database import SCHEMA_VERSION, connect_database, create_schema, current_schema_version, get_read_db, get_replica_db, read_router, AsyncSessionLocal, AsyncReadSessionLocal, dispose_engines, Quiz, QuizScore, FlashcardSet, Topic, ChatHistory, ProgressSummary
+
+from utils.llm_client import LLMClientRegistry
+from utils.json_stream import QuizStreamParser
+from utils.quiz_cache import QuizCache, MemoryCacheBackend, SQLiteCacheBackend, shuffle_quiz
+from utils.flashcard_store import content_key, find_reusable_set, load_cards, store_cards
+from utils.single_flight import SingleFlight
+from utils.jobs import JobQueue, TERMINAL_STATUSES
+from utils.fanout import FOCUS_ANGLES, focus_for, merge_items, split_count
+from utils.chat_summary import ConversationSummarizer
+from utils.web_search import SearchService
+from utils.progress import load_summary, rebuild_summary, record_flashcard_set, record_quiz_score
+from utils.topics import touch_topic
+from utils.db_writer import DatabaseWriter
+from utils.chat_log import ChatLog, ChatLogFull, merge_pending
+from utils.chat_archive import ChatArchiver, read_archive, stream_archive
+from utils.grading import answer_details, answer_key, grade, grade_batch
+from utils.session_export import InvalidExport, SessionImporter, export_ndjson, ndjson_records
+from utils.question_bank import ActivityMiddleware, BankDuplicates, QuestionReplenisher, mark_served, record_answers, sample_questions, store_questions, topic_key
+from utils.near_duplicates import NearDuplicateIndex, drop_near_duplicates
 
 # load env early
 load_dotenv()
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# Schema creation is opt-in (one deploy step, not every worker): otherwise run python migrate_db.py
+DB_INIT_SCHEMA = os.getenv("DB_INIT_SCHEMA", "false").lower() == "true"
+
+# Check API Key
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+if not GROQ_API_KEY:
+    print("[WARNING] GROQ_API_KEY not found! Some LLM calls may fail.")
+else:
+    print("[OK] GROQ_API_KEY loaded")
+
+# LLM client settings
+LLM_MODEL = os.getenv("LLM_MODEL", "openai/gpt-oss-120b")
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+
+llm_registry = LLMClientRegistry(api_key=GROQ_API_KEY, pool_size=LLM_POOL_SIZE)
+
+# Generated-quiz cache ("memory" per process, "sqlite" shared across workers)
+QUIZ_CACHE_BACKEND = os.getenv("QUIZ_CACHE_BACKEND", "memory").lower()
+QUIZ_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "1000"))
+QUIZ_CACHE_TTL = int(os.getenv("QUIZ_CACHE_TTL", "86400"))
+
+if QUIZ_CACHE_BACKEND == "sqlite":
+    quiz_cache_backend = SQLiteCacheBackend(os.getenv("QUIZ_CACHE_PATH", "./quiz_cache.db"), max_entries=QUIZ_CACHE_SIZE)
+else:
+    quiz_cache_backend = MemoryCacheBackend(max_entries=QUIZ_CACHE_SIZE)
+quiz_cache = QuizCache(quiz_cache_backend, ttl=QUIZ_CACHE_TTL)
+
+# Coalesces identical in-flight quiz and flashcard requests
+single_flight = SingleFlight()
+
+# Requests larger than this are split into parallel sub-prompts
+QUIZ_CHUNK_SIZE = int(os.getenv("QUIZ_CHUNK_SIZE", "5"))
+FLASHCARD_CHUNK_SIZE = int(os.getenv("FLASHCARD_CHUNK_SIZE", "10"))
+
+# All writes go through one writer task; batching groups concurrent writes into shared commits.
+# On by default for SQLite, which allows a single writer at a time.
+db_writer = DatabaseWriter(
+    AsyncSessionLocal,
+    batching=os.getenv("DB_WRITE_BATCHING", "true" if database.IS_SQLITE else "false").lower() == "true",
+    max_batch=int(os.getenv("DB_WRITE_BATCH_MAX", "200"))
+)
+
+# Chat messages are written behind: buffered and bulk-inserted every CHAT_FLUSH_MS or CHAT_FLUSH_BATCH
+# messages. CHAT_DURABILITY=sync commits each message before the request continues. While the
+# database refuses writes, flushes back off and chat requests get 503 once CHAT_BUFFER_MAX messages wait.
+chat_log = ChatLog(
+    db_writer,
+    durability=os.getenv("CHAT_DURABILITY", "batched").lower(),
+    max_batch=int(os.getenv("CHAT_FLUSH_BATCH", "100")),
+    flush_interval=int(os.getenv("CHAT_FLUSH_MS", "50")) / 1000,
+    max_buffer=int(os.getenv("CHAT_BUFFER_MAX", "10000"))
+)
+
+# Cold chat history: messages older than CHAT_ARCHIVE_AFTER_DAYS, or beyond the newest CHAT_ARCHIVE_KEEP
+# of a session, move to compressed blocks every CHAT_ARCHIVE_INTERVAL seconds (0 turns archiving off)
+chat_archiver = ChatArchiver(
+    db_writer,
+    max_age=timedelta(days=float(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "30"))),
+    keep_latest=int(os.getenv("CHAT_ARCHIVE_KEEP", "200")),
+    block_size=int(os.getenv("CHAT_ARCHIVE_BLOCK", "200")),
+    interval=int(os.getenv("CHAT_ARCHIVE_INTERVAL", "3600"))
+)
+
+# Chat prompt size: rolling summary + recent turns within a token budget
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+chat_summarizer = ConversationSummarizer(
+    llm_factory=lambda: get_llm(temperature=0.2, max_tokens=400),
+    writer=db_writer,
+    recent_turns=int(os.getenv("CHAT_RECENT_TURNS", "10")),
+    summarize_every=int(os.getenv("CHAT_SUMMARY_EVERY", "10"))
+)
+
+# Web search for the chat tutor: hard deadline, results cached by normalized query
+search_service = SearchService(
+    timeout=float(os.getenv("SEARCH_TIMEOUT", "3")),
+    ttl=int(os.getenv("SEARCH_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "500"))
+)
+
+# Chat history pages: default and largest page size, rows fetched per round trip when streaming
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+CHAT_HISTORY_MAX_PAGE = 500
+CHAT_HISTORY_STREAM_BATCH = 200
+
+# Session export/import: rows per server-side cursor fetch and per bulk INSERT.
+# Admin endpoints (bulk export/import of every session) need ADMIN_TOKEN in X-Admin-Token.
+EXPORT_FETCH_SIZE = 1000
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Near-duplicate questions (estimated shingle similarity at or above QUIZ_DEDUPE_THRESHOLD, same numbers,
+# no word of their own besides template wording) are dropped from generated quizzes, from the bank, and from a session's next quiz when they repeat
+# one of its QUIZ_DEDUPE_HISTORY latest quizzes on the same topic.
+QUIZ_DEDUPE_THRESHOLD = float(os.getenv("QUIZ_DEDUPE_THRESHOLD", "0.7"))
+QUIZ_DEDUPE_HISTORY = int(os.getenv("QUIZ_DEDUPE_HISTORY", "20"))
+bank_duplicates = BankDuplicates(threshold=QUIZ_DEDUPE_THRESHOLD)
+
+# Question bank: quizzes are assembled from stored questions and the LLM only writes the shortfall.
+# While no request is in flight, the most studied topics are topped up to QUESTION_BANK_TARGET
+# questions per difficulty every QUESTION_BANK_INTERVAL seconds (0 turns topping up off).
+QUESTION_BANK = os.getenv("QUESTION_BANK", "true").lower() == "true"
+question_replenisher = QuestionReplenisher(
+    db_writer,
+    generate=lambda *args: generate_bank_questions(*args), # defined with the generators below
+    target=int(os.getenv("QUESTION_BANK_TARGET", "30")),
+    difficulties=[d.strip() for d in os.getenv("QUESTION_BANK_DIFFICULTIES", "medium").split(",") if d.strip()],
+    interval=int(os.getenv("QUESTION_BANK_INTERVAL", "300")) if QUESTION_BANK else 0,
+    idle_after=int(os.getenv("QUESTION_BANK_IDLE_SECONDS", "30")),
+    topics_per_pass=int(os.getenv("QUESTION_BANK_TOPICS", "20")),
+    duplicates=bank_duplicates
+)
+
+# Classroom bulk submit: most submissions graded and saved in one request
+QUIZ_BATCH_MAX = int(os.getenv("QUIZ_BATCH_MAX", "1000"))
+
+# Background generation jobs (handlers are registered below the generators)
+job_queue = JobQueue(db_writer, workers=int(os.getenv("JOB_WORKERS", "4")))
+# Job event streams also re-read the job this often, for jobs run by another worker process
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "2"))
+
+# Milliseconds spent in each startup step, logged and reported by /api/health
+startup_timings: Dict[str, float] = {}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    phase = time.perf_counter()
+    startup_timings["import_ms"] = round((phase - STARTED_AT) * 1000, 1)
+
+    def lap(name):
+        nonlocal phase
+        now = time.perf_counter()
+        startup_timings[name] = round((now - phase) * 1000, 1)
+        phase = now
+
+    fell_back = await connect_database()
+    if fell_back and "DB_WRITE_BATCHING" not in os.environ:
+        db_writer.batching = database.IS_SQLITE
+    lap("database_ms")
+
+    # A fallback database is local and possibly empty, so it always gets its tables
+    if DB_INIT_SCHEMA or fell_back:
+        await create_schema()
+    version = await current_schema_version()
+    if version != SCHEMA_VERSION:
+        print(f"[WARNING] Database schema version is {version}, expected {SCHEMA_VERSION}: run python migrate_db.py")
+    lap("schema_ms")
+
+    if GROQ_API_KEY and LLM_WARMUP:
+        await llm_registry.warm_up(LLM_MODEL)
+    lap("llm_warmup_ms")
+
+    await job_queue.start()
+    chat_archiver.start()
+    if GROQ_API_KEY:
+        question_replenisher.start()
+    startup_timings["total_ms"] = round((time.perf_counter() - STARTED_AT) * 1000, 1)
+    print(
+        f"[OK] Started in {startup_timings['total_ms']:.0f} ms "
+        f"(imports {startup_timings['import_ms']:.0f}, database {startup_timings['database_ms']:.0f}, "
+        f"schema {startup_timings['schema_ms']:.0f}, LLM warm-up {startup_timings['llm_warmup_ms']:.0f})"
+    )
+    yield
+    await job_queue.stop()
+    await question_replenisher.stop()
+    await chat_archiver.stop()
+    await chat_log.drain()
+    await db_writer.stop()
+    await dispose_engines()
+    await llm_registry.aclose()
 
 # -----------------------
 # Create FastAPI app
 # -----------------------
-app = FastAPI(title="EduAI Backend")
+app = FastAPI(title="EduAI Backend", lifespan=lifespan)
 
 # CORS
 allowed_origins = os.getenv("CORS_ORIGINS", "*")
@@ -37,6 +232,9 @@ if allowed_origins == "*":
 else:
     origins = [o.strip() for o in allowed_origins.split(",")]
 
+# Lets the question bank replenisher wait for idle moments
+app.add_middleware(ActivityMiddleware, replenisher=question_replenisher)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -45,13 +243,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Check API Key
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    print("[WARNING] GROQ_API_KEY not found! Some LLM calls may fail.")
-else:
-    print("[OK] GROQ_API_KEY loaded")
-
 # -----------------------
 # Pydantic models
 # -----------------------
@@ -68,134 +259,335 @@ class QuizRequest(BaseModel):
     difficulty: str = "medium"
     num_questions: int = 5
     session_id: str
+    background: bool = False # Return a job id immediately instead of waiting for the quiz
 
 class QuizSubmission(BaseModel):
     quiz_id: str
     answers: Dict[str, str]
     session_id: str
 
+class BatchSubmission(BaseModel):
+    session_id: str
+    answers: Dict[str, str]
+
+class QuizBatchSubmission(BaseModel):
+    submissions: List[BatchSubmission]
+
 class FlashcardRequest(BaseModel):
     topic: str
     num_cards: int = 10
     session_id: str
+    background: bool = False # Return a job id immediately instead of waiting for the cards
 
 # -----------------------
 # AI Helpers
 # -----------------------
-def get_llm():
+def get_llm(temperature: float = 0.7, max_tokens: int = 2000):
     if not GROQ_API_KEY:
         raise RuntimeError("GROQ_API_KEY not configured.")
-    return ChatGroq(
-        model="openai/gpt-oss-120b", 
-        groq_api_key=GROQ_API_KEY,
-        temperature=0.7,
-        max_tokens=2000
-    )
+    return llm_registry.get(LLM_MODEL, temperature=temperature, max_tokens=max_tokens)
+
+LLM_NOT_CONFIGURED_MESSAGE = "LLM not configured properly. Please set GROQ_API_KEY in your environment."
+
+async def build_chat_messages(message: str, session_id: str, db: AsyncSession) -> list:
+    """Assemble the system prompt, recent history and the new user turn"""
+    # Start the web search first so it runs in its thread while the context queries below execute
+    pending_search = None
+    if any(kw in message.lower() for kw in ['latest', 'current', 'news', '2024', '2025']):
+        pending_search = search_service.start(message)
 
-def web_search(query: str) -> str:
-    try:
-        results = DDGS().text(query, max_results=3)
-        if not results:
-            return "No results found."
-        text = "🔍 **Search Results:**\n\n"
-        for idx, r in enumerate(results, 1):
-            text += f"{idx}. **{r.get('title')}**\n{r.get('body')}\n\n"
-        return text
-    except Exception:
-        return "Search unavailable."
-
-def chat_response(message: str, session_id: str, db: Session) -> str:
     # Fetch stats from DB
     try:
-        quiz_count = db.query(QuizScore).filter(QuizScore.session_id == session_id).count()
-        topics = db.query(Topic).filter(Topic.session_id == session_id).order_by(Topic.last_studied.desc()).limit(3).all()
+        quiz_count = await db.scalar(select(func.count(QuizScore.id)).where(QuizScore.session_id == session_id))
+        topics = (await db.scalars(
+            select(Topic).where(Topic.session_id == session_id).order_by(Topic.last_studied.desc()).limit(3)
+        )).all()
         topic_names = [t.name for t in topics]
         
-        # Fetch recent chat history from DB
-        history_records = db.query(ChatHistory).filter(ChatHistory.session_id == session_id).order_by(ChatHistory.created_at.asc()).limit(10).all()
+        # Rolling summary of older turns plus the most recent turns that fit the token budget
+        summary_text, history_records = await chat_summarizer.load_context(
+            db, session_id, CHAT_CONTEXT_TOKENS, pending=chat_log.pending(session_id)
+        )
+        # The endpoint has already saved the current message, it is appended separately below
+        if history_records and history_records[-1].role == "user" and history_records[-1].content == message:
+            history_records = history_records[:-1]
         chat_history = []
         for h in history_records:
             if h.role == "user":
                 chat_history.append(HumanMessage(content=h.content))
             else:
                 chat_history.append(AIMessage(content=h.content))
-                
+
+        # End the read transaction so the pooled connection is not held across the LLM await
+        await db.commit()
+
     except Exception as e:
         print(f"Error fetching context: {e}")
         quiz_count = 0
         topic_names = []
+        summary_text = None
         chat_history = []
     
     context = f"""You are a friendly AI tutor. 
 User Stats: {quiz_count} quizzes completed, Recent Topics: {', '.join(topic_names) or 'None yet'}
 Use markdown formatting. Be encouraging and helpful."""
+    if summary_text:
+        context += f"\n\nSummary of the earlier conversation:\n{summary_text}"
     
-    if any(kw in message.lower() for kw in ['latest', 'current', 'news', '2024', '2025']):
-        search_results = web_search(message)
-        message = f"{message}\n\n{search_results}"
+    if pending_search is not None:
+        # None on timeout or failure: answer without search results rather than keep the user waiting
+        search_results = await pending_search.result()
+        if search_results:
+            message = f"{message}\n\n{search_results}"
     
+    return [SystemMessage(content=context)] + chat_history + [HumanMessage(content=message)]
+
+async def chat_response(message: str, session_id: str, db: AsyncSession) -> str:
+    messages = await build_chat_messages(message, session_id, db)
+
     # Attempt to get llm
     try:
         llm = get_llm()
     except RuntimeError as e:
-        return "LLM not configured properly. Please set GROQ_API_KEY in your environment."
+        return LLM_NOT_CONFIGURED_MESSAGE
     
-    messages = [SystemMessage(content=context)] + chat_history + [HumanMessage(content=message)]
-    
-    response = llm.invoke(messages)
+    response = await llm.ainvoke(messages)
     
     return response.content
 
+async def stream_chat_response(message: str, session_id: str, db: AsyncSession):
+    """Yield the tutor reply token by token using the LLM streaming API"""
+    messages = await build_chat_messages(message, session_id, db)
+
+    try:
+        llm = get_llm()
+    except RuntimeError:
+        yield LLM_NOT_CONFIGURED_MESSAGE
+        return
+
+    async for chunk in llm.astream(messages):
+        if chunk.content:
+            yield chunk.content
+
+def sse_event(data: Dict, event: str = None) -> str:
+    """Format one server-sent event frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
 # -----------------------
 # Utility generators (quizzes / flashcards)
 # -----------------------
-def generate_quiz(topic: str, difficulty: str, num_questions: int) -> Dict:
-    llm = get_llm()
-    prompt = f"""Create a {difficulty} difficulty quiz about "{topic}" with {num_questions} questions.
+def build_quiz_prompt(topic: str, difficulty: str, num_questions: int, focus: str = "") -> str:
+    return f"""Create a {difficulty} difficulty quiz about "{topic}" with {num_questions} questions.
+{focus}
 
 Return ONLY valid JSON in this exact format. Ensure all questions and answers are factually correct. Double check math calculations (e.g., 180 - 110 = 70, not 80).
 CRITICAL: The "correct_answer" field MUST match the letter of the correct option exactly. If the correct option is "A) 1080", then "correct_answer" MUST be "A". Do not put the full text.
 Return ONLY valid JSON in this exact format:
-{
+{{
   "title": "Quiz Title",
   "questions": [
-    {
+    {{
       "id": 1,
       "question": "Question text?",
       "options": ["A) Option 1", "B) Option 2", "C) Option 3", "D) Option 4"],
       "correct_answer": "A",
       "explanation": "Brief explanation"
-    }
+    }}
   ]
-}"""
-    try:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        content = response.content.strip()
-        
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        quiz_data = json.loads(content)
+}}"""
+
+def fallback_quiz(topic: str) -> Dict:
+    return {
+        "title": f"{topic} Quiz",
+        "questions": [{
+            "id": 1,
+            "question": f"What is an important concept in {topic}?",
+            "options": ["A) First option", "B) Second option", "C) Third option", "D) Fourth option"],
+            "correct_answer": "A",
+            "explanation": "This is a sample question."
+        }]
+    }
+
+async def generate_quiz(topic: str, difficulty: str, num_questions: int) -> Dict:
+    # Serve repeat requests from the cache, reshuffled so reuse is not noticeable
+    cached = await quiz_cache.aget(topic, difficulty, num_questions)
+    if cached is not None:
+        return shuffle_quiz(cached)
+
+    # Identical requests already in flight share one upstream call
+    key = ("quiz", QuizCache.make_key(topic, difficulty, num_questions))
+    return await single_flight.do(key, _generate_quiz_uncached, topic, difficulty, num_questions)
+
+def parse_llm_json(content: str) -> Dict:
+    content = content.strip()
+    
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
+    
+    return json.loads(content)
+
+async def _request_quiz(topic: str, difficulty: str, num_questions: int, focus: str = "") -> Dict:
+    llm = get_llm()
+    prompt = build_quiz_prompt(topic, difficulty, num_questions, focus)
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    return parse_llm_json(response.content)
+
+async def _generate_quiz_uncached(topic: str, difficulty: str, num_questions: int) -> Dict:
+    chunks = split_count(num_questions, QUIZ_CHUNK_SIZE)
+    if len(chunks) == 1:
+        try:
+            quiz_data = await _request_quiz(topic, difficulty, num_questions)
+        except Exception:
+            # safe fallback (never cached)
+            return fallback_quiz(topic)
+        quiz_data = {**quiz_data, "questions": distinct_questions([quiz_data.get("questions", [])], num_questions)}
+    else:
+        # Large quizzes: one smaller prompt per chunk, run concurrently, so wall time tracks
+        # the slowest chunk and no single response overflows max_tokens
+        results = await asyncio.gather(
+            *(_request_quiz(topic, difficulty, count, focus_for(i, len(chunks))) for i, count in enumerate(chunks)),
+            return_exceptions=True
+        )
+        parts = [r for r in results if isinstance(r, dict)]
+        questions = distinct_questions([p.get("questions", []) for p in parts], num_questions)
+        if not questions:
+            return fallback_quiz(topic)
+        quiz_data = {"title": parts[0].get("title", f"{topic} Quiz"), "questions": questions}
+        if len(parts) < len(chunks):
+            # Partial result: serve it, but let the next request try for a complete one
+            await bank_questions(topic, difficulty, questions)
+            return quiz_data
+
+    if len(quiz_data["questions"]) < num_questions:
+        # Short of the count (near-duplicates dropped): never cached under the full count
+        await bank_questions(topic, difficulty, quiz_data["questions"])
         return quiz_data
-    except Exception:
-        # safe fallback
-        return {
-            "title": f"{topic} Quiz",
-            "questions": [{
-                "id": 1,
-                "question": f"What is an important concept in {topic}?",
-                "options": ["A) First option", "B) Second option", "C) Third option", "D) Fourth option"],
-                "correct_answer": "A",
-                "explanation": "This is a sample question."
-            }]
-        }
 
-def generate_flashcards(topic: str, num_cards: int) -> Dict:
+    await quiz_cache.aset(topic, difficulty, num_questions, quiz_data)
+    await bank_questions(topic, difficulty, quiz_data.get("questions", []))
+    return quiz_data
+
+def distinct_questions(parts: List[List[Dict]], limit: int, seen: Optional[NearDuplicateIndex] = None) -> List[Dict]:
+    """Questions of the parts in order, without near-duplicates of each other (or of seen), renumbered and capped at limit"""
+    questions = [q for part in parts for q in part]
+    if seen is not None:
+        questions = drop_near_duplicates(questions, "question", index=seen)
+    else:
+        questions = drop_near_duplicates(questions, "question", threshold=QUIZ_DEDUPE_THRESHOLD)
+    return merge_items([questions], "question", limit)
+
+async def session_questions(session_id: Optional[str], topic: str) -> NearDuplicateIndex:
+    """Near-duplicate index of the questions in the session's latest quizzes on the topic (QUIZ_DEDUPE_HISTORY at most)"""
+    index = NearDuplicateIndex(threshold=QUIZ_DEDUPE_THRESHOLD)
+    if not session_id or QUIZ_DEDUPE_HISTORY <= 0:
+        return index
+    async with read_router.session(session_id) as db:
+        quizzes = (await db.execute(
+            select(Quiz.topic, Quiz.questions)
+            .where(Quiz.session_id == session_id)
+            .order_by(Quiz.created_at.desc())
+            .limit(QUIZ_DEDUPE_HISTORY)
+        )).all()
+    for quiz_topic, questions in quizzes:
+        if topic_key(quiz_topic) != topic_key(topic):
+            continue
+        for question in questions or []:
+            if isinstance(question, dict):
+                index.add(len(index), question.get("question"))
+    return index
+
+async def bank_questions(topic: str, difficulty: str, questions: List[Dict]):
+    """Keep generated questions for later quizzes; failing to bank them only costs reuse."""
+    if not QUESTION_BANK:
+        return
+    try:
+        await db_writer.run(lambda db: store_questions(db, topic, difficulty, questions, bank_duplicates))
+    except Exception as e:
+        print(f"Error banking questions: {e}")
+
+async def generate_bank_questions(topic: str, difficulty: str, count: int, part: int = 0) -> List[Dict]:
+    """Questions for the replenisher; each top-up of a topic asks for a different angle."""
+    quiz_data = await _request_quiz(topic, difficulty, count, focus_for(part, len(FOCUS_ANGLES)))
+    return quiz_data.get("questions", [])
+
+async def assemble_quiz(topic: str, difficulty: str, num_questions: int, session_id: Optional[str] = None):
+    """
+    A quiz drawn from the question bank, with the LLM asked only for the shortfall.
+    Questions near-duplicating the session's recent quizzes on the topic are left out.
+    Returns (quiz_data, bank_ids): the bank id of each question, None for generated ones.
+    """
+    seen = await session_questions(session_id, topic)
+    banked = []
+    if QUESTION_BANK:
+        async with AsyncReadSessionLocal() as db:
+            # Sample extra when the session has history, so its repeats can be skipped
+            banked = await sample_questions(db, topic, difficulty, num_questions * 2 if len(seen) else num_questions)
+        banked = drop_near_duplicates(banked, "question", index=seen)[:num_questions]
+
+    if len(banked) >= num_questions:
+        quiz_data = {"title": f"{topic} Quiz", "questions": merge_items([banked], "question", num_questions)}
+    else:
+        generated = await generate_quiz(topic, difficulty, num_questions - len(banked))
+        failed = generated == fallback_quiz(topic)
+        if banked and failed:
+            generated = {"title": f"{topic} Quiz", "questions": []}
+        questions = distinct_questions([banked, generated.get("questions", [])], num_questions, seen)
+        if len(questions) < num_questions and not failed:
+            # Near-duplicates were dropped, or the cached quiz repeats what the session has seen: ask once for the rest
+            try:
+                extra = await _request_quiz(topic, difficulty, num_questions - len(questions), focus_for(len(seen), len(FOCUS_ANGLES)))
+                await bank_questions(topic, difficulty, extra.get("questions", []))
+                questions = distinct_questions([questions, extra.get("questions", [])], num_questions, seen)
+            except Exception as e:
+                print(f"Error generating new questions: {e}")
+        # Repeats beat an empty quiz
+        quiz_data = {**generated, "questions": questions or merge_items([banked, generated.get("questions", [])], "question", num_questions)}
+
+    if banked:
+        quiz_data = shuffle_quiz(quiz_data)
+    bank_ids = [q.pop("bank_id", None) for q in quiz_data["questions"]]
+    return quiz_data, bank_ids
+
+async def stream_quiz_questions(topic: str, difficulty: str, num_questions: int, parser: QuizStreamParser):
+    """Yield validated question dicts as soon as each one is complete in the token stream"""
+    cached = await quiz_cache.aget(topic, difficulty, num_questions)
+    if cached is not None:
+        quiz_data = shuffle_quiz(cached)
+        parser.title = quiz_data.get("title")
+        for question in quiz_data.get("questions", []):
+            yield question
+        return
+
     llm = get_llm()
-    prompt = f"""Create {num_cards} flashcards about "{topic}".
+    prompt = build_quiz_prompt(topic, difficulty, num_questions)
+    questions = []
+    async for chunk in llm.astream([HumanMessage(content=prompt)]):
+        for question in parser.feed(chunk.content or ""):
+            questions.append(dict(question))
+            yield question
+        if parser.done and parser.title is not None:
+            break
+
+    # Only cache documents that were streamed to completion, with every question distinct
+    if parser.done and questions:
+        questions = distinct_questions([questions], num_questions)
+        if len(questions) == num_questions:
+            await quiz_cache.aset(topic, difficulty, num_questions, {
+                "title": parser.title or f"{topic} Quiz",
+                "questions": questions
+            })
+        await bank_questions(topic, difficulty, questions)
 
+async def generate_flashcards(topic: str, num_cards: int) -> Dict:
+    key = ("flashcards", content_key(topic, num_cards))
+    return await single_flight.do(key, _generate_flashcards_uncached, topic, num_cards)
+
+def build_flashcards_prompt(topic: str, num_cards: int, focus: str = "") -> str:
+    return f"""Create {num_cards} flashcards about "{topic}".
+{focus}
 Return ONLY valid JSON:
 {{
   "title": "Flashcard Set Title",
@@ -208,26 +600,126 @@ Return ONLY valid JSON:
     }}
   ]
 }}"""
-    try:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        content = response.content.strip()
-        
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        return json.loads(content)
-    except Exception:
-        return {
-            "title": f"{topic} Flashcards",
-            "cards": [{
-                "id": 1,
-                "front": f"What is {topic}?",
-                "back": f"A fundamental concept in learning.",
-                "hint": "Think about the basics"
-            }]
-        }
+
+async def _request_flashcards(topic: str, num_cards: int, focus: str = "") -> Dict:
+    llm = get_llm()
+    prompt = build_flashcards_prompt(topic, num_cards, focus)
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    return parse_llm_json(response.content)
+
+async def _generate_flashcards_uncached(topic: str, num_cards: int) -> Dict:
+    chunks = split_count(num_cards, FLASHCARD_CHUNK_SIZE)
+    if len(chunks) == 1:
+        try:
+            return await _request_flashcards(topic, num_cards)
+        except Exception:
+            return fallback_flashcards(topic)
+
+    # Large decks fan out the same way as large quizzes
+    results = await asyncio.gather(
+        *(_request_flashcards(topic, count, focus_for(i, len(chunks))) for i, count in enumerate(chunks)),
+        return_exceptions=True
+    )
+    parts = [r for r in results if isinstance(r, dict)]
+    cards = merge_items([p.get("cards", []) for p in parts], "front", num_cards)
+    if not cards:
+        return fallback_flashcards(topic)
+    return {"title": parts[0].get("title", f"{topic} Flashcards"), "cards": cards}
+
+def fallback_flashcards(topic: str) -> Dict:
+    return {
+        "title": f"{topic} Flashcards",
+        "cards": [{
+            "id": 1,
+            "front": f"What is {topic}?",
+            "back": f"A fundamental concept in learning.",
+            "hint": "Think about the basics"
+        }]
+    }
+
+# -----------------------
+# Generate + persist (shared by the endpoints and background jobs)
+# -----------------------
+async def generate_and_save_quiz(request: QuizRequest) -> Dict:
+    quiz_data, bank_ids = await assemble_quiz(request.topic, request.difficulty, request.num_questions, request.session_id)
+    quiz_id = f"quiz-{uuid.uuid4().hex}"
+    
+    # Save to DB
+    new_quiz = Quiz(
+        id=quiz_id,
+        topic=request.topic,
+        difficulty=request.difficulty,
+        title=quiz_data.get("title", f"{request.topic} Quiz"),
+        questions=quiz_data.get("questions", []),
+        answer_key=answer_key(quiz_data.get("questions", [])),
+        answer_details=answer_details(quiz_data.get("questions", [])),
+        bank_ids=bank_ids if any(b is not None for b in bank_ids) else None,
+        session_id=request.session_id
+    )
+
+    async def save(db):
+        db.add(new_quiz)
+        await mark_served(db, [b for b in bank_ids if b is not None])
+        # Update Topic
+        await touch_topic(db, request.session_id, request.topic)
+
+    await db_writer.run(save)
+    read_router.mark_written(request.session_id)
+    
+    quiz_data["quiz_id"] = quiz_id
+    quiz_data["topic"] = request.topic
+    quiz_data["difficulty"] = request.difficulty
+    quiz_data["created_at"] = datetime.now().isoformat()
+    
+    return quiz_data
+
+async def generate_and_save_flashcards(request: FlashcardRequest) -> Dict:
+    # Serve identical topic/size requests from cards already in the content-addressed store
+    async with AsyncReadSessionLocal() as db:
+        existing = await find_reusable_set(db, request.topic, request.num_cards)
+        if existing:
+            cards_data = {"title": existing.title, "cards": await load_cards(db, existing)}
+    if existing:
+        card_hashes = existing.card_hashes
+        key = existing.content_key
+    else:
+        cards_data = await generate_flashcards(request.topic, request.num_cards)
+        card_hashes = None
+        # Fallback cards are stored but never offered for reuse
+        key = None if cards_data == fallback_flashcards(request.topic) else content_key(request.topic, request.num_cards)
+    set_id = f"flashcard-{uuid.uuid4().hex}"
+    now = datetime.utcnow()
+
+    async def save(db):
+        hashes = card_hashes if card_hashes is not None else await store_cards(db, cards_data.get("cards", []))
+        # Count the set in the session's progress summary before it is added (first use rebuilds from history)
+        await record_flashcard_set(db, request.session_id, now)
+
+        # Save to DB (the set row only holds references to the card bodies)
+        db.add(FlashcardSet(
+            id=set_id,
+            topic=request.topic,
+            title=cards_data.get("title", f"{request.topic} Flashcards"),
+            card_hashes=hashes,
+            content_key=key,
+            session_id=request.session_id,
+            created_at=now
+        ))
+
+        # Update Topic
+        await touch_topic(db, request.session_id, request.topic)
+
+    await db_writer.run(save)
+    read_router.mark_written(request.session_id)
+    
+    cards_data["set_id"] = set_id
+    cards_data["topic"] = request.topic
+    cards_data["created_at"] = datetime.now().isoformat()
+    
+    return cards_data
+
+job_queue.register("quiz", lambda payload: generate_and_save_quiz(QuizRequest(**payload)))
+job_queue.register("flashcards", lambda payload: generate_and_save_flashcards(FlashcardRequest(**payload)))
 
 # -----------------------
 # API ENDPOINTS
@@ -245,9 +737,16 @@ async def health():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "groq_available": bool(GROQ_API_KEY)
+        "groq_available": bool(GROQ_API_KEY),
+        "database": database.engine.dialect.name,
+        "startup": startup_timings
     }
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for tuning cache size and TTL"""
+    return {"quiz": quiz_cache.stats(), "search": search_service.stats(), "read_routing": read_router.stats(), "chat_log": chat_log.stats(), "chat_archive": chat_archiver.stats(), "question_bank": {**question_replenisher.stats(), "duplicates": bank_duplicates.stats()}, "single_flight": single_flight.stats()}
+
 # -----------------------
 # Companion Endpoints
 # -----------------------
@@ -267,144 +766,255 @@ async def create_session():
     return {"session_id": str(uuid.uuid4())}
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat(request: ChatRequest, db: AsyncSession = Depends(get_read_db)):
     try:
         last_msg = request.messages[-1].content
         
         # Save User Message
-        user_msg_db = ChatHistory(
-            session_id=request.session_id,
-            role="user",
-            content=last_msg
-        )
-        db.add(user_msg_db)
-        db.commit()
+        await chat_log.append(request.session_id, "user", last_msg)
         
         # Generate Response
-        response_text = chat_response(last_msg, request.session_id, db)
+        response_text = await chat_response(last_msg, request.session_id, db)
         
         # Save AI Response
-        ai_msg_db = ChatHistory(
-            session_id=request.session_id,
-            role="ai",
-            content=response_text
-        )
-        db.add(ai_msg_db)
-        db.commit()
+        await chat_log.append(request.session_id, "ai", response_text)
+
+        if GROQ_API_KEY:
+            chat_summarizer.maybe_schedule(request.session_id)
         
         return {
             "id": f"chat-{uuid.uuid4().hex[:8]}",
             "response": response_text,
             "timestamp": datetime.now().isoformat()
         }
+    except ChatLogFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, db: AsyncSession = Depends(get_read_db)):
+    """Stream the tutor reply as server-sent events"""
+    last_msg = request.messages[-1].content
+    session_id = request.session_id
+
+    try:
+        await chat_log.append(session_id, "user", last_msg)
+    except ChatLogFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_stream():
+        parts = []
+        try:
+            async for token in stream_chat_response(last_msg, session_id, db):
+                parts.append(token)
+                yield sse_event({"token": token})
+            yield sse_event({
+                "id": f"chat-{uuid.uuid4().hex[:8]}",
+                "timestamp": datetime.now().isoformat()
+            }, event="done")
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+        finally:
+            # Runs on completion and on client disconnect, so aborted streams keep their partial reply
+            if parts:
+                try:
+                    await chat_log.append(session_id, "ai", "".join(parts))
+                    if GROQ_API_KEY:
+                        chat_summarizer.maybe_schedule(session_id)
+                except Exception as e:
+                    print(f"Error saving streamed reply: {e}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def history_item(row) -> Dict:
+    return {"id": row.id, "role": row.role, "content": row.content, "timestamp": row.created_at.isoformat()}
+
 @app.get("/api/chat/history/{session_id}")
-async def get_chat_history(session_id: str, db: Session = Depends(get_db)):
-    """Get chat history for a session"""
-    history = db.query(ChatHistory).filter(ChatHistory.session_id == session_id).order_by(ChatHistory.created_at.asc()).all()
+async def get_chat_history(
+    session_id: str,
+    before_id: Optional[int] = None,
+    limit: int = CHAT_HISTORY_PAGE_SIZE,
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    db: AsyncSession = Depends(get_replica_db)
+):
+    """
+    Get chat history for a session, one page at a time: the newest `limit` messages
+    older than `before_id` (oldest -> newest). Pass the returned next_before_id to
+    fetch the page before it. format=ndjson instead streams every message older
+    than before_id, oldest first, one JSON object per line. Pages continue into the
+    archive once the session's messages in chat_history run out.
+    """
+    columns = (ChatHistory.id, ChatHistory.role, ChatHistory.content, ChatHistory.created_at, ChatHistory.token)
+    # Messages still in the write-behind buffer belong at the newest end, i.e. only without before_id.
+    # Snapshot them before querying (see merge_pending).
+    pending = chat_log.pending(session_id) if before_id is None else []
+
+    if fmt == "ndjson":
+        async def ndjson_stream():
+            since = min((p.created_at for p in pending), default=None)
+            recent = []
+            # The request-scoped session is closed once streaming starts, so read with a fresh one
+            async with read_router.session(session_id) as stream_db:
+                # Archived messages are all older than the ones still in chat_history
+                async for message in stream_archive(stream_db, session_id, before_id):
+                    yield json.dumps(history_item(message)) + "\n"
+                query = select(*columns).where(ChatHistory.session_id == session_id)
+                if before_id is not None:
+                    query = query.where(ChatHistory.id < before_id)
+                # yield_per streams through a server-side cursor, so memory stays flat however long the history
+                rows = await stream_db.stream(
+                    query.order_by(ChatHistory.id.asc()).execution_options(yield_per=CHAT_HISTORY_STREAM_BATCH)
+                )
+                async for row in rows:
+                    if since and row.created_at >= since - timedelta(seconds=2):
+                        recent.append(row)
+                    yield json.dumps(history_item(row)) + "\n"
+            for row in merge_pending(recent, pending)[len(recent):]:
+                yield json.dumps(history_item(row)) + "\n"
+
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+    limit = max(1, min(limit, CHAT_HISTORY_MAX_PAGE))
+    # Keyset pagination on the (session_id, id) index: cost depends on the page size, not the history length
+    query = select(*columns).where(ChatHistory.session_id == session_id)
+    if before_id is not None:
+        query = query.where(ChatHistory.id < before_id)
+    rows = list(reversed((await db.execute(query.order_by(ChatHistory.id.desc()).limit(limit + 1))).all()))
+    if len(rows) <= limit:
+        older_than = rows[0].id if rows else before_id
+        rows = await read_archive(db, session_id, older_than, limit + 1 - len(rows)) + rows
+    rows = merge_pending(rows, pending)
+
+    has_more = len(rows) > limit
+    page = rows[-limit:]
+    next_before_id = None
+    if has_more:
+        # A page made only of unflushed messages continues from just past the newest stored one
+        stored = [row.id for row in rows if row.id is not None]
+        next_before_id = page[0].id if page[0].id is not None else (max(stored) + 1 if stored else None)
     return {
-        "history": [
-            {"role": h.role, "content": h.content, "timestamp": h.created_at.isoformat()}
-            for h in history
-        ]
+        "history": [history_item(row) for row in page],
+        "has_more": has_more,
+        "next_before_id": next_before_id
     }
 
 @app.post("/api/quiz/generate")
-async def create_quiz(request: QuizRequest, db: Session = Depends(get_db)):
+async def create_quiz(request: QuizRequest):
+    if request.background:
+        job_id = await job_queue.submit("quiz", request.model_dump(), session_id=request.session_id)
+        return {"job_id": job_id, "status": "queued"}
     try:
-        quiz_data = generate_quiz(request.topic, request.difficulty, request.num_questions)
-        quiz_id = f"quiz-{uuid.uuid4().hex}"
-        
-        # Save to DB
-        new_quiz = Quiz(
-            id=quiz_id,
-            topic=request.topic,
-            difficulty=request.difficulty,
-            title=quiz_data.get("title", f"{request.topic} Quiz"),
-            questions=quiz_data.get("questions", []),
-            session_id=request.session_id
-        )
-        db.add(new_quiz)
-        
-        # Update Topic
-        topic = db.query(Topic).filter(Topic.session_id == request.session_id, Topic.name == request.topic).first()
-        if not topic:
-            topic = Topic(session_id=request.session_id, name=request.topic)
-            db.add(topic)
-        else:
-            topic.last_studied = datetime.utcnow()
-            
-        db.commit()
-        
-        quiz_data["quiz_id"] = quiz_id
-        quiz_data["topic"] = request.topic
-        quiz_data["difficulty"] = request.difficulty
-        quiz_data["created_at"] = datetime.now().isoformat()
-        
-        return quiz_data
+        return await generate_and_save_quiz(request)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/quiz/generate/stream")
+async def create_quiz_stream(request: QuizRequest):
+    """Stream quiz questions as server-sent events while the LLM is still writing the rest"""
+    quiz_id = f"quiz-{uuid.uuid4().hex}"
+
+    async def event_stream():
+        parser = QuizStreamParser()
+        questions = []
+        repeats = []
+        yield sse_event({
+            "quiz_id": quiz_id,
+            "topic": request.topic,
+            "difficulty": request.difficulty
+        }, event="meta")
+
+        try:
+            # Skip questions repeating each other or the session's recent quizzes
+            seen = await session_questions(request.session_id, request.topic)
+            async for question in stream_quiz_questions(request.topic, request.difficulty, request.num_questions, parser):
+                if seen.add_if_new(len(seen), question.get("question")) is not None:
+                    repeats.append(question)
+                    continue
+                question["id"] = len(questions) + 1
+                questions.append(question)
+                yield sse_event(question, event="question")
+
+            if not questions:
+                # Repeats beat the fallback question
+                for question in merge_items([repeats], "question", request.num_questions) or fallback_quiz(request.topic)["questions"]:
+                    questions.append(question)
+                    yield sse_event(question, event="question")
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+
+        title = parser.title or f"{request.topic} Quiz"
+
+        async def save(db):
+            db.add(Quiz(
+                id=quiz_id,
+                topic=request.topic,
+                difficulty=request.difficulty,
+                title=title,
+                questions=questions,
+                answer_key=answer_key(questions),
+                answer_details=answer_details(questions),
+                session_id=request.session_id
+            ))
+            await touch_topic(db, request.session_id, request.topic)
+
+        try:
+            await db_writer.run(save)
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+        read_router.mark_written(request.session_id)
+
+        yield sse_event({
+            "quiz_id": quiz_id,
+            "title": title,
+            "total": len(questions),
+            "created_at": datetime.now().isoformat()
+        }, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def load_answer_key(db: AsyncSession, quiz_id: str):
+    """
+    (topic, answer key, answer details, bank ids) of a quiz. The key grades, the details fill
+    in the results; questions are read just for quizzes saved before either existed.
+    """
+    quiz = (await db.execute(select(Quiz.topic, Quiz.answer_key, Quiz.answer_details, Quiz.bank_ids).where(Quiz.id == quiz_id))).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    key, details = quiz.answer_key, quiz.answer_details
+    if key is None or details is None:
+        questions = await db.scalar(select(Quiz.questions).where(Quiz.id == quiz_id)) or []
+        if key is None:
+            key = answer_key(questions)
+        if details is None:
+            details = answer_details(questions)
+    if len(details) != len(key):
+        # Questions and key disagree: results go without text rather than misaligned
+        details = None
+    return quiz.topic, key, details, quiz.bank_ids
+
 @app.post("/api/quiz/submit")
-async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db)):
+async def submit_quiz(submission: QuizSubmission, db: AsyncSession = Depends(get_read_db)):
     try:
-        quiz = db.query(Quiz).filter(Quiz.id == submission.quiz_id).first()
-        if not quiz:
-            raise HTTPException(status_code=404, detail="Quiz not found")
-        
-        correct = 0
-        questions = quiz.questions
-        total = len(questions)
-        results = []
-        
-        for q in questions:
-            # Fix: Pydantic converts keys to int, so we must lookup with int
-            # We try both int and str to be safe
-            q_id = str(q["id"])
-            user_ans = submission.answers.get(q_id, "")
-            # Clean and normalize answers for comparison
-            # We want to extract the leading "A", "B", "C", "D" from both strings if possible.
-            import re
-            
-            def extract_option_char(text):
-                if not text: return ""
-                # Match start of string, optional parens/dots, capture the first letter/digit
-                match = re.match(r"^[\s\(]*([A-Da-d0-9])[\s\)\.]", text.strip())
-                if match:
-                    return match.group(1).upper()
-                # If no pattern like "A) ...", just take the whole thing if it's short, or first char
-                clean = text.strip().upper()
-                return clean if len(clean) == 1 else clean[:1]
-
-            print(f"DEBUG: Processing QID: {q_id}")
-            print(f"  User Ans Raw: '{user_ans}'")
-            print(f"  Correct Ans Raw: '{q.get('correct_answer', '')}'")
-
-            correct_char = extract_option_char(q.get("correct_answer", ""))
-            user_char = extract_option_char(user_ans)
-            
-            print(f"  User Char: '{user_char}' | Correct Char: '{correct_char}'")
-
-            is_correct = (correct_char == user_char) and (correct_char != "")
-            print(f"  Is Correct: {is_correct}")
-
-            if is_correct:
-                correct += 1
-            
-            results.append({
-                "question_id": q["id"],
-                "question": q["question"],
-                "user_answer": user_ans,
-                "correct_answer": q.get("correct_answer", ""),
-                "is_correct": is_correct,
-                "explanation": q.get("explanation", "")
-            })
+        topic, key, details, bank_ids = await load_answer_key(db, submission.quiz_id)
+        correct, results = grade(key, submission.answers, details)
+        total = len(key)
         
         score = (correct / total * 100) if total > 0 else 0
+        now = datetime.utcnow()
         
         # Save Score
         new_score = QuizScore(
@@ -413,20 +1023,20 @@ async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db))
             score=score,
             correct_count=correct,
             total_questions=total,
-            details=results
+            details=results,
+            created_at=now
         )
-        db.add(new_score)
-        
-        # Update Topic
-        topic_name = quiz.topic
-        topic = db.query(Topic).filter(Topic.session_id == submission.session_id, Topic.name == topic_name).first()
-        if not topic:
-            topic = Topic(session_id=submission.session_id, name=topic_name)
-            db.add(topic)
-        else:
-            topic.last_studied = datetime.utcnow()
-            
-        db.commit()
+
+        async def save(w):
+            # Fold into the progress summary first, the score row is then committed in the same transaction
+            await record_quiz_score(w, submission.session_id, score, now)
+            w.add(new_score)
+            await record_answers(w, bank_ids, [r["is_correct"] for r in results])
+            # Update Topic
+            await touch_topic(w, submission.session_id, topic, now)
+
+        await db_writer.run(save)
+        read_router.mark_written(submission.session_id)
         
         return {
             "score": round(score, 1),
@@ -437,88 +1047,250 @@ async def submit_quiz(submission: QuizSubmission, db: Session = Depends(get_db))
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/quiz/{quiz_id}/submit/batch")
+async def submit_quiz_batch(quiz_id: str, batch: QuizBatchSubmission, db: AsyncSession = Depends(get_read_db)):
+    """A classroom's submissions of one quiz: graded together, all scores saved in one bulk insert."""
+    if not batch.submissions:
+        raise HTTPException(status_code=400, detail="No submissions")
+    if len(batch.submissions) > QUIZ_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {QUIZ_BATCH_MAX} submissions per batch")
+    try:
+        topic, key, details, bank_ids = await load_answer_key(db, quiz_id)
+        graded = grade_batch(key, [s.answers for s in batch.submissions], details)
+        total = len(key)
+        now = datetime.utcnow()
+
+        rows = [
+            {
+                "quiz_id": quiz_id,
+                "session_id": submission.session_id,
+                "score": (correct / total * 100) if total > 0 else 0,
+                "correct_count": correct,
+                "total_questions": total,
+                "details": results,
+                "created_at": now
+            }
+            for submission, (correct, results) in zip(batch.submissions, graded)
+        ]
+        sessions = list(dict.fromkeys(row["session_id"] for row in rows))
+
+        async def save(w):
+            for row in rows:
+                await record_quiz_score(w, row["session_id"], row["score"], now)
+            await w.execute(insert(QuizScore.__table__), rows)
+            if bank_ids:
+                correct_counts = [sum(column) for column in zip(*([r["is_correct"] for r in row["details"]] for row in rows))]
+                await record_answers(w, bank_ids, correct_counts, submissions=len(rows))
+            for session_id in sessions:
+                await touch_topic(w, session_id, topic, now)
+
+        await db_writer.run(save)
+        for session_id in sessions:
+            read_router.mark_written(session_id)
+
+        return {
+            "quiz_id": quiz_id,
+            "graded": len(rows),
+            "total": total,
+            "average_score": round(sum(row["score"] for row in rows) / len(rows), 1),
+            "submissions": [
+                {
+                    "session_id": row["session_id"],
+                    "score": round(row["score"], 1),
+                    "correct": row["correct_count"],
+                    "results": row["details"]
+                }
+                for row in rows
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/flashcards/generate")
-async def create_flashcards(request: FlashcardRequest, db: Session = Depends(get_db)):
+async def create_flashcards(request: FlashcardRequest):
+    if request.background:
+        job_id = await job_queue.submit("flashcards", request.model_dump(), session_id=request.session_id)
+        return {"job_id": job_id, "status": "queued"}
     try:
-        cards_data = generate_flashcards(request.topic, request.num_cards)
-        set_id = f"flashcard-{uuid.uuid4().hex}"
-        
-        # Save to DB
-        new_set = FlashcardSet(
-            id=set_id,
-            topic=request.topic,
-            title=cards_data.get("title", f"{request.topic} Flashcards"),
-            cards=cards_data.get("cards", []),
-            session_id=request.session_id
-        )
-        db.add(new_set)
-        
-        # Update Topic
-        topic = db.query(Topic).filter(Topic.session_id == request.session_id, Topic.name == request.topic).first()
-        if not topic:
-            topic = Topic(session_id=request.session_id, name=request.topic)
-            db.add(topic)
-        else:
-            topic.last_studied = datetime.utcnow()
-            
-        db.commit()
-        
-        cards_data["set_id"] = set_id
-        cards_data["topic"] = request.topic
-        cards_data["created_at"] = datetime.now().isoformat()
-        
-        return cards_data
+        return await generate_and_save_flashcards(request)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+# -----------------------
+# Job Endpoints
+# -----------------------
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll a background generation job"""
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Push job status changes as server-sent events until the job finishes"""
+    # Subscribe before reading the current state so no transition is missed
+    updates = job_queue.subscribe(job_id)
+    job = await job_queue.get(job_id)
+    if not job:
+        job_queue.unsubscribe(job_id, updates)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        try:
+            current = job
+            yield sse_event(current, event=current["status"])
+            while current["status"] not in TERMINAL_STATUSES:
+                try:
+                    snapshot = await asyncio.wait_for(updates.get(), JOB_EVENTS_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    # Another worker process may be running the job: its updates only reach the row
+                    snapshot = await job_queue.get(job_id)
+                    if snapshot is None:
+                        break
+                    if snapshot["status"] == current["status"]:
+                        continue
+                current = snapshot
+                yield sse_event(current, event=current["status"])
+        finally:
+            job_queue.unsubscribe(job_id, updates)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/flashcards/{set_id}")
+async def get_flashcard_set(set_id: str, db: AsyncSession = Depends(get_replica_db)):
+    """Get a flashcard set with its cards resolved from the card store"""
+    flashcard_set = await db.get(FlashcardSet, set_id)
+    if not flashcard_set and read_router.replica is not None:
+        # Possibly created moments ago and not replicated yet
+        async with AsyncReadSessionLocal() as primary:
+            return await flashcard_set_response(primary, set_id)
+    return await flashcard_set_response(db, set_id, flashcard_set)
+
+async def flashcard_set_response(db: AsyncSession, set_id: str, flashcard_set: Optional[FlashcardSet] = None) -> Dict:
+    flashcard_set = flashcard_set or await db.get(FlashcardSet, set_id)
+    if not flashcard_set:
+        raise HTTPException(status_code=404, detail="Flashcard set not found")
+    return {
+        "set_id": flashcard_set.id,
+        "topic": flashcard_set.topic,
+        "title": flashcard_set.title,
+        "cards": await load_cards(db, flashcard_set),
+        "created_at": flashcard_set.created_at.isoformat()
+    }
+
 @app.get("/api/progress/{session_id}")
-async def get_progress(session_id: str, db: Session = Depends(get_db)):
-    # Get Quiz Scores
-    scores = db.query(QuizScore).filter(QuizScore.session_id == session_id).order_by(QuizScore.created_at.desc()).all()
-    
-    total_quizzes = len(scores)
-    avg_score = sum(s.score for s in scores) / total_quizzes if total_quizzes > 0 else 0
-    
-    # Get Flashcard Sets
-    flashcard_count = db.query(FlashcardSet).filter(FlashcardSet.session_id == session_id).count()
+async def get_progress(session_id: str, db: AsyncSession = Depends(get_replica_db)):
+    # Counters, average and streak are maintained incrementally in progress_summary
+    summary = await db.get(ProgressSummary, session_id)
+    if summary is None:
+        summary = await rebuild_summary(db, session_id)
+        if summary.quiz_count or summary.flashcard_sets:
+            # Session older than the summary table: keep the rebuilt row for the next request.
+            # A GET for a session with nothing to summarise writes nothing
+            summary = await db_writer.run(lambda w: load_summary(w, session_id))
     
     # Get Topics
-    topics_count = db.query(Topic).filter(Topic.session_id == session_id).count()
+    topics_count = await db.scalar(select(func.count(Topic.id)).where(Topic.session_id == session_id))
     
-    # Calculate streak
-    streak = 0
-    if scores:
-        dates = sorted(set(s.created_at.date() for s in scores), reverse=True)
-        streak = 1
-        for i in range(len(dates) - 1):
-            if (dates[i] - dates[i+1]).days == 1:
-                streak += 1
-            else:
-                break
+    # Latest scores with their quiz topic in one query
+    recent = (await db.execute(
+        select(QuizScore.quiz_id, QuizScore.score, QuizScore.created_at, Quiz.topic)
+        .outerjoin(Quiz, Quiz.id == QuizScore.quiz_id)
+        .where(QuizScore.session_id == session_id)
+        .order_by(QuizScore.created_at.desc())
+        .limit(5)
+    )).all()
+    recent_quizzes = [
+        {
+            "quiz_id": row.quiz_id,
+            "topic": row.topic or "Unknown",
+            "score": row.score,
+            "date": row.created_at.isoformat()
+        }
+        for row in recent
+    ]
     
-    recent_quizzes = []
-    for s in scores[:5]:
-        quiz = db.query(Quiz).filter(Quiz.id == s.quiz_id).first()
-        recent_quizzes.append({
-            "quiz_id": s.quiz_id,
-            "topic": quiz.topic if quiz else "Unknown",
-            "score": s.score,
-            "date": s.created_at.isoformat()
-        })
+    total_quizzes = summary.quiz_count or 0
+    avg_score = summary.score_sum / total_quizzes if total_quizzes > 0 else 0
     
     return {
         "total_quizzes": total_quizzes,
         "average_score": round(avg_score, 1),
         "topics_studied": topics_count,
-        "flashcard_sets": flashcard_count,
-        "learning_streak": streak,
+        "flashcard_sets": summary.flashcard_sets or 0,
+        "learning_streak": summary.streak_days or 0,
         "recent_quizzes": recent_quizzes
     }
 
+# -----------------------
+# Export / Import Endpoints
+# -----------------------
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+async def export_response(session_id: Optional[str], filename: str) -> StreamingResponse:
+    # Flush write-behind chat messages so the export includes them; the flusher keeps running
+    if not await chat_log.flush(session_id):
+        raise HTTPException(status_code=503, detail="Chat messages are still waiting for the database, try again shortly")
+
+    async def ndjson_stream():
+        async with read_router.session(session_id) as db, read_router.session(session_id) as lookup_db:
+            async for line in export_ndjson(db, lookup_db, session_id, batch=EXPORT_FETCH_SIZE):
+                yield line
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def import_ndjson(request: Request, session_id: Optional[str]) -> Dict:
+    importer = SessionImporter(db_writer, session_id=session_id, batch_size=IMPORT_BATCH_SIZE)
+    try:
+        stats = await importer.load(ndjson_records(request.stream()))
+    except (InvalidExport, ValueError, KeyError, TypeError) as e:
+        # ValueError covers malformed JSON lines and timestamps
+        raise HTTPException(status_code=400, detail={"error": f"Invalid import: {e}", "imported": importer.counts})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"error": str(e), "imported": importer.counts})
+    read_router.mark_written(session_id)
+    return stats
+
+@app.get("/api/sessions/{session_id}/export")
+async def export_session(session_id: str):
+    """Stream a session's topics, quizzes, scores, flashcard sets and chat history as NDJSON"""
+    return await export_response(session_id, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', session_id)}.ndjson")
+
+@app.post("/api/sessions/{session_id}/import")
+async def import_session(session_id: str, request: Request):
+    """Load an export (NDJSON request body) into this session"""
+    return await import_ndjson(request, session_id)
+
+@app.get("/api/admin/export", dependencies=[Depends(require_admin)])
+async def export_all():
+    """Stream every session's learning data as NDJSON"""
+    return await export_response(None, f"eduai-export-{datetime.utcnow():%Y%m%d-%H%M%S}.ndjson")
+
+@app.post("/api/admin/import", dependencies=[Depends(require_admin)])
+async def import_all(request: Request):
+    """Load a bulk export, keeping each row's session"""
+    return await import_ndjson(request, None)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
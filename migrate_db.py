@@ -0,0 +1,116 @@
+"""
+Bring an existing database up to date with the models in database.py.
+create_all only creates missing tables, so columns and indexes added to
+existing tables are applied here. Safe to run more than once.
+Records database.SCHEMA_VERSION, which the API checks at startup.
+"""
+
+from sqlalchemy import inspect, text
+from database import engine, Base, ChatHistory, SCHEMA_VERSION, stamp_schema
+
+# (table, column, SQL type)
+NEW_COLUMNS = [
+    ("flashcard_sets", "card_hashes", "JSON"),
+    ("flashcard_sets", "content_key", "VARCHAR(64)"),
+    ("quizzes", "answer_key", "JSON"),
+    ("quizzes", "answer_details", "JSON"),
+    ("quizzes", "bank_ids", "JSON"),
+    ("jobs", "owner", "VARCHAR(64)"),
+    ("chat_history", "token", "VARCHAR(32)"),
+]
+
+# (index name, table, columns, unique)
+NEW_INDEXES = [
+    ("ix_flashcard_sets_content_key", "flashcard_sets", ["content_key"], False),
+    ("ix_chat_history_session_created", "chat_history", ["session_id", "created_at"], False),
+    ("ix_chat_history_session_id_id", "chat_history", ["session_id", "id"], False),
+    ("ix_quizzes_session_created", "quizzes", ["session_id", "created_at"], False),
+    ("ix_quiz_scores_session_created", "quiz_scores", ["session_id", "created_at"], False),
+    ("ix_flashcard_sets_session_created", "flashcard_sets", ["session_id", "created_at"], False),
+    ("uq_topics_session_name", "topics", ["session_id", "name"], True),
+]
+
+
+def dedupe_topics(conn):
+    """Collapse duplicate (session_id, name) topic rows so the unique index can be built."""
+    groups = conn.execute(text(
+        "SELECT session_id, name, MIN(id), MAX(last_studied) FROM topics "
+        "GROUP BY session_id, name HAVING COUNT(*) > 1"
+    )).fetchall()
+    for session_id, name, keep_id, last_studied in groups:
+        conn.execute(
+            text("DELETE FROM topics WHERE session_id = :s AND name = :n AND id <> :keep"),
+            {"s": session_id, "n": name, "keep": keep_id}
+        )
+        conn.execute(text("UPDATE topics SET last_studied = :ts WHERE id = :keep"), {"ts": last_studied, "keep": keep_id})
+    if groups:
+        print(f"[FIXED] merged duplicate rows for {len(groups)} topics")
+
+
+def autoincrement_chat_history(conn):
+    """
+    On SQLite, rebuild chat_history as AUTOINCREMENT so ids of archived (deleted) rows are
+    never reused, and start new ids above every id archive blocks and summaries refer to.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'chat_history'")).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        print("[OK] chat_history ids are never reused")
+        return
+    for index in inspect(conn).get_indexes("chat_history"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    conn.execute(text("ALTER TABLE chat_history RENAME TO chat_history_old"))
+    ChatHistory.__table__.create(conn)
+    columns = ", ".join(c["name"] for c in inspect(conn).get_columns("chat_history_old"))
+    conn.execute(text(f"INSERT INTO chat_history ({columns}) SELECT {columns} FROM chat_history_old"))
+    conn.execute(text("DROP TABLE chat_history_old"))
+
+    used = [conn.execute(text("SELECT MAX(id) FROM chat_history")).scalar()]
+    tables = inspect(conn).get_table_names()
+    if "chat_archive_blocks" in tables:
+        used.append(conn.execute(text("SELECT MAX(last_id) FROM chat_archive_blocks")).scalar())
+    if "chat_summaries" in tables:
+        used.append(conn.execute(text("SELECT MAX(last_message_id) FROM chat_summaries")).scalar())
+    floor = max((u for u in used if u is not None), default=0)
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'chat_history'"))
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('chat_history', :seq)"), {"seq": floor})
+    print(f"[FIXED] chat_history rebuilt with AUTOINCREMENT, new ids start after {floor}")
+
+
+def migrate():
+    print("Creating missing tables...")
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, sql_type in NEW_COLUMNS:
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            if column in existing:
+                print(f"[OK] {table}.{column} already exists")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+            print(f"[ADDED] {table}.{column}")
+
+        autoincrement_chat_history(conn)
+
+        for name, table, columns, unique in NEW_INDEXES:
+            existing = {i["name"] for i in inspector.get_indexes(table)}
+            if name in existing:
+                print(f"[OK] index {name} already exists")
+                continue
+            if table == "topics" and unique:
+                dedupe_topics(conn)
+            conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})"))
+            print(f"[ADDED] index {name}")
+
+        stamp_schema(conn)
+        print(f"[OK] schema version {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    try:
+        migrate()
+        print("Migration completed.")
+    except Exception as e:
+        print(f"Migration failed: {e}")
@@ -3,7 +3,7 @@ echo Activating virtual environment...
 call venv\Scripts\activate
 
 echo Installing dependencies...
-pip install sqlalchemy pymysql fastapi uvicorn python-dotenv langchain-groq duckduckgo-search
+pip install sqlalchemy aiosqlite aiomysql pymysql fastapi uvicorn python-dotenv langchain-groq duckduckgo-search numpy
 
 echo Starting EduAI Server...
 uvicorn main:app --reload --host 127.0.0.1 --port 8000
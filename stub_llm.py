@@ -0,0 +1,88 @@
+"""
+Stand-in for ChatGroq used by the benchmark and concurrency scripts.
+Sleeps for a fixed latency instead of calling Groq, so runs are free and repeatable.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def sample_quiz(num_questions=5, topic="Sample", part=1):
+    return {
+        "title": f"{topic} Quiz",
+        "questions": [
+            {
+                "id": i,
+                "question": f"{topic} question {i}?" if part == 1 else f"{topic} part {part} question {i}?",
+                "options": ["A) Option 1", "B) Option 2", "C) Option 3", "D) Option 4"],
+                "correct_answer": "ABCD"[i % 4],
+                "explanation": f"Explanation {i}"
+            }
+            for i in range(1, num_questions + 1)
+        ]
+    }
+
+
+def sample_flashcards(num_cards=10, topic="Sample", part=1):
+    prefix = topic if part == 1 else f"{topic} part {part}"
+    return {
+        "title": f"{topic} Flashcards",
+        "cards": [
+            {"id": i, "front": f"{prefix} front {i}", "back": f"{prefix} back {i}", "hint": f"Hint {i}"}
+            for i in range(1, num_cards + 1)
+        ]
+    }
+
+
+class StubLLM:
+    """
+    Mimics the parts of the ChatGroq interface main.py uses.
+    Quiz and flashcard prompts get as many items as they ask for; per_item adds
+    latency per generated item, like output tokens on a real model.
+    """
+
+    def __init__(self, latency=0.5, reply=None, chunk_size=8, per_item=0.0):
+        self.latency = latency
+        self.per_item = per_item
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    def _content(self, messages):
+        if self.reply is not None:
+            return self.reply, 0
+        prompt = messages[-1].content
+        part = re.search(r"part (\d+) of", prompt)
+        part = int(part.group(1)) if part else 1
+        if '"questions"' in prompt:
+            count = int(re.search(r"with (\d+) questions", prompt).group(1))
+            return "```json\n" + json.dumps(sample_quiz(count, part=part)) + "\n```", count
+        if '"cards"' in prompt:
+            count = int(re.search(r"Create (\d+) flashcards", prompt).group(1))
+            return json.dumps(sample_flashcards(count, part=part)), count
+        return "Stub tutor reply.", 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        content, items = self._content(messages)
+        time.sleep(self.latency + self.per_item * items)
+        return AIMessage(content=content)
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        content, items = self._content(messages)
+        await asyncio.sleep(self.latency + self.per_item * items)
+        return AIMessage(content=content)
+
+    async def astream(self, messages, **kwargs):
+        self.calls += 1
+        content, items = self._content(messages)
+        chunks = [content[i:i + self.chunk_size] for i in range(0, len(content), self.chunk_size)] or [""]
+        delay = (self.latency + self.per_item * items) / len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield AIMessageChunk(content=chunk)
@@ -0,0 +1,203 @@
+"""
+Chat archive check: moving old messages into compressed blocks keeps the newest
+ones hot, never archives turns the rolling summary has not folded in (unless the
+session has gone cold, when it moves whole and its last turns are still read back as
+chat context), passes are not stuck on sessions that cannot be archived yet, ids of
+archived messages are never handed out again (also after migrating an old SQLite
+table), and /api/chat/history pages read the same across both tiers.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+
+import main
+from database import SessionLocal, AsyncSessionLocal, ChatArchiveBlock, ChatHistory, ChatSummary, dispose_engines
+from migrate_db import autoincrement_chat_history
+from utils.chat_archive import ChatArchiver
+from utils.chat_summary import ConversationSummarizer
+from utils.db_writer import DatabaseWriter
+
+
+def _seed(session_id, count, start, summarized):
+    db = SessionLocal()
+    try:
+        rows = [
+            ChatHistory(session_id=session_id, role="user" if i % 2 == 0 else "ai", content=f"{session_id} message {i}", created_at=start + timedelta(minutes=i))
+            for i in range(count)
+        ]
+        db.add_all(rows)
+        db.flush()
+        if summarized:
+            db.add(ChatSummary(session_id=session_id, summary="...", last_message_id=rows[summarized - 1].id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _pages(client, session_id, limit):
+    pages, before_id = [], None
+    while True:
+        url = f"/api/chat/history/{session_id}?limit={limit}" + (f"&before_id={before_id}" if before_id else "")
+        page = client.get(url).json()
+        pages.append([m["content"] for m in page["history"]])
+        if not page["has_more"]:
+            return pages
+        before_id = page["next_before_id"]
+
+
+def test_archive_keeps_history_readable_across_tiers():
+    client = TestClient(main.app)
+    now = datetime.utcnow()
+    # Active session: 100 messages, 90 summarized. Cold session: 15 messages two months old.
+    _seed("archive-active", 100, now - timedelta(hours=3), summarized=90)
+    _seed("archive-cold", 15, now - timedelta(days=60), summarized=15)
+
+    before = _pages(client, "archive-active", 30)
+    ndjson_before = client.get("/api/chat/history/archive-active?format=ndjson").text
+
+    async def archive():
+        archiver = ChatArchiver(DatabaseWriter(AsyncSessionLocal), keep_latest=20, block_size=25, interval=0)
+        try:
+            return await archiver.archive_once(now)
+        finally:
+            await archiver.writer.stop()
+            await dispose_engines()
+
+    # Active: 80 beyond the newest 20, as three full blocks (a partial tail waits). Cold: everything.
+    assert asyncio.run(archive()) == 75 + 15
+
+    db = SessionLocal()
+    try:
+        assert db.query(ChatHistory).filter_by(session_id="archive-active").count() == 25
+        assert db.query(ChatHistory).filter_by(session_id="archive-cold").count() == 0
+        assert db.query(ChatArchiveBlock).filter_by(session_id="archive-active").count() == 3
+    finally:
+        db.close()
+
+    assert _pages(client, "archive-active", 30) == before
+    assert client.get("/api/chat/history/archive-active?format=ndjson").text == ndjson_before
+    assert len(client.get("/api/chat/history/archive-cold").json()["history"]) == 15
+
+
+def test_archive_stops_at_the_summary():
+    now = datetime.utcnow()
+    _seed("archive-unsummarized", 60, now - timedelta(hours=1), summarized=10)
+
+    async def archive():
+        archiver = ChatArchiver(DatabaseWriter(AsyncSessionLocal), keep_latest=20, block_size=5, interval=0)
+        try:
+            return await archiver.archive_once(now)
+        finally:
+            await archiver.writer.stop()
+            await dispose_engines()
+
+    asyncio.run(archive())
+    db = SessionLocal()
+    try:
+        # 40 are beyond the newest 20, but only the 10 summarized ones may go
+        assert db.query(ChatHistory).filter_by(session_id="archive-unsummarized").count() == 50
+    finally:
+        db.close()
+
+
+def test_passes_are_not_stuck_on_unarchivable_sessions():
+    now = datetime.utcnow()
+    # Never summarized (too short) and not cold yet, then summarized but short of a full block
+    for i in range(600):
+        _seed(f"archive-short-{i:03}", 4, now - timedelta(days=2), summarized=0)
+    for i in range(3):
+        _seed(f"archive-waiting-{i}", 30, now - timedelta(hours=1), summarized=30)
+    _seed("archive-zz-ready", 500, now - timedelta(days=60), summarized=500)
+
+    async def archive():
+        archiver = ChatArchiver(DatabaseWriter(AsyncSessionLocal), keep_latest=2, block_size=50, interval=0, sessions_per_pass=2)
+        try:
+            passes = [await archiver.archive_once(now)]
+            # One round over the candidates, however many other tests left behind
+            while archiver._cursor:
+                passes.append(await archiver.archive_once(now))
+            return passes
+        finally:
+            await archiver.writer.stop()
+            await dispose_engines()
+
+    assert len(asyncio.run(archive())) > 1
+    db = SessionLocal()
+    try:
+        assert db.query(ChatHistory).filter_by(session_id="archive-zz-ready").count() == 0
+        assert db.query(ChatHistory).filter(ChatHistory.session_id.like("archive-short-%")).count() == 2400
+        assert db.query(ChatHistory).filter(ChatHistory.session_id.like("archive-waiting-%")).count() == 90
+    finally:
+        db.close()
+
+
+def test_cold_unsummarized_session_moves_whole():
+    now = datetime.utcnow()
+    _seed("archive-cold-short", 6, now - timedelta(days=45), summarized=0)
+
+    async def archive():
+        archiver = ChatArchiver(DatabaseWriter(AsyncSessionLocal), interval=0)
+        try:
+            moved = await archiver.archive_once(now)
+            async with AsyncSessionLocal() as db:
+                _, context = await ConversationSummarizer(None, None).load_context(db, "archive-cold-short", 4000)
+            return moved, [m.content for m in context]
+        finally:
+            await archiver.writer.stop()
+            await dispose_engines()
+
+    moved, context = asyncio.run(archive())
+    assert moved >= 6
+    assert context == [f"archive-cold-short message {i}" for i in range(6)]
+    db = SessionLocal()
+    try:
+        assert db.query(ChatHistory).filter_by(session_id="archive-cold-short").count() == 0
+    finally:
+        db.close()
+
+
+def test_archived_ids_are_never_reused():
+    db = SessionLocal()
+    try:
+        newest = ChatHistory(session_id="archive-ids", role="user", content="archived")
+        db.add(newest)
+        db.commit()
+        archived_id = newest.id
+        db.delete(newest)
+        db.commit()
+        later = ChatHistory(session_id="archive-ids", role="user", content="later")
+        db.add(later)
+        db.commit()
+        assert later.id > archived_id
+    finally:
+        db.close()
+
+
+def test_migration_rebuilds_chat_history_with_autoincrement():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'old.db')}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE chat_history (id INTEGER PRIMARY KEY, session_id VARCHAR(255), role VARCHAR(50), "
+            "content TEXT, created_at DATETIME, token VARCHAR(32))"
+        ))
+        conn.execute(text("CREATE INDEX ix_chat_history_session_id_id ON chat_history (session_id, id)"))
+        conn.execute(text("INSERT INTO chat_history (id, session_id, role, content) VALUES (1, 's', 'user', 'kept')"))
+        ChatArchiveBlock.__table__.create(conn)
+        conn.execute(text("INSERT INTO chat_archive_blocks (session_id, first_id, last_id) VALUES ('s', 2, 40)"))
+
+    with engine.begin() as conn:
+        autoincrement_chat_history(conn)
+        autoincrement_chat_history(conn)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO chat_history (session_id, role, content) VALUES ('s', 'user', 'new')"))
+        rows = conn.execute(text("SELECT id, content FROM chat_history ORDER BY id")).all()
+        sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = 'chat_history'")).scalar()
+        indexes = {i["name"] for i in inspect(conn).get_indexes("chat_history")}
+    assert [tuple(r) for r in rows] == [(1, "kept"), (41, "new")]
+    assert "AUTOINCREMENT" in sql.upper()
+    assert {"ix_chat_history_session_id_id", "ix_chat_history_session_created"} <= indexes
@@ -0,0 +1,94 @@
+"""
+Write-behind chat log check: a database outage longer than a few flushes loses no
+message (flushes back off and retry, appends are refused once the buffer is full),
+a session's messages can be flushed on demand without stopping the flusher, and a
+pending message is only hidden by its own flushed copy, not by an earlier identical
+message.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils.chat_log import ChatLog, ChatLogFull, merge_pending
+
+
+class FlakyWriter:
+    """Stands in for DatabaseWriter: the first `failures` writes raise, later ones store the rows."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.rows = []
+
+    async def execute(self, statement, values):
+        self.rows.extend(values)
+
+    async def run(self, op):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        return await op(self)
+
+
+def test_outage_loses_no_messages():
+    async def run():
+        writer = FlakyWriter(failures=8)
+        log = ChatLog(writer, flush_interval=0.01, max_backoff=0.05)
+        for i in range(5):
+            await log.append("s1", "user", f"message {i}")
+            await asyncio.sleep(0.03)
+        # Still readable while the database is down
+        assert len(log.pending("s1")) > 0
+        await asyncio.sleep(0.5)
+        await log.drain()
+        return writer, log
+
+    writer, log = asyncio.run(run())
+    assert [row["content"] for row in writer.rows] == [f"message {i}" for i in range(5)]
+    assert log.pending("s1") == [] and log.stats()["failed_flushes"] == 8
+
+
+def test_full_buffer_refuses_new_messages():
+    async def run():
+        writer = FlakyWriter(failures=1000)
+        log = ChatLog(writer, flush_interval=0.01, max_buffer=3, max_backoff=0.01)
+        for i in range(3):
+            await log.append("s1", "user", f"message {i}")
+        with pytest.raises(ChatLogFull):
+            await log.append("s1", "user", "one too many")
+        assert len(log.pending("s1")) == 3
+        writer.failures = 0
+        await log.drain()
+        return writer
+
+    assert len(asyncio.run(run()).rows) == 3
+
+
+def test_flush_one_session_keeps_the_flusher_running():
+    async def run():
+        writer = FlakyWriter(failures=0)
+        log = ChatLog(writer, flush_interval=3600, max_batch=2)
+        for i in range(3):
+            await log.append("s1", "user", f"s1 message {i}")
+        await log.append("s2", "user", "s2 message")
+        assert await log.flush("s1")
+        flushed = [row["content"] for row in writer.rows]
+        state = (log.pending("s1"), len(log.pending("s2")), log._task.done())
+        await log.drain()
+        return flushed, state
+
+    flushed, (s1_pending, s2_pending, stopped) = asyncio.run(run())
+    assert flushed == [f"s1 message {i}" for i in range(3)]
+    assert s1_pending == [] and s2_pending == 1 and not stopped
+
+
+def test_repeated_message_is_not_hidden_by_an_earlier_one():
+    stored = [SimpleNamespace(role="user", content="yes", token="t1")]
+    flushed_copy = SimpleNamespace(role="user", content="no", token="t2")
+    repeat = SimpleNamespace(role="user", content="yes", token="t3")
+    rows = stored + [SimpleNamespace(role="user", content="no", token="t2")]
+
+    assert merge_pending(rows, [flushed_copy, repeat]) == rows + [repeat]
+    # Archived rows have no token and never match
+    assert merge_pending([SimpleNamespace(role="user", content="yes")], [repeat])[-1] is repeat
@@ -0,0 +1,137 @@
+"""
+Grading check: answers are compared against the answer key stored with the quiz,
+results come from the stored answer details without reading the questions, quizzes
+saved before answer_key existed are still graded from their questions, and batch
+grading agrees with grading one submission at a time.
+"""
+
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import database
+import main
+from database import SessionLocal, Quiz, QuizScore
+from stub_llm import StubLLM
+from utils.grading import answer_char, answer_details, answer_key, grade, grade_batch
+
+
+def test_answer_char_normalizes_option_labels():
+    assert answer_char("A") == "A"
+    assert answer_char("b) 1080") == "B"
+    assert answer_char(" (C) Mitochondria") == "C"
+    assert answer_char("D.") == "D"
+    assert answer_char("Paris") == "P"
+    assert answer_char("") == ""
+
+
+def test_grade_against_key():
+    questions = [
+        {"id": 1, "question": "q1", "correct_answer": "A"},
+        {"id": 2, "question": "q2", "correct_answer": "C) Three"},
+        {"id": 3, "question": "q3", "correct_answer": ""},
+    ]
+    key = answer_key(questions)
+    assert key == [[1, "A"], [2, "C"], [3, ""]]
+
+    correct, results = grade(key, {"1": "A) One", "2": "B", "3": ""}, answer_details(questions))
+    assert correct == 1
+    assert [r["is_correct"] for r in results] == [True, False, False]
+    assert results[1] == {
+        "question_id": 2, "question": "q2", "user_answer": "B", "correct_answer": "C) Three", "is_correct": False, "explanation": ""
+    }
+
+
+def test_submit_reads_key_and_details_only():
+    client = TestClient(main.app)
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0)
+    quiz = client.post("/api/quiz/generate", json={"topic": "Grading", "num_questions": 3, "session_id": "grading-key"}).json()
+    answers = {str(q["id"]): q["correct_answer"] for q in quiz["questions"]}
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    engine = database.async_read_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.post("/api/quiz/submit", json={"quiz_id": quiz["quiz_id"], "session_id": "grading-key", "answers": answers})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.json()["correct"] == 3
+    assert [r["question"] for r in response.json()["results"]] == [q["question"] for q in quiz["questions"]]
+    assert [r["explanation"] for r in response.json()["results"]] == [q["explanation"] for q in quiz["questions"]]
+    selects = [s for s in statements if "FROM quizzes" in s]
+    assert selects and not any("quizzes.questions" in s for s in selects)
+
+
+def test_submit_quiz_saved_without_answer_key():
+    client = TestClient(main.app)
+    db = SessionLocal()
+    try:
+        db.add(Quiz(id="pre-key-quiz", topic="History", session_id="grading-student", questions=[
+            {"id": 1, "question": "q1", "options": ["A) x", "B) y"], "correct_answer": "B"},
+            {"id": 2, "question": "q2", "options": ["A) x", "B) y"], "correct_answer": "A) x"},
+        ]))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/api/quiz/submit", json={
+        "quiz_id": "pre-key-quiz", "session_id": "grading-student", "answers": {"1": "B) y", "2": "B) y"}
+    })
+    assert response.status_code == 200
+    assert response.json()["correct"] == 1
+    assert response.json()["score"] == 50.0
+    # Results and stored details keep the question text and the answer as written
+    assert response.json()["results"][1]["question"] == "q2"
+    assert response.json()["results"][1]["correct_answer"] == "A) x"
+    db = SessionLocal()
+    try:
+        details = db.query(QuizScore).filter_by(quiz_id="pre-key-quiz").one().details
+    finally:
+        db.close()
+    assert details == response.json()["results"]
+
+
+def test_grade_batch_matches_grade():
+    key = [[1, "A"], [2, "C"], [3, ""], [4, "D"]]
+    submissions = [
+        {"1": "A) One", "2": "C", "3": "", "4": "(D) Four"},
+        {"1": "B", "2": "c) three"},
+        {},
+        {"1": "a", "2": "Paris", "3": "A", "4": "D."},
+    ]
+    details = [[f"q{i}", f"{letter}) x", f"e{i}"] for i, letter in key]
+    assert grade_batch(key, submissions) == [grade(key, answers) for answers in submissions]
+    assert grade_batch(key, submissions, details) == [grade(key, answers, details) for answers in submissions]
+    assert [correct for correct, _ in grade_batch(key, submissions)] == [3, 1, 0, 2]
+
+
+def test_submit_batch_saves_every_score():
+    client = TestClient(main.app)
+    db = SessionLocal()
+    try:
+        db.add(Quiz(id="class-quiz", topic="Geography", session_id="teacher", answer_key=[[1, "A"], [2, "B"]], questions=[]))
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.post("/api/quiz/class-quiz/submit/batch", json={"submissions": [
+        {"session_id": "student-1", "answers": {"1": "A", "2": "B"}},
+        {"session_id": "student-2", "answers": {"1": "A", "2": "C"}},
+        {"session_id": "student-1", "answers": {"1": "D", "2": "D"}},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["graded"] == 3 and body["average_score"] == 50.0
+    assert [s["score"] for s in body["submissions"]] == [100.0, 50.0, 0.0]
+
+    db = SessionLocal()
+    try:
+        assert db.query(QuizScore).filter_by(quiz_id="class-quiz").count() == 3
+    finally:
+        db.close()
+    assert client.get("/api/progress/student-1").json()["total_quizzes"] == 2
+
+    assert client.post("/api/quiz/class-quiz/submit/batch", json={"submissions": []}).status_code == 400
+    assert client.post("/api/quiz/missing/submit/batch", json={"submissions": [{"session_id": "s", "answers": {}}]}).status_code == 404
@@ -0,0 +1,131 @@
+"""
+Background job check with two JobQueues on one database standing in for two uvicorn
+worker processes: a job left over from a previous run executes exactly once, a job
+a live sibling is running is left alone, one whose owner stopped heartbeating runs
+again, a worker outlives a database error, and the events stream of a job run
+elsewhere still ends when it finishes.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+import main
+from database import AsyncSessionLocal, SessionLocal, Job, dispose_engines
+from utils.db_writer import DatabaseWriter
+from utils.jobs import JobQueue
+
+
+def _add_jobs(*jobs):
+    db = SessionLocal()
+    try:
+        db.add_all(jobs)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _job(job_id):
+    db = SessionLocal()
+    try:
+        return db.get(Job, job_id)
+    finally:
+        db.close()
+
+
+def test_each_job_runs_once_across_worker_processes():
+    now = datetime.utcnow()
+    _add_jobs(
+        Job(id="job-leftover", kind="count", status="queued", payload={}, created_at=now, updated_at=now),
+        Job(id="job-sibling", kind="count", status="running", owner="sibling", payload={}, created_at=now, updated_at=now),
+        Job(id="job-orphan", kind="count", status="running", owner="gone", payload={}, created_at=now, updated_at=now - timedelta(minutes=5)),
+    )
+    runs = []
+
+    async def handler(payload):
+        runs.append(payload)
+        await asyncio.sleep(0.05)
+        return {"ok": True}
+
+    async def run():
+        queues = [JobQueue(DatabaseWriter(AsyncSessionLocal), workers=2, recover_interval=0) for _ in range(2)]
+        for queue in queues:
+            queue.register("count", handler)
+        await asyncio.gather(*(queue.start() for queue in queues))
+        await asyncio.gather(*(queue._queue.join() for queue in queues))
+        for queue in queues:
+            await queue.stop()
+            await queue.writer.stop()
+        await dispose_engines()
+
+    asyncio.run(run())
+    assert len(runs) == 2
+    assert _job("job-leftover").status == "done" and _job("job-orphan").status == "done"
+    assert _job("job-sibling").status == "running" and _job("job-sibling").owner == "sibling"
+
+
+def test_worker_survives_a_failed_claim():
+    runs = []
+
+    async def handler(payload):
+        runs.append(payload["n"])
+        return {"ok": True}
+
+    async def run():
+        queue = JobQueue(DatabaseWriter(AsyncSessionLocal), workers=1, recover_interval=0)
+        queue.register("survive", handler)
+        claim = queue._claim
+        failures = [ConnectionError("database is locked")]
+
+        async def flaky_claim(job_id):
+            if failures:
+                raise failures.pop()
+            return await claim(job_id)
+
+        queue._claim = flaky_claim
+        await queue.start()
+        first = await queue.submit("survive", {"n": 1})
+        second = await queue.submit("survive", {"n": 2})
+        # A dead worker would leave the second job on the queue forever
+        await asyncio.wait_for(queue._queue.join(), timeout=5)
+        statuses = [(await queue.get(first))["status"], (await queue.get(second))["status"]]
+        # The job whose claim failed is still queued, and the next recovery runs it
+        await queue.recover()
+        await queue._queue.join()
+        statuses.append((await queue.get(first))["status"])
+        await queue.stop()
+        await queue.writer.stop()
+        await dispose_engines()
+        return statuses
+
+    assert asyncio.run(run()) == ["queued", "done", "done"]
+    assert runs == [2, 1]
+
+
+def test_events_end_when_another_process_finishes_the_job(monkeypatch):
+    now = datetime.utcnow()
+    _add_jobs(Job(id="job-elsewhere", kind="quiz", status="running", owner="other", payload={}, created_at=now, updated_at=now))
+    monkeypatch.setattr(main, "JOB_EVENTS_POLL_SECONDS", 0.05)
+
+    async def finish_elsewhere():
+        await asyncio.sleep(0.2)
+        db = SessionLocal()
+        try:
+            job = db.get(Job, "job-elsewhere")
+            job.status, job.result = "done", {"quiz_id": "quiz-1"}
+            db.commit()
+        finally:
+            db.close()
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            finisher = asyncio.create_task(finish_elsewhere())
+            response = await asyncio.wait_for(client.get("/api/jobs/job-elsewhere/events"), timeout=5)
+            await finisher
+        await dispose_engines()
+        return response.text
+
+    events = [line[len("event: "):] for line in asyncio.run(run()).splitlines() if line.startswith("event: ")]
+    assert events == ["running", "done"]
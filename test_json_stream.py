@@ -0,0 +1,58 @@
+"""
+Streaming quiz parser check: questions come out of a fenced JSON document fed in
+chunks of any size, braces and brackets inside strings (escaped quotes included)
+do not end an object or the array, incomplete questions are skipped, and a title
+written after the questions is still picked up.
+"""
+
+import json
+
+from utils.json_stream import QuizStreamParser
+
+QUESTIONS = [
+    {
+        "id": 1,
+        "question": "Which of these closes a JSON object: } or ]?",
+        "options": ["A) }", "B) ]", "C) {\"nested\": [1, 2]}", "D) \\\\"],
+        "correct_answer": "A",
+        "explanation": "A \"}\" closes an object, a \"]\" closes an array."
+    },
+    {"id": 2, "question": "Incomplete question with no options", "correct_answer": "A"},
+    {
+        "id": 3,
+        "question": "What does \"[x for x in y]\" build?",
+        "options": ["A) A list", "B) A dict"],
+        "correct_answer": "A",
+        "explanation": "A list comprehension."
+    },
+]
+
+
+def _feed(document, size):
+    parser = QuizStreamParser()
+    questions = []
+    for start in range(0, len(document), size):
+        questions.extend(parser.feed(document[start:start + size]))
+    return parser, questions
+
+
+def test_questions_from_a_fenced_document_in_any_chunk_size():
+    document = "Here is your quiz:\n```json\n" + json.dumps({"title": "Brackets {and} [such]", "questions": QUESTIONS}, indent=2) + "\n```\nGood luck!"
+    for size in (1, 3, 7):
+        parser, questions = _feed(document, size)
+        assert questions == [QUESTIONS[0], QUESTIONS[2]], size
+        assert parser.done
+        assert parser.title == "Brackets {and} [such]"
+
+
+def test_title_after_the_questions():
+    document = json.dumps({"questions": QUESTIONS[:1], "title": "Late \"title\""})
+    for size in (1, 3, 7):
+        parser, questions = _feed(document, size)
+        assert questions == QUESTIONS[:1]
+        assert parser.title == 'Late "title"'
+
+
+def test_nothing_after_the_array_is_parsed():
+    parser, questions = _feed('{"questions": []} {"question": "q", "options": ["A) a", "B) b"], "correct_answer": "A"}', 5)
+    assert parser.done and questions == []
@@ -0,0 +1,133 @@
+"""
+Near-duplicate check: the MinHash/LSH index finds reworded questions (but not ones
+asking about other numbers, or about another word of a shared template) whether they
+sit in the insert buffer or a sorted run, generated quizzes lose their near-duplicates
+without a short quiz being cached, the bank keeps one copy of a reworded question, and
+a session's next quiz on a topic does not repeat its last one.
+"""
+
+import json
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, BankQuestion
+from stub_llm import StubLLM
+from utils.near_duplicates import NearDuplicateIndex, drop_near_duplicates
+
+
+def _quiz(texts):
+    return {
+        "title": "Quiz",
+        "questions": [
+            {"id": i, "question": text, "options": ["A) One", "B) Two", "C) Three", "D) Four"], "correct_answer": "A", "explanation": ""}
+            for i, text in enumerate(texts, 1)
+        ]
+    }
+
+
+def test_index_finds_reworded_questions():
+    index = NearDuplicateIndex(buffer_size=64)
+    for i in range(1000):
+        index.add(i, f"In which year did treaty number {i} between the northern kingdoms take effect?")
+    assert index.stats()["runs"] > 0
+
+    # Indexed before the last run was written, and still in the buffer
+    assert index.find("IN WHICH YEAR did treaty number 12 between the northern kingdoms take effect") == 12
+    assert index.find("In which year did treaty number 990 between the northern kingdoms take effect??") == 990
+    # Same wording, other numbers: a different question
+    assert index.find("In which year did treaty number 5000 between the northern kingdoms take effect?") is None
+    assert index.find("What is the boiling point of water at sea level?") is None
+    assert index.find("?!") is None
+
+
+def test_questions_sharing_a_template_are_distinct():
+    index = NearDuplicateIndex()
+    index.add("france", "Capital of France?")
+    index.add("len", "What does len() return in Python?")
+    assert index.find("Capital of Spain?") is None
+    assert index.find("What does list() return in Python?") is None
+    assert index.find("capital of FRANCE") == "france"
+    assert index.find("What does LEN() return in Python??") == "len"
+
+    countries = ["France", "Spain", "Italy", "Germany", "Norway", "Sweden", "Poland", "Austria", "Greece", "Portugal"]
+    questions = [{"question": f"What is the capital of {country}?"} for country in countries]
+    assert drop_near_duplicates(questions, "question") == questions
+    longer = [{"question": f"Which of the following cities is the capital of {country} in Europe today?"} for country in countries]
+    assert drop_near_duplicates(longer, "question") == longer
+
+
+def test_drop_near_duplicates_keeps_first_copies():
+    questions = [
+        {"question": "Which river is the longest river flowing through Egypt?"},
+        {"question": "Which ocean lies between Africa and Australia?"},
+        {"question": "Which river is the longest river flowing through Egypt today?"},
+        {"question": "What is 7 x 8?"},
+        {"question": "What is 7 x 9?"},
+    ]
+    kept = drop_near_duplicates(questions, "question")
+    assert [q["question"] for q in kept] == [questions[i]["question"] for i in (0, 1, 3, 4)]
+
+    seen = NearDuplicateIndex()
+    seen.add("old", "Which ocean lies between Africa and Australia?")
+    assert drop_near_duplicates(kept, "question", index=seen) == [kept[0], kept[2], kept[3]]
+    assert len(seen) == 1
+
+
+def test_generated_and_banked_questions_are_deduplicated():
+    client = TestClient(main.app)
+    reply = _quiz([
+        "Which river is the longest river flowing through Egypt?",
+        "Which river is the longest river flowing through Egypt today?",
+        "Which ocean lies between Africa and Australia?",
+    ])
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0, reply=json.dumps(reply))
+    first = client.post("/api/quiz/generate", json={"topic": "Rivers", "num_questions": 3, "session_id": "dup-1"}).json()
+    assert len(first["questions"]) == 2
+
+    # A reworded copy of a banked question is served from neither the LLM's reply nor the bank
+    reply = _quiz(["Which river is, in fact, the longest river flowing through Egypt?", "Which river flows through Baghdad?"])
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0, reply=json.dumps(reply))
+    second = client.post("/api/quiz/generate", json={"topic": "Rivers", "num_questions": 4, "session_id": "dup-2"}).json()
+    assert len(second["questions"]) == 3
+
+    db = SessionLocal()
+    try:
+        assert db.query(BankQuestion).filter_by(topic_key="rivers").count() == 3
+    finally:
+        db.close()
+
+
+def test_session_does_not_get_its_last_quiz_again():
+    client = TestClient(main.app)
+    stub = StubLLM(latency=0)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    first = client.post("/api/quiz/generate", json={"topic": "Geology", "num_questions": 5, "session_id": "dup-3"}).json()
+    # Bank and cache only hold what the session has seen, so the LLM is asked for new questions
+    second = client.post("/api/quiz/generate", json={"topic": "Geology", "num_questions": 5, "session_id": "dup-3"}).json()
+    assert stub.calls == 2
+    assert len(second["questions"]) == 5
+    assert not {q["question"] for q in first["questions"]} & {q["question"] for q in second["questions"]}
+
+    # Another session still gets the banked questions
+    other = client.post("/api/quiz/generate", json={"topic": "Geology", "num_questions": 5, "session_id": "dup-4"}).json()
+    assert stub.calls == 2 and len(other["questions"]) == 5
+
+
+def test_short_quiz_is_not_cached():
+    client = TestClient(main.app)
+    reply = _quiz([
+        "What is the capital of France?",
+        "What is the capital of Spain?",
+        "What does len() return in Python?",
+        "What does list() return in Python?",
+        "What is the capital of FRANCE??",
+    ])
+    stub = StubLLM(latency=0, reply=json.dumps(reply))
+    main.get_llm = lambda *args, **kwargs: stub
+    quiz = client.post("/api/quiz/generate", json={"topic": "Templates", "num_questions": 5, "session_id": "dup-5"}).json()
+    # Only the reworded copy goes; a fresh session still asks once more for the missing question
+    assert [q["question"] for q in quiz["questions"]] == [q["question"] for q in reply["questions"][:4]]
+    assert stub.calls == 2
+    assert main.quiz_cache.get("Templates", "medium", 5) is None
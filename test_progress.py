@@ -0,0 +1,80 @@
+"""
+Progress summary check: counters and streak kept in progress_summary must match
+what the old endpoint computed from the full score history, including for
+sessions whose history predates the summary table. Reading the progress of a
+session with no activity writes nothing.
+"""
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import database
+import main
+from database import SessionLocal, ProgressSummary, Quiz, QuizScore
+from stub_llm import StubLLM
+from utils.progress import advance_streak
+
+
+def test_advance_streak():
+    day = datetime(2025, 3, 10).date()
+    assert advance_streak(0, None, day) == 1
+    assert advance_streak(4, day, day) == 4
+    assert advance_streak(4, day - timedelta(days=1), day) == 5
+    assert advance_streak(4, day - timedelta(days=3), day) == 1
+
+
+def test_progress_counts_legacy_history_and_new_activity():
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0)
+    client = TestClient(main.app)
+    session_id = "progress-student"
+
+    # Three days of scores written before progress_summary existed
+    db = SessionLocal()
+    try:
+        db.add(Quiz(id="legacy-quiz", topic="Legacy", questions=[], session_id=session_id))
+        start = datetime.utcnow() - timedelta(days=2)
+        for i in range(3):
+            db.add(QuizScore(quiz_id="legacy-quiz", session_id=session_id, score=50 + i * 10, created_at=start + timedelta(days=i)))
+        db.commit()
+    finally:
+        db.close()
+
+    quiz = client.post("/api/quiz/generate", json={"topic": "Biology", "num_questions": 4, "session_id": session_id}).json()
+    answers = {str(q["id"]): q["correct_answer"] for q in quiz["questions"]}
+    assert client.post("/api/quiz/submit", json={"quiz_id": quiz["quiz_id"], "session_id": session_id, "answers": answers}).status_code == 200
+    assert client.post("/api/flashcards/generate", json={"topic": "Biology", "num_cards": 3, "session_id": session_id}).status_code == 200
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    # The endpoint reads through the async read engine, a first request rebuilds through the writer's
+    engines = {database.async_read_engine.sync_engine, database.async_engine.sync_engine}
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", listener)
+    try:
+        progress = client.get(f"/api/progress/{session_id}").json()
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", listener)
+
+    assert progress["total_quizzes"] == 4
+    assert progress["average_score"] == 70.0
+    assert progress["flashcard_sets"] == 1
+    assert progress["learning_streak"] == 3
+    assert [q["topic"] for q in progress["recent_quizzes"]] == ["Biology", "Legacy", "Legacy", "Legacy"]
+    # Summary row, topic count and the joined recent list, however long the history
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert selects and len(selects) <= 4
+
+
+def test_progress_of_an_inactive_session_is_not_stored():
+    client = TestClient(main.app)
+    progress = client.get("/api/progress/progress-nobody").json()
+    assert progress["total_quizzes"] == 0 and progress["learning_streak"] == 0 and progress["recent_quizzes"] == []
+
+    db = SessionLocal()
+    try:
+        assert db.get(ProgressSummary, "progress-nobody") is None
+    finally:
+        db.close()
@@ -0,0 +1,117 @@
+"""
+Question bank check: generated questions are banked, later quizzes on the topic are
+assembled from the bank without the LLM (which only writes a shortfall), answer stats
+keep questions with a broken key out, and the replenisher tops up popular topics
+only while the server is idle.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, AsyncSessionLocal, BankQuestion, Quiz, Topic, dispose_engines
+from stub_llm import StubLLM, sample_quiz
+from utils.db_writer import DatabaseWriter
+from utils.question_bank import QuestionReplenisher, usable
+
+
+def _bank(topic_key):
+    db = SessionLocal()
+    try:
+        return db.query(BankQuestion).filter_by(topic_key=topic_key).order_by(BankQuestion.id).all()
+    finally:
+        db.close()
+
+
+def test_usable_questions_only():
+    good = {"question": "2 + 2?", "options": ["A) 3", "B) 4"], "correct_answer": "B"}
+    assert usable(good)
+    assert not usable({**good, "correct_answer": "C"})
+    assert not usable({**good, "options": ["3", "4"]})
+    assert not usable({**good, "question": " "})
+
+
+def test_quizzes_come_from_the_bank():
+    client = TestClient(main.app)
+    stub = StubLLM(latency=0)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    first = client.post("/api/quiz/generate", json={"topic": "Astronomy", "num_questions": 5, "session_id": "bank-1"}).json()
+    assert stub.calls == 1 and len(first["questions"]) == 5
+    assert len(_bank("astronomy")) == 5
+
+    # Same topic, other spelling: no LLM call, every question carries its bank id
+    second = client.post("/api/quiz/generate", json={"topic": "  astronomy ", "num_questions": 4, "session_id": "bank-2"}).json()
+    assert stub.calls == 1 and len(second["questions"]) == 4
+    assert all("bank_id" not in q for q in second["questions"])
+    db = SessionLocal()
+    try:
+        bank_ids = db.get(Quiz, second["quiz_id"]).bank_ids
+    finally:
+        db.close()
+    assert len(bank_ids) == 4 and None not in bank_ids
+    assert sum(q.times_served for q in _bank("astronomy")) == 4
+
+    # Answering folds into the questions' stats
+    answers = {str(q["id"]): q["correct_answer"] for q in second["questions"]}
+    client.post("/api/quiz/submit", json={"quiz_id": second["quiz_id"], "session_id": "bank-2", "answers": answers})
+    served = [q for q in _bank("astronomy") if q.id in bank_ids]
+    assert all(q.times_answered == 1 and q.times_correct == 1 for q in served)
+
+    # Larger quiz: the bank's five plus three generated for the shortfall
+    extra = sample_quiz(3, topic="Astronomy", part=2)
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0, reply=json.dumps(extra))
+    third = client.post("/api/quiz/generate", json={"topic": "Astronomy", "num_questions": 8, "session_id": "bank-3"}).json()
+    assert len(third["questions"]) == 8
+    assert len(_bank("astronomy")) == 8
+
+
+def test_questions_with_a_broken_key_are_skipped():
+    client = TestClient(main.app)
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0)
+    client.post("/api/quiz/generate", json={"topic": "Optics", "num_questions": 3, "session_id": "bank-4"})
+
+    db = SessionLocal()
+    try:
+        broken = db.query(BankQuestion).filter_by(topic_key="optics").first()
+        broken.times_answered, broken.times_correct = 25, 0
+        db.commit()
+        broken_text = broken.question
+    finally:
+        db.close()
+
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0, reply="not json")
+    quiz = client.post("/api/quiz/generate", json={"topic": "Optics", "num_questions": 3, "session_id": "bank-5"}).json()
+    assert broken_text not in [q["question"] for q in quiz["questions"]]
+    assert len(quiz["questions"]) == 2
+
+
+def test_replenisher_tops_up_popular_topics_when_idle():
+    db = SessionLocal()
+    try:
+        db.add_all(Topic(session_id=f"fan-{i}", name="Volcanoes" if i % 3 else "volcanoes", last_studied=datetime.utcnow()) for i in range(6))
+        db.add(Topic(session_id="fan-x", name="Knitting", last_studied=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+    async def generate(topic, difficulty, count, part):
+        return sample_quiz(count, topic=topic, part=part + 1)["questions"]
+
+    async def replenish(busy):
+        replenisher = QuestionReplenisher(DatabaseWriter(AsyncSessionLocal), generate, target=12, batch=5, idle_after=0, topics_per_pass=1)
+        if busy:
+            replenisher.request_started()
+        try:
+            return await replenisher.replenish_once()
+        finally:
+            await replenisher.writer.stop()
+            await dispose_engines()
+
+    assert asyncio.run(replenish(busy=True)) == 0
+    assert asyncio.run(replenish(busy=False)) == 12
+    assert len(_bank("volcanoes")) == 12 and not _bank("knitting")
+    assert asyncio.run(replenish(busy=False)) == 0
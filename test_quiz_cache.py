@@ -0,0 +1,111 @@
+"""
+Quiz cache check: shuffling relabels options A), B), ... and moves correct_answer with
+its option (a wrong remap would mis-grade every cache hit), and both cache backends
+expire entries after the TTL and evict the least recently used one when full. The
+SQLite backend writes hits' access times in batches, and async lookups agree with sync ones.
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import pytest
+
+from utils.quiz_cache import QuizCache, MemoryCacheBackend, SQLiteCacheBackend, shuffle_quiz
+
+QUIZ = {
+    "title": "Capitals",
+    "questions": [
+        {"id": 1, "question": "Capital of France?", "options": ["A) Berlin", "B) Paris", "C) Rome", "D) Madrid"], "correct_answer": "B"},
+        {"id": 2, "question": "Capital of Italy?", "options": ["a. Rome", "b. Paris", "c. Oslo"], "correct_answer": "A) Rome"},
+        {"id": 3, "question": "Capital of Norway?", "options": ["(A) Oslo", "(B) Bern"], "correct_answer": "a"},
+        {"id": 4, "question": "True or false: Bern is a capital.", "options": ["True", "False"], "correct_answer": "True"},
+    ]
+}
+ANSWERS = {"Capital of France?": "Paris", "Capital of Italy?": "Rome", "Capital of Norway?": "Oslo"}
+
+
+def _correct_body(question):
+    for option in question["options"]:
+        if option.startswith(f"{question['correct_answer']}) "):
+            return option[3:]
+    return None
+
+
+def test_shuffle_keeps_every_answer_correct():
+    original = {**QUIZ, "questions": [dict(q) for q in QUIZ["questions"]]}
+    for seed in range(50):
+        shuffled = shuffle_quiz(QUIZ, random.Random(seed))
+        assert [q["id"] for q in shuffled["questions"]] == [1, 2, 3, 4]
+        for question in shuffled["questions"]:
+            if question["question"] in ANSWERS:
+                labels = [o[:3] for o in question["options"]]
+                assert labels == [f"{chr(ord('A') + i)}) " for i in range(len(labels))]
+                assert _correct_body(question) == ANSWERS[question["question"]]
+            else:
+                # Unlabelled options keep their order and answer
+                assert question["options"] == ["True", "False"] and question["correct_answer"] == "True"
+    assert QUIZ == original
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=2)
+    return SQLiteCacheBackend(os.path.join(tempfile.mkdtemp(), "quiz_cache.db"), max_entries=2)
+
+
+def test_entries_expire_after_the_ttl(backend, monkeypatch):
+    cache = QuizCache(backend, ttl=60)
+    cache.set("Biology", "Medium", 5, QUIZ)
+    assert cache.get("  biology ", "medium", 5) == QUIZ
+    assert cache.get("Biology", "medium", 6) is None
+
+    later = time.time() + 61
+    monkeypatch.setattr("utils.quiz_cache.time.time", lambda: later)
+    assert cache.get("Biology", "medium", 5) is None
+    assert cache.stats()["expired"] == 1 and len(backend) == 0
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    cache = QuizCache(backend)
+    cache.set("a", "easy", 1, {"title": "A"})
+    time.sleep(0.01)
+    cache.set("b", "easy", 1, {"title": "B"})
+    time.sleep(0.01)
+    cache.get("a", "easy", 1)["title"] = "changed" # callers get a copy
+    time.sleep(0.01)
+    cache.set("c", "easy", 1, {"title": "C"})
+
+    assert cache.get("b", "easy", 1) is None
+    assert cache.get("a", "easy", 1) == {"title": "A"}
+    assert cache.get("c", "easy", 1) == {"title": "C"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_sqlite_hits_are_written_in_batches():
+    path = os.path.join(tempfile.mkdtemp(), "quiz_cache.db")
+    cache = QuizCache(SQLiteCacheBackend(path, touch_batch=3, touch_interval=3600))
+    for name in "abc":
+        cache.set(name, "easy", 1, {"title": name})
+
+    def last_access():
+        conn = sqlite3.connect(path)
+        try:
+            return dict(conn.execute("SELECT key, last_access FROM quiz_cache").fetchall())
+        finally:
+            conn.close()
+
+    written = last_access()
+    time.sleep(0.01)
+    assert asyncio.run(cache.aget("a", "easy", 1)) == {"title": "a"}
+    cache.get("a", "easy", 1)
+    cache.get("b", "easy", 1)
+    assert last_access() == written
+    # The third key hit writes all three
+    cache.get("c", "easy", 1)
+    assert all(at > written[key] for key, at in last_access().items())
+    assert asyncio.run(cache.aget("d", "easy", 1)) is None
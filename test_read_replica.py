@@ -0,0 +1,81 @@
+"""
+Read routing check with two SQLite files standing in for a primary and a lagging
+replica: reads go to the replica except for a session that just wrote, which
+reads its own write from the primary until the sticky window passes, also when the
+write happened in another worker sharing the file store.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from database import Base, ReadRouter, SQLiteStickyStore, Topic
+
+
+def test_reads_stick_to_primary_after_a_write():
+    tmpdir = tempfile.mkdtemp()
+    primary_path = os.path.join(tmpdir, "primary.db")
+    replica_path = os.path.join(tmpdir, "replica.db")
+    Base.metadata.create_all(bind=create_engine(f"sqlite:///{primary_path}"))
+    shutil.copy(primary_path, replica_path)
+
+    async def run():
+        primary_engine = create_async_engine(f"sqlite+aiosqlite:///{primary_path}")
+        replica_engine = create_async_engine(f"sqlite+aiosqlite:///{replica_path}")
+        router = ReadRouter(
+            async_sessionmaker(primary_engine, expire_on_commit=False),
+            async_sessionmaker(replica_engine, expire_on_commit=False),
+            sticky_seconds=0.2
+        )
+
+        async def topics(session_id):
+            async with router.session(session_id) as db:
+                return await db.scalar(select(func.count(Topic.id)).where(Topic.session_id == session_id))
+
+        # The replica copy never receives this write
+        async with router.primary() as db:
+            db.add(Topic(session_id="writer", name="Algebra"))
+            await db.commit()
+        router.mark_written("writer")
+
+        try:
+            assert await topics("writer") == 1
+            assert await topics("reader") == 0
+            time.sleep(0.25)
+            assert await topics("writer") == 0
+            assert router.stats()["primary_reads"] == 1
+            assert router.stats()["replica_reads"] == 2
+        finally:
+            await primary_engine.dispose()
+            await replica_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_without_replica_everything_reads_the_primary():
+    router = ReadRouter(lambda: "primary")
+    router.mark_written("student")
+    assert router.session("student") == "primary"
+    assert router.session() == "primary"
+    assert router.stats()["sticky_sessions"] == 0
+
+
+def test_workers_share_write_times_through_the_file_store():
+    path = os.path.join(tempfile.mkdtemp(), "sticky.db")
+    # Two routers standing in for two worker processes on one host
+    writer = ReadRouter(lambda: "primary", lambda: "replica", sticky_seconds=0.5, store=SQLiteStickyStore(path, refresh_interval=0.02))
+    reader = ReadRouter(lambda: "primary", lambda: "replica", sticky_seconds=0.5, store=SQLiteStickyStore(path, refresh_interval=0.02))
+
+    writer.mark_written("student")
+    # The writer's own reads stick at once, other workers see it after their next reload
+    assert writer.session("student") == "primary"
+    time.sleep(0.1)
+    assert reader.session("student") == "primary"
+    assert reader.session("other") == "replica"
+    time.sleep(0.5)
+    assert reader.session("student") == "replica"
@@ -0,0 +1,69 @@
+"""
+Session export/import check: a session's data exported as NDJSON and imported into
+another session reads back the same, including archived chat history, and the
+admin endpoints stay closed without ADMIN_TOKEN.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal, ChatHistory
+from stub_llm import StubLLM
+from utils.chat_archive import pack_block
+
+
+def _records(text):
+    lines = [json.loads(line) for line in text.splitlines()]
+    return lines[0], lines[1:]
+
+
+def test_export_then_import_into_another_session():
+    main.get_llm = lambda *args, **kwargs: StubLLM(latency=0)
+    client = TestClient(main.app)
+    source = "export-source"
+
+    quiz = client.post("/api/quiz/generate", json={"topic": "Chemistry", "num_questions": 3, "session_id": source}).json()
+    answers = {str(q["id"]): q["correct_answer"] for q in quiz["questions"]}
+    client.post("/api/quiz/submit", json={"quiz_id": quiz["quiz_id"], "session_id": source, "answers": answers})
+    client.post("/api/flashcards/generate", json={"topic": "Chemistry", "num_cards": 3, "session_id": source})
+
+    start = datetime.utcnow() - timedelta(days=1)
+    db = SessionLocal()
+    try:
+        old = [ChatHistory(id=i + 1, role="user", content=f"archived {i}", created_at=start + timedelta(minutes=i)) for i in range(5)]
+        db.add(pack_block(source, old))
+        db.add_all(ChatHistory(session_id=source, role="ai", content=f"hot {i}", created_at=start + timedelta(hours=1, minutes=i)) for i in range(5))
+        db.commit()
+    finally:
+        db.close()
+
+    exported = client.get(f"/api/sessions/{source}/export")
+    assert exported.status_code == 200
+    header, records = _records(exported.text)
+    assert header["format"] == "eduai-export" and header["session_id"] == source
+    counts = {}
+    for record in records:
+        counts[record["table"]] = counts.get(record["table"], 0) + 1
+    assert counts == {"topics": 1, "quizzes": 1, "quiz_scores": 1, "flashcard_sets": 1, "chat_history": 10}
+
+    imported = client.post("/api/sessions/export-copy/import", content=exported.content)
+    assert imported.status_code == 200
+    assert imported.json()["rows"] == 14
+
+    history = [m["content"] for m in client.get("/api/chat/history/export-copy?limit=100").json()["history"]]
+    assert history == [f"archived {i}" for i in range(5)] + [f"hot {i}" for i in range(5)]
+    assert client.get("/api/progress/export-copy").json()["average_score"] == 100.0
+
+    _, copied = _records(client.get("/api/sessions/export-copy/export").text)
+    strip = lambda r: {k: v for k, v in r["row"].items() if k not in ("id", "quiz_id", "session_id")}
+    assert [strip(r) for r in copied] == [strip(r) for r in records]
+
+
+def test_import_rejects_bad_input_and_admin_needs_token():
+    client = TestClient(main.app)
+    assert client.post("/api/sessions/bad/import", content=b'{"table": "chat_history"}\n').status_code == 400
+    assert client.post("/api/sessions/bad/import", content=b"not json\n").status_code == 400
+    assert client.get("/api/admin/export").status_code == 403
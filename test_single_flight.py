@@ -0,0 +1,98 @@
+"""
+Concurrency check for request coalescing: a class of 40 students asking for the
+same quiz at once should cost exactly one upstream LLM call, while every student
+still gets their own persisted Quiz / FlashcardSet row.
+"""
+
+import asyncio
+
+import httpx
+
+import main
+from database import SessionLocal, Quiz, FlashcardSet, dispose_engines
+from stub_llm import StubLLM
+from utils.single_flight import SingleFlight
+
+CLASS_SIZE = 40
+
+
+async def _post_concurrently(path, payload_fn):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        responses = await asyncio.gather(*(client.post(path, json=payload_fn(i)) for i in range(CLASS_SIZE)))
+    # Pooled async connections belong to this event loop, the next asyncio.run starts a new one
+    await dispose_engines()
+    for res in responses:
+        assert res.status_code == 200, res.text
+    return [res.json() for res in responses]
+
+
+def test_identical_quiz_requests_share_one_llm_call():
+    stub = StubLLM(latency=0.3)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    results = asyncio.run(_post_concurrently(
+        "/api/quiz/generate",
+        lambda i: {"topic": "Photosynthesis", "difficulty": "medium", "num_questions": 5, "session_id": f"student-{i}"}
+    ))
+
+    quiz_ids = {r["quiz_id"] for r in results}
+    assert stub.calls == 1
+    assert len(quiz_ids) == CLASS_SIZE
+
+    db = SessionLocal()
+    try:
+        assert db.query(Quiz).filter(Quiz.id.in_(quiz_ids)).count() == CLASS_SIZE
+    finally:
+        db.close()
+
+
+def test_identical_flashcard_requests_share_one_llm_call():
+    stub = StubLLM(latency=0.3)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    results = asyncio.run(_post_concurrently(
+        "/api/flashcards/generate",
+        lambda i: {"topic": "Cell Biology", "num_cards": 10, "session_id": f"student-{i}"}
+    ))
+
+    set_ids = {r["set_id"] for r in results}
+    assert stub.calls == 1
+    assert len(set_ids) == CLASS_SIZE
+
+    db = SessionLocal()
+    try:
+        assert db.query(FlashcardSet).filter(FlashcardSet.id.in_(set_ids)).count() == CLASS_SIZE
+    finally:
+        db.close()
+
+
+def test_different_requests_are_not_coalesced():
+    stub = StubLLM(latency=0.1)
+    main.get_llm = lambda *args, **kwargs: stub
+
+    asyncio.run(_post_concurrently(
+        "/api/quiz/generate",
+        lambda i: {"topic": f"Distinct Topic {i % 4}", "num_questions": 5, "session_id": f"student-{i}"}
+    ))
+
+    assert stub.calls == 4
+
+
+def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, select, union
+
+from database import AsyncReadSessionLocal, ChatArchiveBlock, ChatHistory, ChatSummary
+
+# Same attributes as the chat_history columns the history endpoint reads
+ArchivedMessage = namedtuple("ArchivedMessage", ["id", "role", "content", "created_at"])
+
+
+class ArchiveConflict(Exception):
+    """The rows to archive changed underneath (another worker archived them first)."""
+
+
+def pack_block(session_id, rows):
+    """Build the archive block for rows (oldest first) of one session."""
+    payload = json.dumps(
+        [[r.id, r.role, r.content, r.created_at.isoformat() if r.created_at else None] for r in rows],
+        separators=(",", ":")
+    ).encode()
+    return ChatArchiveBlock(
+        session_id=session_id,
+        first_id=rows[0].id,
+        last_id=rows[-1].id,
+        message_count=len(rows),
+        first_at=rows[0].created_at,
+        last_at=rows[-1].created_at,
+        payload=zlib.compress(payload, 6)
+    )
+
+
+def unpack_block(payload):
+    return [
+        ArchivedMessage(id, role, content, datetime.fromisoformat(created_at) if created_at else None)
+        for id, role, content, created_at in json.loads(zlib.decompress(payload))
+    ]
+
+
+async def read_archive(db, session_id, before_id=None, limit=50):
+    """The newest `limit` archived messages older than before_id, oldest -> newest."""
+    query = select(ChatArchiveBlock.payload).where(ChatArchiveBlock.session_id == session_id)
+    if before_id is not None:
+        query = query.where(ChatArchiveBlock.first_id < before_id)
+    rows = []
+    # Blocks newest first; a page usually needs one
+    result = await db.stream_scalars(query.order_by(ChatArchiveBlock.first_id.desc()))
+    async for payload in result:
+        block = [m for m in unpack_block(payload) if before_id is None or m.id < before_id]
+        rows = block + rows
+        if len(rows) >= limit:
+            break
+    await result.close()
+    return rows[-limit:] if limit else []
+
+
+async def stream_archive(db, session_id, before_id=None):
+    """Every archived message older than before_id, oldest first."""
+    query = select(ChatArchiveBlock.payload).where(ChatArchiveBlock.session_id == session_id)
+    if before_id is not None:
+        query = query.where(ChatArchiveBlock.first_id < before_id)
+    result = await db.stream_scalars(query.order_by(ChatArchiveBlock.first_id.asc()))
+    async for payload in result:
+        for message in unpack_block(payload):
+            if before_id is None or message.id < before_id:
+                yield message
+
+
+class ChatArchiver:
+    """
+    Keeps chat_history small: every `interval` seconds, messages older than max_age or
+    beyond the newest keep_latest of their session move into chat_archive_blocks, in
+    compressed blocks of block_size. Only a prefix of each session moves, so archived
+    ids are always below the hot ones, and never past what the rolling summary has
+    folded in while the session is active (utils/chat_summary.py reads unsummarized
+    turns from chat_history). A session whose newest message is older than max_age has
+    gone cold and moves whole, summarized or not (short sessions never get a summary);
+    load_context reads its last turns back from the archive. A shorter tail is archived
+    only once the session has gone cold. Passes page through candidate sessions by id,
+    so sessions waiting on a full block do not hold the others back.
+    """
+
+    def __init__(self, writer, max_age=timedelta(days=30), keep_latest=200, block_size=200,
+                 interval=3600, sessions_per_pass=500):
+        self.writer = writer
+        self.max_age = max_age
+        self.keep_latest = keep_latest
+        self.block_size = block_size
+        self.interval = interval
+        self.sessions_per_pass = sessions_per_pass
+        self.archived = 0
+        self.blocks = 0
+        self._cursor = ""
+        self._task = None
+
+    def start(self):
+        if self.interval and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {"archived": self.archived, "blocks": self.blocks, "running": self._task is not None}
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.archive_once()
+            except Exception as e:
+                print(f"Error archiving chat history: {e}")
+
+    async def archive_once(self, now=None):
+        """
+        One pass over up to sessions_per_pass sessions, continuing after the last pass's
+        final session; returns the number of messages archived.
+        """
+        cutoff = (now or datetime.utcnow()) - self.max_age
+        summarized = ChatHistory.id <= ChatSummary.last_message_id
+        candidates = union(
+            # Gone cold: moves whole
+            select(ChatHistory.session_id).group_by(ChatHistory.session_id)
+            .having(func.max(ChatHistory.created_at) < cutoff),
+            # Old summarized turns
+            select(ChatHistory.session_id).join(ChatSummary, ChatSummary.session_id == ChatHistory.session_id)
+            .where(summarized, ChatHistory.created_at < cutoff),
+            # Summarized turns beyond the newest keep_latest
+            select(ChatHistory.session_id).join(ChatSummary, ChatSummary.session_id == ChatHistory.session_id)
+            .group_by(ChatHistory.session_id)
+            .having(func.count(ChatHistory.id) > self.keep_latest, func.min(ChatHistory.id) <= func.max(ChatSummary.last_message_id))
+        ).subquery()
+        async with AsyncReadSessionLocal() as db:
+            sessions = (await db.scalars(
+                select(candidates.c.session_id).where(candidates.c.session_id > self._cursor)
+                .order_by(candidates.c.session_id).limit(self.sessions_per_pass)
+            )).all()
+        # Start over once the end is reached
+        self._cursor = sessions[-1] if len(sessions) == self.sessions_per_pass else ""
+
+        moved = 0
+        for session_id in sessions:
+            moved += await self._archive_session(session_id, cutoff)
+        return moved
+
+    async def _archive_session(self, session_id, cutoff):
+        async with AsyncReadSessionLocal() as db:
+            in_session = ChatHistory.session_id == session_id
+            beyond_latest = await db.scalar(
+                select(ChatHistory.id).where(in_session)
+                .order_by(ChatHistory.id.desc()).offset(self.keep_latest).limit(1)
+            )
+            too_old = await db.scalar(select(func.max(ChatHistory.id)).where(in_session, ChatHistory.created_at < cutoff))
+            newest = await db.scalar(select(func.max(ChatHistory.id)).where(in_session))
+            if too_old is not None and too_old == newest:
+                # Gone cold: nothing is waiting to be summarized any more
+                boundary = newest
+            else:
+                summarized = await db.scalar(select(ChatSummary.last_message_id).where(ChatSummary.session_id == session_id))
+                boundary = min(max(beyond_latest or 0, too_old or 0), summarized or 0)
+            if not boundary:
+                return 0
+            rows = (await db.execute(
+                select(ChatHistory.id, ChatHistory.role, ChatHistory.content, ChatHistory.created_at)
+                .where(in_session, ChatHistory.id <= boundary).order_by(ChatHistory.id.asc())
+            )).all()
+
+        moved = 0
+        for start in range(0, len(rows), self.block_size):
+            chunk = rows[start:start + self.block_size]
+            if len(chunk) < self.block_size and (chunk[-1].created_at or cutoff) >= cutoff:
+                # Wait for a full block while the session is still active
+                break
+            try:
+                await self.writer.run(lambda db, chunk=chunk: self._move(db, session_id, chunk))
+            except ArchiveConflict:
+                break
+            moved += len(chunk)
+            self.archived += len(chunk)
+            self.blocks += 1
+        return moved
+
+    @staticmethod
+    async def _move(db, session_id, chunk):
+        ids = [r.id for r in chunk]
+        result = await db.execute(delete(ChatHistory).where(ChatHistory.id.in_(ids)))
+        if result.rowcount != len(ids):
+            raise ArchiveConflict(session_id)
+        db.add(pack_block(session_id, chunk))
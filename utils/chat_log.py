@@ -0,0 +1,193 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from database import ChatHistory, read_router
+
+
+class ChatLogFull(RuntimeError):
+    """The write-behind buffer is at max_buffer because the database keeps refusing writes."""
+
+
+def merge_pending(rows, pending):
+    """
+    Append unflushed messages to rows read from the database (both oldest -> newest).
+    Take the pending snapshot before running the query: a flush that commits while the
+    query runs can put the same message in both, so pending messages whose token is
+    among the rows are skipped. A repeated message ("yes" twice) has its own token.
+    """
+    if not pending:
+        return list(rows)
+    stored = {r.token for r in rows if getattr(r, "token", None)}
+    return list(rows) + [p for p in pending if p.token not in stored]
+
+
+class ChatLog:
+    """
+    Write-behind persistence for chat_history. append() returns as soon as the message
+    is buffered; a background task writes the buffer as one bulk INSERT when it reaches
+    max_batch messages or every flush_interval seconds. Readers merge pending(session_id)
+    into what they query (see merge_pending) so a session always sees its own messages.
+    durability="sync" commits every message before append() returns instead.
+
+    Failed flushes are retried with backoff (up to max_backoff seconds apart) and
+    nothing buffered is dropped; once max_buffer messages wait, append() raises
+    ChatLogFull rather than accept a message it may not be able to keep.
+    """
+
+    # Failed flushes drain() tolerates at shutdown before reporting what it could not write
+    MAX_DRAIN_ATTEMPTS = 5
+
+    def __init__(self, writer, durability="batched", max_batch=100, flush_interval=0.05, max_buffer=10000, max_backoff=5.0):
+        self.writer = writer
+        self.durability = durability
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_backoff = max_backoff
+        self.flushes = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+        self._buffer = []
+        self._by_session = {}
+        self._failures = 0
+        self._in_flight = set() # futures of writes under way, done when they finish
+        self._closing = False
+        self._wake = None
+        self._task = None
+        self._loop = None
+
+    async def append(self, session_id, role, content):
+        row = ChatHistory(session_id=session_id, role=role, content=content, created_at=datetime.utcnow(), token=uuid.uuid4().hex)
+        if self.durability == "sync":
+            await self.writer.add(row)
+            read_router.mark_written(session_id)
+            return row
+
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._flusher())
+        if len(self._buffer) >= self.max_buffer:
+            raise ChatLogFull(f"{len(self._buffer)} chat messages are waiting for the database")
+        self._buffer.append(row)
+        self._by_session.setdefault(session_id, []).append(row)
+        if len(self._buffer) >= self.max_batch:
+            self._wake.set()
+        return row
+
+    def pending(self, session_id):
+        """Messages for this session not yet committed, oldest first."""
+        return list(self._by_session.get(session_id, ()))
+
+    async def flush(self, session_id=None):
+        """
+        Write the buffered messages now (only session_id's, if given) and wait for writes
+        already under way, leaving the background flusher running. Tries each batch once:
+        returns False if some of those messages are still unwritten.
+        """
+        def wanted(row):
+            return session_id is None or row.session_id == session_id
+
+        while True:
+            batch = [r for r in self._buffer if wanted(r)][:self.max_batch]
+            if not batch:
+                break
+            taken = {id(r) for r in batch}
+            self._buffer = [r for r in self._buffer if id(r) not in taken]
+            if not await self._write(batch):
+                return False
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        return not any(wanted(r) for r in self._buffer)
+
+    async def drain(self):
+        """Stop the background flusher and write everything still buffered."""
+        if self._task is not None and self._loop is asyncio.get_running_loop():
+            # Let an in-progress flush finish rather than cancelling it halfway
+            self._closing = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._closing = False
+        attempts = 0
+        while self._buffer:
+            if await self._flush():
+                continue
+            attempts += 1
+            if attempts >= self.MAX_DRAIN_ATTEMPTS:
+                print(f"Error: {len(self._buffer)} chat messages could not be written before shutdown")
+                return
+            await asyncio.sleep(self._backoff())
+
+    def stats(self):
+        return {
+            "durability": self.durability,
+            "buffered": len(self._buffer),
+            "flushes": self.flushes,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes
+        }
+
+    def _backoff(self):
+        return min(self.flush_interval * 2 ** self._failures, self.max_backoff)
+
+    async def _flusher(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._buffer and not self._closing:
+                if not await self._flush():
+                    # Database unavailable: the messages stay buffered (and visible through pending)
+                    await asyncio.sleep(self._backoff())
+                    continue
+                if len(self._buffer) >= self.max_batch:
+                    # Still backlogged: flush again without waiting out the interval
+                    self._wake.set()
+
+    async def _flush(self):
+        """Write the oldest max_batch buffered messages; False (and still buffered) if that failed."""
+        batch, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+        return await self._write(batch)
+
+    async def _write(self, batch):
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight.add(done)
+        try:
+            return await self._insert(batch)
+        finally:
+            self._in_flight.discard(done)
+            done.set_result(None)
+
+    async def _insert(self, batch):
+        values = [
+            {"session_id": r.session_id, "role": r.role, "content": r.content, "created_at": r.created_at, "token": r.token}
+            for r in batch
+        ]
+        try:
+            await self.writer.run(lambda db: db.execute(insert(ChatHistory), values))
+        except Exception as e:
+            self._failures += 1
+            self.failed_flushes += 1
+            print(f"Error flushing chat messages, retrying in {self._backoff():.2f}s: {e}")
+            self._buffer = batch + self._buffer
+            return False
+        self._failures = 0
+        self.flushes += 1
+        self.flushed += len(batch)
+
+        for row in batch:
+            read_router.mark_written(row.session_id)
+            rows = self._by_session.get(row.session_id)
+            if rows is None:
+                continue
+            rows[:] = [r for r in rows if r is not row]
+            if not rows:
+                del self._by_session[row.session_id]
+        return True
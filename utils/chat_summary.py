@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+from sqlalchemy import func, select
+
+from database import AsyncReadSessionLocal, ChatHistory, ChatSummary
+from utils.chat_archive import read_archive
+from utils.chat_log import merge_pending
+
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English prompts
+    return len(text or "") // 4 + 1
+
+
+def trim_to_budget(rows, token_budget):
+    """Keep the newest rows (oldest -> newest order) whose combined size fits the token budget."""
+    kept = []
+    used = 0
+    for row in reversed(rows):
+        cost = estimate_tokens(row.content)
+        if kept and used + cost > token_budget:
+            break
+        kept.append(row)
+        used += cost
+    return list(reversed(kept))
+
+
+class ConversationSummarizer:
+    """
+    Keeps a rolling per-session summary in chat_summaries so chat prompts stay a
+    fixed size: the summary plus only the most recent turns. Once enough turns have
+    piled up past the summary, everything but the newest recent_turns is folded into
+    it by a background LLM call.
+    """
+
+    # Most messages folded into the summary by a single LLM call
+    MAX_FOLD = 40
+
+    def __init__(self, llm_factory, writer, recent_turns=10, summarize_every=10):
+        self.llm_factory = llm_factory
+        self.writer = writer
+        self.recent_turns = recent_turns
+        self.summarize_every = summarize_every
+        self._running = {}
+
+    async def load_context(self, db, session_id, token_budget, pending=()):
+        """
+        Return (summary text or None, recent ChatHistory rows oldest -> newest within the budget).
+        pending: the session's not yet flushed messages, snapshotted before this call.
+        """
+        summary = await db.get(ChatSummary, session_id)
+        last_id = (summary.last_message_id if summary else 0) or 0
+        query = select(ChatHistory).where(ChatHistory.session_id == session_id, ChatHistory.id > last_id)
+        # Unsummarized turns can briefly exceed recent_turns while a summary is being written
+        limit = self.recent_turns + self.summarize_every
+        rows = list((await db.scalars(query.order_by(ChatHistory.id.desc()).limit(limit))).all())
+        rows.reverse()
+        if len(rows) < limit:
+            # A session that went cold was archived whole, unsummarized turns included
+            archived = await read_archive(db, session_id, before_id=rows[0].id if rows else None, limit=limit - len(rows))
+            rows = [m for m in archived if m.id > last_id] + rows
+        rows = merge_pending(rows, pending)
+
+        summary_text = summary.summary if summary and summary.summary else None
+        budget = token_budget - estimate_tokens(summary_text)
+        return summary_text, trim_to_budget(rows, max(budget, 0))
+
+    def maybe_schedule(self, session_id):
+        """Start a background summary update for this session if one is due and none is running."""
+        task = self._running.get(session_id)
+        if task is not None and not task.done():
+            return
+        self._running[session_id] = asyncio.create_task(self._update(session_id))
+
+    async def _update(self, session_id):
+        db = AsyncReadSessionLocal()
+        try:
+            # Loop so a long legacy session is folded in bounded batches rather than one huge prompt
+            while True:
+                # populate_existing: the previous pass wrote the summary through the writer's session
+                summary = await db.get(ChatSummary, session_id, populate_existing=True)
+                last_id = (summary.last_message_id if summary else 0) or 0
+                unsummarized = (ChatHistory.session_id == session_id, ChatHistory.id > last_id)
+                pending = await db.scalar(select(func.count(ChatHistory.id)).where(*unsummarized))
+                if pending < self.recent_turns + self.summarize_every:
+                    return
+                to_fold = (await db.scalars(
+                    select(ChatHistory).where(*unsummarized)
+                    .order_by(ChatHistory.id.asc())
+                    .limit(min(pending - self.recent_turns, self.MAX_FOLD))
+                )).all()
+                transcript = "\n".join(f"{'Student' if r.role == 'user' else 'Tutor'}: {r.content}" for r in to_fold)
+                previous = summary.summary if summary and summary.summary else "(none yet)"
+                fold_last_id = to_fold[-1].id
+                # Release the connection before the LLM call
+                await db.commit()
+
+                prompt = f"""You maintain a running summary of a tutoring conversation.
+
+Current summary:
+{previous}
+
+New messages:
+{transcript}
+
+Write the updated summary in under 200 words. Keep the student's goals, topics covered,
+what they struggled with and any facts they shared about themselves. Return only the summary."""
+                response = await self.llm_factory().ainvoke([HumanMessage(content=prompt)])
+
+                async def save(w):
+                    row = await w.get(ChatSummary, session_id)
+                    if row is None:
+                        row = ChatSummary(session_id=session_id)
+                        w.add(row)
+                    row.summary = response.content.strip()
+                    row.last_message_id = fold_last_id
+                    row.updated_at = datetime.utcnow()
+
+                await self.writer.run(save)
+        except Exception as e:
+            await db.rollback()
+            print(f"Error updating chat summary: {e}")
+        finally:
+            await db.close()
+            self._running.pop(session_id, None)
@@ -0,0 +1,104 @@
+import asyncio
+
+
+class DatabaseWriter:
+    """
+    Funnels database writes through one task so concurrent requests share commits.
+    Each write is an async op(session); whatever is queued while the previous batch
+    commits goes into the next transaction. If that transaction fails, its ops are
+    replayed one per transaction so a bad op only fails its own caller, which means
+    ops must be safe to run again after a rollback. With batching off, each op gets
+    its own session and commit (the right choice for servers with row locking, e.g. MySQL).
+    """
+
+    def __init__(self, session_factory, batching=True, max_batch=200):
+        self.session_factory = session_factory
+        self.batching = batching
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self._queue = None
+        self._task = None
+        self._loop = None
+
+    async def run(self, op):
+        """Run op(session) in a write transaction and return its result once committed."""
+        if not self.batching:
+            async with self.session_factory() as db:
+                try:
+                    result = await op(db)
+                    await db.commit()
+                    return result
+                except Exception:
+                    await db.rollback()
+                    raise
+
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._worker())
+        future = loop.create_future()
+        self._queue.put_nowait((op, future))
+        return await future
+
+    async def add(self, *rows):
+        """Insert ORM rows."""
+        async def op(db):
+            db.add_all(rows)
+        await self.run(op)
+
+    async def stop(self):
+        """Commit everything already queued, then stop the worker."""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self):
+        return {
+            "batching": self.batching,
+            "writes": self.writes,
+            "batches": self.batches,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0,
+            "queued": self._queue.qsize() if self._queue else 0
+        }
+
+    async def _worker(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit(batch)
+            finally:
+                self.batches += 1
+                self.writes += len(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch):
+        async with self.session_factory() as db:
+            try:
+                results = [await op(db) for op, _ in batch]
+                # One flush for the whole batch, so same-table inserts go out as multi-row INSERTs
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                error = e
+            else:
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+                return
+
+        if len(batch) == 1:
+            future = batch[0][1]
+            if not future.done():
+                future.set_exception(error)
+            return
+        # Something in the batch failed: replay it one op per transaction so only the culprit fails
+        for item in batch:
+            await self._commit([item])
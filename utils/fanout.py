@@ -0,0 +1,54 @@
+import re
+
+# One angle per sub-prompt so parallel chunks cover different ground instead of repeating each other
+FOCUS_ANGLES = [
+    "core definitions and fundamental concepts",
+    "practical applications and real-world examples",
+    "common misconceptions and tricky details",
+    "cause and effect, processes and how things work",
+    "comparisons between related ideas",
+    "history, key figures and context",
+    "problem solving and worked reasoning",
+    "advanced and less commonly known facts",
+]
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def split_count(total, chunk_size):
+    """Split total into near-equal chunk sizes, none larger than chunk_size. 20 by 6 -> [5, 5, 5, 5]."""
+    if total <= chunk_size:
+        return [total]
+    parts = -(-total // chunk_size)
+    base, extra = divmod(total, parts)
+    return [base + 1 if i < extra else base for i in range(parts)]
+
+
+def focus_for(part, parts):
+    angle = FOCUS_ANGLES[part % len(FOCUS_ANGLES)]
+    return f"This is part {part + 1} of {parts} of a larger set. Focus only on {angle}."
+
+
+def normalize_text(text):
+    return " ".join(_NON_WORD.sub(" ", str(text or "").lower()).split())
+
+
+def merge_items(parts, text_field, limit):
+    """
+    Concatenate item lists from parallel chunks, dropping items whose text_field
+    repeats one already kept, then renumber ids from 1 and cap at limit.
+    """
+    seen = set()
+    merged = []
+    for items in parts:
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            key = normalize_text(item.get(text_field))
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append({**item, "id": len(merged) + 1})
+            if len(merged) == limit:
+                return merged
+    return merged
@@ -0,0 +1,81 @@
+import hashlib
+import json
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database import FlashcardCard, FlashcardSet
+
+
+def _normalize(text):
+    return " ".join(str(text or "").split())
+
+
+def card_hash(card):
+    """Content address of a card: identical front/back/hint always hash the same."""
+    body = {
+        "front": _normalize(card.get("front")),
+        "back": _normalize(card.get("back")),
+        "hint": _normalize(card.get("hint"))
+    }
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def content_key(topic, num_cards):
+    """Key shared by every set generated for the same normalized topic and size."""
+    normalized = f"{' '.join(topic.lower().split())}|{int(num_cards)}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def store_cards(db, cards):
+    """Insert the card bodies not already stored and return their hashes in card order."""
+    hashes = []
+    new_cards = {}
+    for card in cards:
+        h = card_hash(card)
+        hashes.append(h)
+        if h not in new_cards:
+            new_cards[h] = card
+
+    existing = set(await db.scalars(select(FlashcardCard.hash).where(FlashcardCard.hash.in_(list(new_cards)))))
+    rows = [
+        FlashcardCard(hash=h, front=c.get("front", ""), back=c.get("back", ""), hint=c.get("hint", ""))
+        for h, c in new_cards.items() if h not in existing
+    ]
+    try:
+        async with db.begin_nested():
+            db.add_all(rows)
+    except IntegrityError:
+        # A concurrent request stored some of the same cards, keep whichever are still missing
+        for row in rows:
+            try:
+                async with db.begin_nested():
+                    await db.merge(row)
+            except IntegrityError:
+                pass
+    return hashes
+
+
+async def load_cards(db, flashcard_set):
+    """Resolve a set's card references (or legacy inline cards) into card dicts numbered from 1."""
+    if not flashcard_set.card_hashes:
+        return flashcard_set.cards or []
+
+    rows = (await db.scalars(select(FlashcardCard).where(FlashcardCard.hash.in_(set(flashcard_set.card_hashes))))).all()
+    by_hash = {row.hash: row for row in rows}
+    cards = []
+    for h in flashcard_set.card_hashes:
+        row = by_hash.get(h)
+        if row is not None:
+            cards.append({"id": len(cards) + 1, "front": row.front, "back": row.back, "hint": row.hint})
+    return cards
+
+
+async def find_reusable_set(db, topic, num_cards):
+    """Most recent content-addressed set generated for the same topic and size, if any."""
+    return (await db.scalars(
+        select(FlashcardSet)
+        .where(FlashcardSet.content_key == content_key(topic, num_cards))
+        .order_by(FlashcardSet.created_at.desc())
+        .limit(1)
+    )).first()
@@ -0,0 +1,101 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+
+ANSWER_CHAR = re.compile(r"^[\s\(]*([A-Da-d0-9])[\s\)\.]")
+
+
+@lru_cache(maxsize=4096)
+def answer_char(text):
+    """Option letter of an answer: "A", "a)", "(B) 1080" -> "A", "A", "B"; otherwise its first character."""
+    if not text:
+        return ""
+    text = text.strip()
+    if len(text) == 1:
+        return text.upper()
+    match = ANSWER_CHAR.match(text)
+    if match:
+        return match.group(1).upper()
+    return text[:1].upper()
+
+
+def answer_key(questions):
+    """[[question_id, letter], ...] in question order, stored on the quiz when it is created."""
+    return [[q["id"], answer_char(q.get("correct_answer", ""))] for q in questions]
+
+
+def answer_details(questions):
+    """
+    [[question text, correct answer as written, explanation], ...] in question order, stored
+    next to answer_key so results can be filled in without loading the questions.
+    """
+    return [[q.get("question", ""), q.get("correct_answer", ""), q.get("explanation", "")] for q in questions]
+
+
+def _details_of(key, details):
+    return details if details is not None else [["", letter, ""] for _, letter in key]
+
+
+def result(question_id, detail, user_ans, is_correct):
+    question, correct_answer, explanation = detail
+    return {
+        "question_id": question_id,
+        "question": question,
+        "user_answer": user_ans,
+        "correct_answer": correct_answer,
+        "is_correct": is_correct,
+        "explanation": explanation
+    }
+
+
+def grade(key, answers, details=None):
+    """
+    Grade submitted answers ({question_id as str: answer}) against an answer key.
+    details (see answer_details) only fill in each result's question text, correct answer
+    as written and explanation; correctness comes from the key.
+    """
+    correct = 0
+    results = []
+    for (question_id, correct_char), detail in zip(key, _details_of(key, details)):
+        user_ans = answers.get(str(question_id), "")
+        is_correct = correct_char != "" and answer_char(user_ans) == correct_char
+        correct += is_correct
+        results.append(result(question_id, detail, user_ans, is_correct))
+    return correct, results
+
+
+def answer_codes(key):
+    """The key's letters as code points (0 for questions without a correct answer)."""
+    return np.fromiter((ord(letter) if letter else 0 for _, letter in key), dtype=np.uint32, count=len(key))
+
+
+def grade_batch(key, submissions, details=None):
+    """
+    Grade many submissions ({question_id as str: answer} each) against one answer key.
+    Answers are normalized once per distinct text (a class mostly sends the same option
+    strings) into a submissions x questions matrix of letter codes, compared with the
+    key in one step. Returns [(correct, results), ...] in submission order, each as
+    grade() would.
+    """
+    ids = [str(question_id) for question_id, _ in key]
+    question_ids = [question_id for question_id, _ in key]
+    details = _details_of(key, details)
+    raw = [[answers.get(question_id, "") for question_id in ids] for answers in submissions]
+
+    codes = {}
+    for row in raw:
+        for text in row:
+            if text not in codes:
+                codes[text] = ord(answer_char(text) or "\0")
+    answered = np.array([[codes[text] for text in row] for row in raw], dtype=np.uint32).reshape(len(raw), len(ids))
+    key_codes = answer_codes(key)
+    hits = (answered == key_codes) & (key_codes != 0)
+
+    return [
+        (correct, [
+            result(question_id, detail, user_ans, is_correct)
+            for question_id, detail, user_ans, is_correct in zip(question_ids, details, row, hit_row)
+        ])
+        for correct, row, hit_row in zip(hits.sum(axis=1).tolist(), raw, hits.tolist())
+    ]
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from database import AsyncReadSessionLocal, Job
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+def job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None
+    }
+
+
+class JobQueue:
+    """
+    Bounded pool of asyncio workers for long generations.
+    Jobs are rows in the jobs table, shared by every worker process. A job only runs
+    once claimed with an UPDATE from queued to running, so when several processes
+    (uvicorn --workers) see the same queued job exactly one of them runs it. A running
+    job's owner refreshes updated_at every heartbeat seconds; one not refreshed for
+    stale_after seconds belonged to a process that stopped and is queued again.
+    start() and every recover_interval seconds, leftover queued jobs are picked up.
+    Subscribers get a snapshot dict every time this process changes a job's status.
+    """
+
+    def __init__(self, writer, workers=4, heartbeat=15, stale_after=60, recover_interval=60):
+        self.writer = writer
+        self.workers = workers
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self.recover_interval = recover_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:64]
+        self.claims_lost = 0
+        self._handlers = {}
+        self._queue = None
+        self._tasks = []
+        self._subscribers = {}
+
+    def register(self, kind, handler):
+        """handler(payload) -> JSON-serializable result"""
+        self._handlers[kind] = handler
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        pending = await self.recover()
+        if pending:
+            print(f"[OK] Requeued {pending} unfinished jobs")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.recover_interval:
+            self._tasks.append(asyncio.create_task(self._recover_loop()))
+
+    async def recover(self):
+        """
+        Queue jobs whose owner stopped (no heartbeat for stale_after seconds) again, then
+        put every queued job on this process's queue; claiming keeps each from running twice.
+        Returns the number of jobs put on the queue.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+
+        async def requeue_stale(db):
+            await db.execute(
+                update(Job).where(Job.status == "running", Job.updated_at < cutoff)
+                .values(status="queued", owner=None)
+                .execution_options(synchronize_session=False)
+            )
+
+        await self.writer.run(requeue_stale)
+        async with AsyncReadSessionLocal() as db:
+            pending = (await db.scalars(select(Job.id).where(Job.status == "queued").order_by(Job.created_at.asc()))).all()
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        return len(pending)
+
+    async def _recover_loop(self):
+        while True:
+            await asyncio.sleep(self.recover_interval)
+            try:
+                await self.recover()
+            except Exception as e:
+                print(f"Error recovering jobs: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind, payload, session_id=None):
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if not self.running:
+            raise RuntimeError("Job queue is not running")
+        job_id = f"job-{uuid.uuid4().hex}"
+        await self.writer.add(Job(id=job_id, kind=kind, status="queued", payload=payload, session_id=session_id))
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id):
+        async with AsyncReadSessionLocal() as db:
+            job = await db.get(Job, job_id)
+            return job_to_dict(job) if job else None
+
+    def subscribe(self, job_id):
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id, queue):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def _notify(self, job_id, snapshot):
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(snapshot)
+
+    async def _claim(self, job_id):
+        """Move the job from queued to running for this process; None if another one got it first."""
+        async def claim(db):
+            result = await db.execute(
+                update(Job).where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", owner=self.owner, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                return None
+            return job_to_dict(await db.get(Job, job_id))
+
+        snapshot = await self.writer.run(claim)
+        if snapshot is None:
+            self.claims_lost += 1
+            return None
+        self._notify(job_id, snapshot)
+        return snapshot
+
+    async def _update(self, job_id, **fields):
+        async def update_job(db):
+            job = await db.get(Job, job_id)
+            if job is None:
+                return None
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.updated_at = datetime.utcnow()
+            await db.flush()
+            return job_to_dict(job)
+
+        snapshot = await self.writer.run(update_job)
+        if snapshot is None:
+            return None
+        self._notify(job_id, snapshot)
+        return snapshot
+
+    async def _beat(self, job_id):
+        """Keep the claim on a running job fresh so no other process takes it for abandoned."""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+
+            async def touch(db):
+                await db.execute(
+                    update(Job).where(Job.id == job_id, Job.owner == self.owner)
+                    .values(updated_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+
+            try:
+                await self.writer.run(touch)
+            except Exception as e:
+                print(f"Error refreshing job {job_id}: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = await self._claim(job_id)
+                if job is None:
+                    continue
+                async with AsyncReadSessionLocal() as db:
+                    payload = await db.scalar(select(Job.payload).where(Job.id == job_id))
+                beat = asyncio.create_task(self._beat(job_id))
+                try:
+                    result = await self._handlers[job["kind"]](payload)
+                    await self._update(job_id, status="done", result=result)
+                except Exception as e:
+                    await self._update(job_id, status="failed", error=str(e))
+                finally:
+                    beat.cancel()
+            except Exception as e:
+                # Left queued or running, recover() picks the job up again; this worker goes on
+                print(f"Error running job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
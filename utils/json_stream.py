@@ -0,0 +1,95 @@
+import json
+import re
+
+QUESTIONS_KEY = re.compile(r'"questions"\s*:\s*\[')
+TITLE_KEY = re.compile(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def validate_question(q):
+    """Return True if a parsed question has everything the quiz UI and grader need."""
+    if not isinstance(q, dict):
+        return False
+    if not isinstance(q.get("question"), str) or not q["question"].strip():
+        return False
+    options = q.get("options")
+    if not isinstance(options, list) or len(options) < 2 or not all(isinstance(o, str) for o in options):
+        return False
+    return isinstance(q.get("correct_answer"), str) and bool(q["correct_answer"].strip())
+
+
+class QuizStreamParser:
+    """
+    Incremental parser for a quiz JSON document arriving in token-sized chunks.
+    feed() returns the question objects completed by the new chunk, so callers can
+    forward each one as soon as its closing brace arrives instead of waiting for the
+    whole document. Markdown code fences around the JSON are ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.title = None
+        self.done = False
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._obj_start = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        # The title may come after the questions, so keep looking once the array is done
+        if self.title is None:
+            match = TITLE_KEY.search(self.buffer)
+            if match:
+                self.title = json.loads(f'"{match.group(1)}"')
+        if self.done:
+            return []
+
+        if not self._in_array:
+            match = QUESTIONS_KEY.search(self.buffer, self._pos)
+            if not match:
+                # Keep a tail in case the key is split across chunks
+                self._pos = max(0, len(self.buffer) - 32)
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        return self._scan()
+
+    def _scan(self):
+        completed = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start is not None:
+                    try:
+                        question = json.loads(buf[self._obj_start:i + 1])
+                    except ValueError:
+                        question = None
+                    if validate_question(question):
+                        completed.append(question)
+                    self._obj_start = None
+            elif ch == "]" and self._depth == 0:
+                self.done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return completed
@@ -0,0 +1,85 @@
+import threading
+
+import httpx
+from langchain_groq import ChatGroq
+
+GROQ_BASE_URL = "https://api.groq.com"
+
+
+class LLMClientRegistry:
+    """
+    Process-wide cache of ChatGroq clients.
+    Every (model, temperature, max_tokens) configuration gets one client, and all of
+    them share a single keep-alive connection pool so requests skip the TLS handshake.
+    """
+
+    def __init__(self, api_key, pool_size=20, keepalive_expiry=60.0, timeout=60.0):
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._clients = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def _ensure_http_clients(self):
+        # Called with the lock held
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._limits(), timeout=self.timeout)
+        if self._http_async_client is None:
+            self._http_async_client = httpx.AsyncClient(limits=self._limits(), timeout=self.timeout)
+
+    def get(self, model, temperature=0.7, max_tokens=2000):
+        """Return the cached client for this configuration, creating it on first use."""
+        key = (model, float(temperature), int(max_tokens))
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                self._ensure_http_clients()
+                client = ChatGroq(
+                    model=model,
+                    groq_api_key=self.api_key,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    http_client=self._http_client,
+                    http_async_client=self._http_async_client
+                )
+                self._clients[key] = client
+            return client
+
+    async def warm_up(self, model, temperature=0.7, max_tokens=2000):
+        """Build the default client and open a pooled connection to Groq ahead of the first request."""
+        self.get(model, temperature, max_tokens)
+        try:
+            await self._http_async_client.get(
+                f"{GROQ_BASE_URL}/openai/v1/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=5.0
+            )
+            print("[OK] LLM connection pool warmed up")
+        except Exception as e:
+            print(f"[WARNING] LLM warm-up failed: {e}")
+
+    async def aclose(self):
+        """Drop cached clients and close the shared connection pools."""
+        with self._lock:
+            http_client, http_async_client = self._http_client, self._http_async_client
+            self._clients = {}
+            self._http_client = None
+            self._http_async_client = None
+        if http_async_client is not None:
+            await http_async_client.aclose()
+        if http_client is not None:
+            http_client.close()
@@ -0,0 +1,285 @@
+import re
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[\W_]+")
+_NUMBER = re.compile(r"\d+")
+_SHINGLE = 4 # Bytes per shingle: "what is a variable" -> "what", "hat ", "at i", ...
+_SHIFT = np.uint64(32)
+# Wording every question template shares; the words that tell two questions apart are the rest
+_STOPWORDS = frozenset("""
+a about after all an and any are as at be been before being best between by can could did do does
+during following for from has have how if in into is it its many most much not of on or should so
+than that the their these this those to under was were what when where which while who whom whose
+why will with would
+""".split())
+
+Signature = namedtuple("Signature", ["minhash", "numbers", "words"])
+
+
+def normalize_question(text):
+    """Lowercase words only (any script), single-spaced: punctuation and spacing never make two questions differ."""
+    return " ".join(_NON_WORD.sub(" ", str(text or "").lower()).split())
+
+
+def shingles(text):
+    """Every 4-byte window of the normalized UTF-8 text, as an integer."""
+    encoded = normalize_question(text).encode("utf-8")
+    if not encoded:
+        return np.empty(0, dtype=np.uint64)
+    data = np.frombuffer(encoded.ljust(_SHINGLE, b"\0"), dtype=np.uint8).astype(np.uint64)
+    return (data[:-3] << np.uint64(24)) | (data[1:-2] << np.uint64(16)) | (data[2:-1] << np.uint64(8)) | data[3:]
+
+
+def numbers_key(text):
+    """Hash of the numbers in a text, in order: "7 x 8" and "7 x 9" ask different things."""
+    return zlib.crc32(" ".join(_NUMBER.findall(str(text or ""))).encode("ascii"))
+
+
+def content_words(text):
+    """Sorted hashes of a text's distinct words other than stopwords, plural "s" dropped."""
+    words = set()
+    for word in normalize_question(text).split():
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(zlib.crc32(word.encode("utf-8")))
+    return np.array(sorted(words), dtype=np.uint32)
+
+
+def words_match(a, b):
+    """
+    True when one text's content words include all of the other's: a reworded question
+    only adds or drops words. Two questions from one template ("capital of France?",
+    "capital of Spain?") each have a word the other lacks.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    return bool(np.isin(a, b, assume_unique=True).all())
+
+
+class NearDuplicateIndex:
+    """
+    MinHash + LSH index of short texts (quiz questions) for near-duplicate lookups.
+
+    A text's signature is the minimum of num_perm random hash functions over its 4-byte
+    shingles; two texts agree on each value with probability equal to the Jaccard
+    similarity of their shingle sets. Signatures are cut into `bands`, and texts sharing
+    any whole band are candidates, checked against `threshold` by signature agreement
+    (short_threshold when either text has fewer than short_words content words, where
+    one word is a large share of the shingles). A match must also carry the same numbers
+    as the text looked up (see numbers_key), and one text's content words must include
+    the other's (see words_match): shingles shared by a question template score high
+    even when the one word that matters differs.
+
+    Band keys of recent inserts sit in a dict; every buffer_size inserts they are sorted
+    into a run searched with searchsorted. Runs of equal size merge up to max_run_buffers
+    buffers, so an insert rewrites at most one bounded run and a lookup searches a handful.
+    Buckets holding more than max_bucket texts (wording shared by a whole question template,
+    "which of the following ...") are skipped: a real near-duplicate shares other bands too.
+    A million questions take about 360 MB.
+    """
+
+    _BLOCK = 1 << 16 # Signature rows per storage block: a full block is never copied again
+    _FIRST_BLOCK = 16 # Rows allocated at first, doubled until a block is full
+
+    def __init__(self, threshold=0.7, num_perm=64, bands=16, seed=1, buffer_size=8192, max_run_buffers=16, max_bucket=128,
+                 short_words=4, short_threshold=0.85):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.short_words = short_words
+        self.short_threshold = max(short_threshold, threshold)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.buffer_size = buffer_size
+        self.max_run_buffers = max_run_buffers
+        self.max_bucket = max_bucket
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # Multiply-add-shift hashing: the top 32 bits of a * shingle + b (mod 2**64), a odd
+        self._a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_ids = np.arange(bands, dtype=np.uint64) << np.uint64(32)
+
+        self.keys = []
+        # Low 16 bits of each signature value: enough to estimate similarity, half the memory
+        self._signatures = []
+        self._numbers = []
+        self._words = [] # content_words of every row of a block, concatenated
+        self._word_ends = [] # end of each row's words in that block's _words
+        self._runs = [] # [(band keys sorted, items, buffers merged in)], band key = band index << 32 | band hash
+        self._pending = {} # band key -> [item, ...] of inserts since the last run was written
+        self._pending_keys = [] # band keys of those inserts, in insert order
+
+    def __len__(self):
+        return len(self.keys)
+
+    def stats(self):
+        arrays = self._signatures + self._numbers + self._words + self._word_ends + [a for keys, items, _ in self._runs for a in (keys, items)]
+        return {"entries": len(self), "runs": len(self._runs), "bytes": sum(a.nbytes for a in arrays)}
+
+    def signature(self, text):
+        """Signature (MinHash, numbers_key, content_words) of a text, or None when it has no words."""
+        values = shingles(text)
+        if len(values) == 0:
+            return None
+        minhash = ((values[:, None] * self._a + self._b) >> _SHIFT).min(axis=0)
+        return Signature(minhash, numbers_key(text), content_words(text))
+
+    def _band_keys_of(self, signature):
+        mixed = (signature.minhash.reshape(self.bands, self.rows) * self._band_mix).sum(axis=1, dtype=np.uint64)
+        return self._band_ids | (mixed >> _SHIFT)
+
+    def _row_words(self, item):
+        block, row = divmod(item, self._BLOCK)
+        ends = self._word_ends[block]
+        return self._words[block][ends[row - 1] if row else 0:ends[row]]
+
+    def similar(self, text=None, signature=None):
+        """[(key, estimated similarity), ...] of indexed texts at or above threshold, most similar first."""
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None or not self.keys:
+            return []
+        band_keys = self._band_keys_of(signature)
+
+        candidates = []
+        for keys, items, _ in self._runs:
+            left = np.searchsorted(keys, band_keys, side="left")
+            sizes = np.searchsorted(keys, band_keys, side="right") - left
+            sizes[sizes > self.max_bucket] = 0
+            total = int(sizes.sum())
+            if total:
+                # Positions left[b] .. left[b] + sizes[b] of every band at once
+                starts = np.repeat(left - np.cumsum(sizes) + sizes, sizes)
+                candidates.append(items[starts + np.arange(total)])
+        for key in band_keys.tolist():
+            items = self._pending.get(key)
+            if items and len(items) <= self.max_bucket:
+                candidates.append(np.array(items, dtype=np.uint32))
+        if not candidates:
+            return []
+
+        items = np.unique(np.concatenate(candidates))
+        blocks = items // self._BLOCK
+        stored = np.empty((len(items), self.num_perm), dtype=np.uint16)
+        numbers = np.empty(len(items), dtype=np.uint32)
+        word_counts = np.empty(len(items), dtype=np.int64)
+        for block in np.unique(blocks).tolist():
+            rows = blocks == block
+            positions = (items[rows] % self._BLOCK).astype(np.int64)
+            stored[rows] = self._signatures[block][positions]
+            numbers[rows] = self._numbers[block][positions]
+            ends = self._word_ends[block]
+            word_counts[rows] = ends[positions].astype(np.int64) - np.where(positions > 0, ends[np.maximum(positions - 1, 0)], 0)
+        agreement = (stored == signature.minhash.astype(np.uint16)).mean(axis=1)
+        short = np.minimum(word_counts, len(signature.words)) < self.short_words
+        thresholds = np.where(short, self.short_threshold, self.threshold)
+        matched = np.flatnonzero((agreement >= thresholds) & (numbers == signature.numbers))
+        matched = matched[np.argsort(-agreement[matched], kind="stable")]
+        return [
+            (self.keys[item], score)
+            for item, score in zip(items[matched].tolist(), agreement[matched].tolist())
+            if words_match(self._row_words(item), signature.words)
+        ]
+
+    def find(self, text=None, signature=None):
+        """Key of the most similar indexed text at or above threshold, or None."""
+        matches = self.similar(text, signature)
+        return matches[0][0] if matches else None
+
+    def add(self, key, text=None, signature=None):
+        """Index a text under key (texts without words are not indexed); returns its signature."""
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None
+        item = len(self.keys)
+        row = item % self._BLOCK
+        if row == 0:
+            self._signatures.append(np.empty((self._FIRST_BLOCK, self.num_perm), dtype=np.uint16))
+            self._numbers.append(np.empty(self._FIRST_BLOCK, dtype=np.uint32))
+            self._words.append(np.empty(self._FIRST_BLOCK * 8, dtype=np.uint32))
+            self._word_ends.append(np.empty(self._FIRST_BLOCK, dtype=np.uint32))
+        elif row == len(self._numbers[-1]):
+            size = min(2 * row, self._BLOCK)
+            self._signatures[-1] = np.resize(self._signatures[-1], (size, self.num_perm))
+            self._numbers[-1] = np.resize(self._numbers[-1], size)
+            self._word_ends[-1] = np.resize(self._word_ends[-1], size)
+        self._signatures[-1][row] = signature.minhash.astype(np.uint16)
+        self._numbers[-1][row] = signature.numbers
+        start = int(self._word_ends[-1][row - 1]) if row else 0
+        end = start + len(signature.words)
+        if end > len(self._words[-1]):
+            self._words[-1] = np.resize(self._words[-1], max(2 * len(self._words[-1]), end))
+        self._words[-1][start:end] = signature.words
+        self._word_ends[-1][row] = end
+        self.keys.append(key)
+
+        band_keys = self._band_keys_of(signature)
+        self._pending_keys.append(band_keys)
+        for band_key in band_keys.tolist():
+            self._pending.setdefault(band_key, []).append(item)
+        if len(self._pending_keys) == self.buffer_size:
+            self._write_run()
+        return signature
+
+    def add_if_new(self, key, text):
+        """Index the text unless a near-duplicate is already indexed; returns that duplicate's key, or None if added."""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        existing = self.find(signature=signature)
+        if existing is not None:
+            return existing
+        self.add(key, signature=signature)
+        return None
+
+    def _write_run(self):
+        first = len(self.keys) - len(self._pending_keys)
+        items = np.repeat(np.arange(first, len(self.keys), dtype=np.uint32), self.bands)
+        keys = np.concatenate(self._pending_keys)
+        order = np.argsort(keys, kind="stable")
+        run = (keys[order], items[order], 1)
+        self._pending = {}
+        self._pending_keys = []
+
+        # Merge equal-sized runs, binary-counter style, up to max_run_buffers. A stable sort of
+        # two concatenated sorted runs is a linear merge.
+        while self._runs and self._runs[-1][2] == run[2] and run[2] * 2 <= self.max_run_buffers:
+            keys, items, size = self._runs.pop()
+            keys, items = np.concatenate([keys, run[0]]), np.concatenate([items, run[1]])
+            order = np.argsort(keys, kind="stable")
+            run = (keys[order], items[order], size * 2)
+        self._runs.append(run)
+
+
+def drop_near_duplicates(items, text_field, index=None, threshold=0.7):
+    """
+    Items whose text_field is not a near-duplicate of an earlier item, nor of anything
+    in index (left unchanged), in their original order. With an index, its threshold applies.
+    """
+    if index is not None:
+        seen = NearDuplicateIndex(threshold=index.threshold, num_perm=index.num_perm, bands=index.bands, seed=index.seed)
+    else:
+        seen = NearDuplicateIndex(threshold=threshold)
+    kept = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        signature = seen.signature(item.get(text_field))
+        if signature is None:
+            continue
+        if index is not None and index.find(signature=signature) is not None:
+            continue
+        if seen.find(signature=signature) is not None:
+            continue
+        seen.add(len(kept), signature=signature)
+        kept.append(item)
+    return kept
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from database import ProgressSummary, QuizScore, FlashcardSet
+
+
+def advance_streak(streak_days, last_date, day):
+    """Streak after a quiz on day: same day keeps it, the next day extends it, any gap restarts it."""
+    if last_date is None:
+        return 1
+    if day == last_date:
+        return streak_days
+    if day == last_date + timedelta(days=1):
+        return streak_days + 1
+    return 1
+
+
+async def rebuild_summary(db, session_id):
+    """Compute a session's summary from its full history (only for sessions older than the table); not added to db."""
+    quiz_count, score_sum = (await db.execute(
+        select(func.count(QuizScore.id), func.coalesce(func.sum(QuizScore.score), 0.0))
+        .where(QuizScore.session_id == session_id)
+    )).one()
+    flashcard_sets = await db.scalar(select(func.count(FlashcardSet.id)).where(FlashcardSet.session_id == session_id))
+
+    streak, last_date, last_activity = 0, None, None
+    dates = await db.scalars(select(QuizScore.created_at).where(QuizScore.session_id == session_id).order_by(QuizScore.created_at.asc()))
+    for created_at in dates:
+        streak = advance_streak(streak, last_date, created_at.date())
+        last_date = created_at.date()
+        last_activity = created_at
+    last_set = await db.scalar(select(func.max(FlashcardSet.created_at)).where(FlashcardSet.session_id == session_id))
+    if last_set and (last_activity is None or last_set > last_activity):
+        last_activity = last_set
+
+    return ProgressSummary(
+        session_id=session_id,
+        quiz_count=quiz_count or 0,
+        score_sum=float(score_sum or 0.0),
+        flashcard_sets=flashcard_sets or 0,
+        streak_days=streak,
+        last_quiz_date=last_date,
+        last_activity_at=last_activity
+    )
+
+
+async def load_summary(db, session_id, for_update=False):
+    """
+    The session's progress_summary row, created from existing history the first time
+    it is needed. for_update locks the row (MySQL) for a read-modify-write; call this
+    before adding the new score or set so the rebuild does not count it twice.
+    """
+    query = select(ProgressSummary).where(ProgressSummary.session_id == session_id)
+    if for_update:
+        query = query.with_for_update()
+    summary = (await db.scalars(query)).first()
+    if summary is not None:
+        return summary
+
+    summary = await rebuild_summary(db, session_id)
+    try:
+        async with db.begin_nested():
+            db.add(summary)
+    except IntegrityError:
+        # A concurrent request created it first
+        summary = (await db.scalars(query)).first()
+    return summary
+
+
+async def record_quiz_score(db, session_id, score, when=None):
+    """Fold one submitted score into the summary; committed with the caller's transaction."""
+    when = when or datetime.utcnow()
+    summary = await load_summary(db, session_id, for_update=True)
+    summary.quiz_count = (summary.quiz_count or 0) + 1
+    summary.score_sum = (summary.score_sum or 0.0) + score
+    summary.streak_days = advance_streak(summary.streak_days or 0, summary.last_quiz_date, when.date())
+    summary.last_quiz_date = when.date()
+    summary.last_activity_at = when
+    return summary
+
+
+async def record_flashcard_set(db, session_id, when=None):
+    when = when or datetime.utcnow()
+    summary = await load_summary(db, session_id, for_update=True)
+    summary.flashcard_sets = (summary.flashcard_sets or 0) + 1
+    summary.last_activity_at = when
+    return summary
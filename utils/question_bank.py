@@ -0,0 +1,343 @@
+import asyncio
+import hashlib
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database import AsyncReadSessionLocal, BankQuestion, Topic
+from utils.fanout import normalize_text
+from utils.grading import answer_char
+from utils.near_duplicates import NearDuplicateIndex, drop_near_duplicates
+
+# A question almost nobody answers correctly after this many answers usually has a wrong key
+MIN_ANSWERS_FOR_QUALITY = 20
+MIN_CORRECT_RATE = 0.1
+# Quizzes are sampled from the POOL_FACTOR x count least-served questions of the topic
+POOL_FACTOR = 4
+
+
+def topic_key(topic):
+    """Bank index key of a topic: "  Cell  Biology" and "cell biology" share questions."""
+    return " ".join(str(topic or "").lower().split())
+
+
+def normalize_difficulty(difficulty):
+    return str(difficulty or "").strip().lower()
+
+
+def question_hash(topic, difficulty, question):
+    normalized = f"{topic_key(topic)}|{normalize_difficulty(difficulty)}|{normalize_text(question.get('question'))}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def usable(question):
+    """Only complete questions with options labelled A), B), ... and a key among them are banked."""
+    if not isinstance(question, dict) or not normalize_text(question.get("question")):
+        return False
+    options = question.get("options")
+    if not isinstance(options, list) or len(options) < 2 or not all(isinstance(o, str) for o in options):
+        return False
+    labels = [answer_char(o) for o in options]
+    if labels != [chr(ord("A") + i) for i in range(len(options))]:
+        return False
+    return answer_char(str(question.get("correct_answer") or "")) in labels
+
+
+def _trusted():
+    return or_(
+        BankQuestion.times_answered < MIN_ANSWERS_FOR_QUALITY,
+        BankQuestion.times_correct >= BankQuestion.times_answered * MIN_CORRECT_RATE
+    )
+
+
+async def count_questions(db, topic, difficulty):
+    """Bank questions available to quizzes on the topic at this difficulty."""
+    return await db.scalar(
+        select(func.count(BankQuestion.id))
+        .where(BankQuestion.topic_key == topic_key(topic), BankQuestion.difficulty == normalize_difficulty(difficulty), _trusted())
+    )
+
+
+async def sample_questions(db, topic, difficulty, count, rng=random):
+    """
+    Up to count bank questions for the topic and difficulty, as quiz question dicts
+    carrying their bank_id. Picked at random among the least-served ones so repeat
+    quizzes vary, skipping questions whose answer stats suggest a wrong key.
+    """
+    pool = (await db.scalars(
+        select(BankQuestion.id)
+        .where(BankQuestion.topic_key == topic_key(topic), BankQuestion.difficulty == normalize_difficulty(difficulty), _trusted())
+        .order_by(BankQuestion.times_served.asc())
+        .limit(count * POOL_FACTOR)
+    )).all()
+    if not pool:
+        return []
+    chosen = rng.sample(pool, min(count, len(pool)))
+    rows = (await db.execute(
+        select(BankQuestion.id, BankQuestion.question, BankQuestion.options, BankQuestion.correct_answer, BankQuestion.explanation)
+        .where(BankQuestion.id.in_(chosen))
+    )).all()
+    return [
+        {
+            "id": i,
+            "question": row.question,
+            "options": list(row.options),
+            "correct_answer": row.correct_answer,
+            "explanation": row.explanation or "",
+            "bank_id": row.id
+        }
+        for i, row in enumerate(rows, 1)
+    ]
+
+
+class BankDuplicates:
+    """
+    Near-duplicate indexes of the banked questions of the max_topics most recently
+    banked (topic, difficulty) pairs. Each is built on first use and caught up from
+    the table by id, so questions banked by other workers count too.
+    """
+
+    def __init__(self, threshold=0.7, max_topics=256):
+        self.threshold = threshold
+        self.max_topics = max_topics
+        self.dropped = 0
+        self._indexes = OrderedDict() # (topic key, difficulty) -> [index, last loaded id]
+
+    async def drop(self, db, topic, difficulty, questions):
+        """The questions that are neither near-duplicates of each other nor of a banked one."""
+        key = (topic_key(topic), normalize_difficulty(difficulty))
+        entry = self._indexes.get(key)
+        if entry is None:
+            entry = self._indexes[key] = [NearDuplicateIndex(threshold=self.threshold), 0]
+            while len(self._indexes) > self.max_topics:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(key)
+
+        index, last_id = entry
+        rows = (await db.execute(
+            select(BankQuestion.id, BankQuestion.question)
+            .where(BankQuestion.topic_key == key[0], BankQuestion.difficulty == key[1], BankQuestion.id > last_id)
+            .order_by(BankQuestion.id)
+        )).all()
+        for row in rows:
+            index.add(row.id, row.question)
+        if rows:
+            entry[1] = rows[-1].id
+
+        kept = drop_near_duplicates(questions, "question", index=index)
+        self.dropped += len(questions) - len(kept)
+        return kept
+
+    def stats(self):
+        return {"topics": len(self._indexes), "questions": sum(len(index) for index, _ in self._indexes.values()), "dropped": self.dropped}
+
+
+async def store_questions(db, topic, difficulty, questions, duplicates=None):
+    """
+    Bank the usable questions not already stored; returns how many were added.
+    With a BankDuplicates, near-duplicates of banked questions are not stored either.
+    """
+    questions = [q for q in questions if usable(q)]
+    if duplicates is not None and questions:
+        questions = await duplicates.drop(db, topic, difficulty, questions)
+    new_questions = {}
+    for question in questions:
+        new_questions.setdefault(question_hash(topic, difficulty, question), question)
+    if not new_questions:
+        return 0
+
+    existing = set(await db.scalars(select(BankQuestion.content_hash).where(BankQuestion.content_hash.in_(list(new_questions)))))
+    rows = [
+        BankQuestion(
+            topic_key=topic_key(topic),
+            topic=topic,
+            difficulty=normalize_difficulty(difficulty),
+            question=q["question"],
+            options=q["options"],
+            correct_answer=answer_char(str(q["correct_answer"])),
+            explanation=q.get("explanation") or "",
+            content_hash=h,
+            times_served=0,
+            times_answered=0,
+            times_correct=0
+        )
+        for h, q in new_questions.items() if h not in existing
+    ]
+    try:
+        async with db.begin_nested():
+            db.add_all(rows)
+        return len(rows)
+    except IntegrityError:
+        # Another worker banked some of the same questions, keep whichever are still missing
+        added = 0
+        for row in rows:
+            try:
+                async with db.begin_nested():
+                    await db.merge(row)
+                added += 1
+            except IntegrityError:
+                pass
+        return added
+
+
+async def mark_served(db, bank_ids):
+    """Count one more quiz for each bank question; runs inside the caller's transaction."""
+    if bank_ids:
+        await db.execute(
+            update(BankQuestion).where(BankQuestion.id.in_(bank_ids))
+            .values(times_served=BankQuestion.times_served + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def record_answers(db, bank_ids, correct_counts, submissions=1):
+    """
+    Fold graded submissions of a quiz into its bank questions' stats: bank_ids and
+    correct_counts follow the quiz's question order (None for unbanked questions).
+    """
+    by_count = {}
+    for bank_id, correct in zip(bank_ids or [], correct_counts):
+        if bank_id is not None:
+            by_count.setdefault(int(correct), []).append(bank_id)
+    for correct, ids in by_count.items():
+        await db.execute(
+            update(BankQuestion).where(BankQuestion.id.in_(ids))
+            .values(times_answered=BankQuestion.times_answered + submissions, times_correct=BankQuestion.times_correct + correct)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def popular_topics(db, limit, since):
+    """The topics studied by the most sessions since `since`, most popular first, as display names."""
+    rows = (await db.execute(
+        select(Topic.name, func.count(Topic.id))
+        .where(Topic.last_studied >= since)
+        .group_by(Topic.name)
+        .order_by(func.count(Topic.id).desc())
+        .limit(limit * 4)
+    )).all()
+    # Spellings of the same topic count together; the most common one names it
+    counts, names = {}, {}
+    for name, sessions in rows:
+        key = topic_key(name)
+        if not key:
+            continue
+        counts[key] = counts.get(key, 0) + sessions
+        names.setdefault(key, name)
+    return [names[key] for key in sorted(counts, key=counts.get, reverse=True)[:limit]]
+
+
+class QuestionReplenisher:
+    """
+    Tops up the question bank while the server is idle. Every `interval` seconds, if
+    no HTTP request has been in flight for idle_after seconds, the topics studied by
+    the most sessions get generated questions until each (topic, difficulty) holds
+    `target`, `batch` questions per LLM call. Stops mid-pass as soon as traffic returns.
+    generate(topic, difficulty, count, part) returns question dicts; part varies the angle.
+    With `duplicates` (a BankDuplicates), near-duplicates of banked questions are dropped.
+    """
+
+    def __init__(self, writer, generate, target=30, difficulties=("medium",), interval=300, idle_after=30,
+                 topics_per_pass=20, batch=10, window=timedelta(days=30), duplicates=None):
+        self.writer = writer
+        self.generate = generate
+        self.duplicates = duplicates
+        self.target = target
+        self.difficulties = tuple(difficulties)
+        self.interval = interval
+        self.idle_after = idle_after
+        self.topics_per_pass = topics_per_pass
+        self.batch = batch
+        self.window = window
+        self.added = 0
+        self.llm_calls = 0
+        self.passes = 0
+        self._in_flight = 0
+        self._last_request = time.monotonic()
+        self._task = None
+
+    def request_started(self):
+        self._in_flight += 1
+
+    def request_finished(self):
+        self._in_flight -= 1
+        self._last_request = time.monotonic()
+
+    @property
+    def idle(self):
+        return self._in_flight == 0 and time.monotonic() - self._last_request >= self.idle_after
+
+    def start(self):
+        if self.interval and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self):
+        return {"added": self.added, "llm_calls": self.llm_calls, "passes": self.passes, "running": self._task is not None}
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.idle:
+                continue
+            try:
+                await self.replenish_once()
+            except Exception as e:
+                print(f"Error replenishing the question bank: {e}")
+
+    async def replenish_once(self, now=None):
+        """One pass over the popular topics; returns the number of questions added."""
+        async with AsyncReadSessionLocal() as db:
+            topics = await popular_topics(db, self.topics_per_pass, (now or datetime.utcnow()) - self.window)
+        self.passes += 1
+
+        added = 0
+        for topic in topics:
+            for difficulty in self.difficulties:
+                added += await self._top_up(topic, difficulty)
+                if not self.idle:
+                    return added
+        return added
+
+    async def _top_up(self, topic, difficulty):
+        added = 0
+        async with AsyncReadSessionLocal() as db:
+            have = await count_questions(db, topic, difficulty)
+        while have < self.target and self.idle:
+            questions = await self.generate(topic, difficulty, min(self.batch, self.target - have), have // self.batch)
+            self.llm_calls += 1
+            stored = await self.writer.run(lambda db, questions=questions: store_questions(db, topic, difficulty, questions, self.duplicates))
+            if not stored:
+                # Only repeats of what is banked: try again on a later pass
+                break
+            have += stored
+            added += stored
+            self.added += stored
+        return added
+
+
+class ActivityMiddleware:
+    """ASGI middleware telling the replenisher when requests are in flight (health checks excepted)."""
+
+    def __init__(self, app, replenisher, ignore=("/api/health",)):
+        self.app = app
+        self.replenisher = replenisher
+        self.ignore = ignore
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.ignore:
+            return await self.app(scope, receive, send)
+        self.replenisher.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.replenisher.request_finished()
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.grading import answer_char
+
+OPTION_LABEL = re.compile(r"^[\s\(]*([A-Za-z])[\)\.:]\s*(.*)$", re.S)
+
+
+class MemoryCacheBackend:
+    """In-process LRU store. Fast, but each worker process keeps its own copy."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._data[key] = (value, stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """
+    SQLite file store shared by every worker process on the host. LRU order is kept in
+    last_access. Hits only note the access in memory; the notes are written in one
+    transaction every touch_batch hits or touch_interval seconds, and before evicting,
+    so a read never waits for the write lock. Calls block: QuizCache runs them in a thread.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path="./quiz_cache.db", max_entries=1000, touch_batch=64, touch_interval=10.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self.evictions = 0
+        self._touches = {} # key -> last access not yet written
+        self._touched_at = time.monotonic()
+        self._touch_lock = threading.Lock()
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_quiz_cache_last_access ON quiz_cache (last_access)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute("SELECT value, stored_at FROM quiz_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            with self._touch_lock:
+                self._touches[key] = time.time()
+                due = len(self._touches) >= self.touch_batch or time.monotonic() - self._touched_at >= self.touch_interval
+            if due:
+                self._write_touches(conn)
+                conn.commit()
+        return row
+
+    def _write_touches(self, conn):
+        with self._touch_lock:
+            touches, self._touches = self._touches, {}
+            self._touched_at = time.monotonic()
+        if touches:
+            conn.executemany("UPDATE quiz_cache SET last_access = ? WHERE key = ?", [(at, key) for key, at in touches.items()])
+
+    def set(self, key, value, stored_at):
+        conn = self._conn()
+        self._write_touches(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO quiz_cache (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, value, stored_at, time.time())
+        )
+        overflow = conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM quiz_cache WHERE key IN (SELECT key FROM quiz_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+        conn.commit()
+
+    def delete(self, key):
+        with self._touch_lock:
+            self._touches.pop(key, None)
+        conn = self._conn()
+        conn.execute("DELETE FROM quiz_cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM quiz_cache").fetchone()[0]
+
+
+class QuizCache:
+    """
+    TTL cache for generated quizzes keyed on normalized (topic, difficulty, num_questions).
+    Values are stored as JSON text so callers can never mutate a cached quiz in place.
+    Async code uses aget/aset, which keep a blocking backend's I/O off the event loop.
+    """
+
+    def __init__(self, backend, ttl=86400):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def make_key(topic, difficulty, num_questions):
+        topic = " ".join(topic.lower().split())
+        difficulty = difficulty.strip().lower()
+        return f"{topic}|{difficulty}|{int(num_questions)}"
+
+    def get(self, topic, difficulty, num_questions):
+        key = self.make_key(topic, difficulty, num_questions)
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            if time.time() - stored_at <= self.ttl:
+                self.hits += 1
+                return json.loads(value)
+            self.backend.delete(key)
+            self.expired += 1
+        self.misses += 1
+        return None
+
+    def set(self, topic, difficulty, num_questions, quiz_data):
+        key = self.make_key(topic, difficulty, num_questions)
+        self.backend.set(key, json.dumps(quiz_data), time.time())
+
+    async def aget(self, topic, difficulty, num_questions):
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.get, topic, difficulty, num_questions)
+        return self.get(topic, difficulty, num_questions)
+
+    async def aset(self, topic, difficulty, num_questions, quiz_data):
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.set, topic, difficulty, num_questions, quiz_data)
+        return self.set(topic, difficulty, num_questions, quiz_data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.backend.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+def shuffle_quiz(quiz_data, rng=random):
+    """
+    Return a copy of quiz_data with questions and options in a new random order.
+    Options are relabelled A), B), ... and correct_answer is remapped to the new letter.
+    Questions whose options are not letter-labelled keep their option order.
+    """
+    questions = [dict(q) for q in quiz_data.get("questions", [])]
+    rng.shuffle(questions)
+
+    for idx, q in enumerate(questions, 1):
+        q["id"] = idx
+        options = q.get("options") or []
+        parsed = [OPTION_LABEL.match(o) if isinstance(o, str) else None for o in options]
+        correct = answer_char(q.get("correct_answer", ""))
+        labels = [m.group(1).upper() for m in parsed if m]
+        if not options or len(labels) != len(options) or correct not in labels:
+            continue
+
+        bodies = [(m.group(1).upper(), m.group(2)) for m in parsed]
+        rng.shuffle(bodies)
+        q["options"] = []
+        for pos, (label, body) in enumerate(bodies):
+            new_label = chr(ord("A") + pos)
+            q["options"].append(f"{new_label}) {body}")
+            if label == correct:
+                q["correct_answer"] = new_label
+
+    return {**quiz_data, "questions": questions}
@@ -0,0 +1,217 @@
+import json
+import time
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, delete, insert, select
+
+from database import ChatArchiveBlock, ChatHistory, FlashcardSet, ProgressSummary, Quiz, QuizScore, Topic
+from utils.chat_archive import unpack_block
+from utils.flashcard_store import load_cards, store_cards
+from utils.grading import answer_details, answer_key
+from utils.topics import touch_topic
+
+EXPORT_FORMAT = "eduai-export"
+EXPORT_VERSION = 1
+
+# Exported tables in import order (quizzes before the scores that reference them).
+# Integer ids are left out: imported rows get new ones. Progress and chat summaries
+# are derived data, rebuilt after an import.
+EXPORT_TABLES = {
+    "topics": (Topic, ("session_id", "name", "last_studied")),
+    "quizzes": (Quiz, ("id", "topic", "difficulty", "title", "questions", "answer_key", "session_id", "created_at")),
+    "quiz_scores": (QuizScore, ("quiz_id", "session_id", "score", "correct_count", "total_questions", "details", "created_at")),
+    "flashcard_sets": (FlashcardSet, ("id", "topic", "title", "content_key", "session_id", "created_at")),
+    "chat_history": (ChatHistory, ("session_id", "role", "content", "created_at")),
+}
+
+
+# Columns whose ISO strings are parsed back on import: {table: {column: is_date}}
+_TEMPORAL = {
+    table: {c: isinstance(model.__table__.c[c].type, Date) for c in columns if isinstance(model.__table__.c[c].type, (DateTime, Date))}
+    for table, (model, columns) in EXPORT_TABLES.items()
+}
+
+
+class InvalidExport(ValueError):
+    """The uploaded data is not a valid export."""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _line(table, row):
+    return json.dumps({"table": table, "row": row}, default=_json_default) + "\n"
+
+
+async def export_ndjson(db, lookup_db, session_id=None, batch=1000):
+    """
+    Yield one session's learning data (every session's if session_id is None) as NDJSON:
+    a header line, then one {"table", "row"} line per row. Rows come off server-side
+    cursors `batch` at a time, so memory does not grow with the amount of data.
+    Flashcard sets carry their cards inline, resolved through lookup_db (a second
+    session: some drivers cannot run a query while a cursor is streaming).
+    """
+    yield json.dumps({
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "session_id": session_id,
+        "exported_at": datetime.utcnow().isoformat()
+    }) + "\n"
+
+    def scoped(query, model):
+        return query if session_id is None else query.where(model.session_id == session_id)
+
+    for table, (model, columns) in EXPORT_TABLES.items():
+        if table == "chat_history":
+            # Archived messages first: within a session they are older than everything still hot
+            blocks = await db.stream(
+                scoped(select(ChatArchiveBlock.session_id, ChatArchiveBlock.payload), ChatArchiveBlock)
+                .order_by(ChatArchiveBlock.session_id, ChatArchiveBlock.first_id)
+                .execution_options(yield_per=max(batch // 100, 1))
+            )
+            async for block_session, payload in blocks:
+                for message in unpack_block(payload):
+                    yield _line(table, {"session_id": block_session, "role": message.role, "content": message.content, "created_at": message.created_at})
+
+        selected = [getattr(model, c) for c in columns]
+        if table == "flashcard_sets":
+            selected += [FlashcardSet.cards, FlashcardSet.card_hashes]
+        result = await db.stream(scoped(select(*selected), model).order_by(model.id).execution_options(yield_per=batch))
+        async for row in result:
+            values = dict(zip(columns, row))
+            if table == "flashcard_sets":
+                values["cards"] = [
+                    {k: card.get(k, "") for k in ("front", "back", "hint")}
+                    for card in await load_cards(lookup_db, row)
+                ]
+                # Do not let the loaded cards pile up in the session
+                lookup_db.expunge_all()
+            yield _line(table, values)
+
+
+async def ndjson_records(chunks):
+    """Parse an NDJSON byte stream (e.g. request.stream()) one line at a time."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+class SessionImporter:
+    """
+    Loads an export through the database writer in bulk INSERTs of batch_size rows.
+    With session_id every row is imported into that session, otherwise rows keep their
+    own. Quizzes and flashcard sets get new ids (an export can be imported next to its
+    source) and scores follow their quiz. Only the quiz id map and the set of touched
+    sessions are kept in memory, never the rows. Not atomic: batches written before
+    an invalid line stay imported.
+    """
+
+    def __init__(self, writer, session_id=None, batch_size=5000):
+        self.writer = writer
+        self.session_id = session_id
+        self.batch_size = batch_size
+        self.counts = {table: 0 for table in EXPORT_TABLES}
+        self._table = None
+        self._rows = []
+        self._quiz_ids = {}
+        self._sessions = set()
+        self._started = time.perf_counter()
+
+    async def load(self, records):
+        """Import every record of an async iterable of parsed export lines; returns the stats."""
+        header = None
+        async for record in records:
+            if header is None:
+                header = record
+                if header.get("format") != EXPORT_FORMAT or not isinstance(header.get("version"), int):
+                    raise InvalidExport("Missing export header")
+                if header["version"] > EXPORT_VERSION:
+                    raise InvalidExport(f"Export version {header['version']} is newer than supported ({EXPORT_VERSION})")
+                continue
+            await self.add(record.get("table"), record.get("row"))
+        if header is None:
+            raise InvalidExport("Empty import")
+        await self.finish()
+        return self.stats()
+
+    async def add(self, table, row):
+        if table not in EXPORT_TABLES or not isinstance(row, dict):
+            raise InvalidExport(f"Unknown record: {table!r}")
+        if table != self._table or len(self._rows) >= self.batch_size:
+            await self._flush()
+            self._table = table
+        self._rows.append(self._convert(table, row))
+
+    async def finish(self):
+        await self._flush()
+        sessions = list(self._sessions)
+
+        async def reset_progress(db):
+            # Counters and streaks are rebuilt from the imported history on the next read
+            for start in range(0, len(sessions), 500):
+                await db.execute(delete(ProgressSummary).where(ProgressSummary.session_id.in_(sessions[start:start + 500])))
+
+        await self.writer.run(reset_progress)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started
+        total = sum(self.counts.values())
+        return {"imported": self.counts, "rows": total, "seconds": round(elapsed, 3), "rows_per_second": round(total / elapsed) if elapsed else total}
+
+    def _convert(self, table, row):
+        values = {column: row.get(column) for column in EXPORT_TABLES[table][1]}
+        for column, is_date in _TEMPORAL[table].items():
+            value = values[column]
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+                values[column] = value.date() if is_date else value
+        if self.session_id is not None:
+            values["session_id"] = self.session_id
+        self._sessions.add(values["session_id"])
+
+        if table == "quizzes":
+            new_id = f"quiz-{uuid.uuid4().hex}"
+            self._quiz_ids[values["id"]] = new_id
+            values["id"] = new_id
+            if values["answer_key"] is None:
+                values["answer_key"] = answer_key(values["questions"] or [])
+            values["answer_details"] = answer_details(values["questions"] or [])
+        elif table == "quiz_scores":
+            values["quiz_id"] = self._quiz_ids.get(values["quiz_id"], values["quiz_id"])
+        elif table == "flashcard_sets":
+            values["id"] = f"flashcard-{uuid.uuid4().hex}"
+            values["cards"] = row.get("cards") or []
+        return values
+
+    async def _flush(self):
+        if not self._rows:
+            return
+        table, rows = self._table, self._rows
+        self._rows = []
+        # Core insert of the table, not the ORM entity: a plain executemany
+        table_insert = insert(EXPORT_TABLES[table][0].__table__)
+
+        async def write(db):
+            if table == "topics":
+                # Merges with topics the target session already has
+                for row in rows:
+                    await touch_topic(db, row["session_id"], row["name"], row["last_studied"])
+                return
+            values = rows
+            if table == "flashcard_sets":
+                # Cards go into the shared content-addressed store, the set keeps references
+                values = [{**row, "cards": None, "card_hashes": await store_cards(db, row["cards"])} for row in rows]
+            await db.execute(table_insert, values)
+
+        await self.writer.run(write)
+        self.counts[table] += len(rows)
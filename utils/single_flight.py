@@ -0,0 +1,37 @@
+import asyncio
+import copy
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent calls into one upstream call.
+    The first caller for a key starts the work; callers arriving while it is in
+    flight await the same task. Every caller gets its own deep copy of the result,
+    so one request mutating its response cannot leak into another's.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._inflight.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        # shield: a caller that disconnects must not cancel the work other callers are waiting on
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
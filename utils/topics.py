@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import Topic
+
+
+async def touch_topic(db, session_id, name, when=None):
+    """
+    Insert the (session_id, name) topic or bump its last_studied, as one statement
+    relying on the unique index. Runs inside the caller's transaction.
+    """
+    when = when or datetime.utcnow()
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(Topic).values(session_id=session_id, name=name, last_studied=when)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Topic.session_id, Topic.name],
+            set_={"last_studied": stmt.excluded.last_studied}
+        )
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(Topic).values(session_id=session_id, name=name, last_studied=when)
+        stmt = stmt.on_duplicate_key_update(last_studied=stmt.inserted.last_studied)
+    else:
+        # No native upsert: fall back to read-then-write
+        topic = (await db.scalars(select(Topic).where(Topic.session_id == session_id, Topic.name == name))).first()
+        if topic is None:
+            db.add(Topic(session_id=session_id, name=name, last_studied=when))
+        else:
+            topic.last_studied = when
+        return
+
+    await db.execute(stmt)
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from duckduckgo_search import DDGS
+
+from utils.quiz_cache import MemoryCacheBackend
+
+
+class PendingSearch:
+    """A search already running in the background, awaited with the service's hard deadline."""
+
+    def __init__(self, service, future, deadline):
+        self.service = service
+        self.future = future
+        self.deadline = deadline
+
+    async def result(self):
+        """Formatted results, or None if the search failed or missed its deadline."""
+        remaining = self.deadline - time.monotonic()
+        try:
+            # shield: giving up on the wait must not cancel the lookup other callers share
+            return await asyncio.wait_for(asyncio.shield(self.future), max(remaining, 0))
+        except asyncio.TimeoutError:
+            self.service.timeouts += 1
+            return None
+        except Exception:
+            return None
+
+
+class SearchService:
+    """
+    DuckDuckGo search for the chat tutor with a hard deadline, a TTL + LRU cache
+    keyed on the normalized query, and one shared lookup per query in flight.
+    DDGS is blocking, so lookups run on a small dedicated thread pool; start()
+    submits the work immediately so callers can do other I/O while it runs.
+    """
+
+    def __init__(self, timeout=3.0, ttl=900, max_entries=500, max_results=3, workers=4):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_results = max_results
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self._cache = MemoryCacheBackend(max_entries=max_entries)
+        self._inflight = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="web-search")
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.lower().split())
+
+    def _search_sync(self, query):
+        results = DDGS(timeout=self.timeout).text(query, max_results=self.max_results)
+        if not results:
+            return "No results found."
+        text = "🔍 **Search Results:**\n\n"
+        for idx, r in enumerate(results, 1):
+            text += f"{idx}. **{r.get('title')}**\n{r.get('body')}\n\n"
+        return text
+
+    def _finish(self, key, future):
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._cache.set(key, future.result(), time.monotonic())
+
+    def start(self, query):
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.timeout
+        key = self.normalize(query)
+
+        entry = self._cache.get(key)
+        if entry is not None and time.monotonic() - entry[1] <= self.ttl:
+            self.hits += 1
+            future = loop.create_future()
+            future.set_result(entry[0])
+            return PendingSearch(self, future, deadline)
+        self.misses += 1
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.run_in_executor(self._executor, self._search_sync, query)
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+        return PendingSearch(self, future, deadline)
+
+    async def search(self, query):
+        return await self.start(query).result()
+
+    def stats(self):
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._inflight)
+        }